@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('config.ini', '.'), ('app/web_templates', 'app/web_templates'), ('templates', 'templates')],
-    hiddenimports=[],
+    hiddenimports=['asgiref.sync', 'openpyxl'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,8 +1,16 @@
 import os
-from flask import Flask
 
 
 def create_app():
+    from flask import Flask
+    from .services.logging_config import setup_logging
+    setup_logging()
+
+    from .services.app_config import get_setting
+    if get_setting('memory', 'tracemalloc', fallback=False, type=bool):
+        from .services.memory_profiler import start_tracing
+        start_tracing()
+
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
     app = Flask(
         __name__,
@@ -19,4 +27,7 @@ def create_app():
     from .routes import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from .services.http_cache import init_http_cache
+    init_http_cache(app)
+
     return app
\ No newline at end of file
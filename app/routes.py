@@ -1,16 +1,150 @@
 import os
+import io
+import re
+import hmac
 import json
+import time
+import asyncio
+import ipaddress
 from datetime import datetime
-from flask import Blueprint, render_template, request, redirect, url_for, send_file, current_app, flash, jsonify
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, send_file, current_app, flash, jsonify, make_response, g,
+)
 from .services.renderer import parse_md_template, render_to_markdown
-from .services.ai_generator import generate_syllabus_content
-from .services.teaching_outline_generator import generate_teaching_outline
-from .services.word_generator import create_word_from_outline
+from .services.ai_generator import agenerate_syllabus_content
+from .services.teaching_outline_generator import (
+    agenerate_teaching_outline, generate_teaching_outline, request_fields,
+)
+from .services.incremental_generator import regenerate_outline
+from .services.outline_library import adapt_outline, get_library
+from .services.app_config import get_setting
+from .services.word_generator import get_render_limiter, word_output_path, write_word_file
+from .services.outline_ir import build_outline, get_outline
+from .services.exporters import EXPORT_FORMATS, export_docx, export_markdown, export_outline
+from .services.token_counter import (
+    cache_hit_stages, record_cache_hit, reset_usage, set_usage_context, usage_headers,
+)
+from .services.structured_output import get_parse_stats
+from .services.response_cache import cache_key, get_response_cache
+from .services.request_stats import record_request
+from .services.usage_ledger import SUMMARY_KEYS, get_usage_ledger
+from .services.token_budget import ai_defaults
+from .services.storage import get_storage
+from .services.docx_cache import get_docx_cache
+from .services.memory_profiler import GROUP_BY, memory_report, start_tracing, stop_tracing
+from .services.template_registry import TEMPLATE_KINDS, get_template, get_template_registry
+from .services.markdown_html import get_markdown_cache
+from .services.http_cache import IMMUTABLE_MAX_AGE, static_max_age
+from .services.logging_config import REQUEST_ID_HEADER, end_request, log_request, new_request
+from .services.deadline import (
+    DEADLINE_HEADER, ClientDisconnected, DeadlineExceeded, parse_timeout, run_until_disconnected, set_deadline,
+)
 
 bp = Blueprint('main', __name__)
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-DEFAULT_MD_PATH = os.path.join(PROJECT_ROOT, 'templates', '教学大纲模板.md')
+
+# 客户端断开连接时的响应状态码（连接已关闭，仅用于日志）
+CLIENT_CLOSED_REQUEST = 499
+
+ARTIFACT_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# 管理接口（/admin/*）的令牌请求头
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+def save_artifact(data):
+    """将生成的文件按内容寻址写入共享存储，返回文件ID（内容摘要），任一实例均可据此提供下载"""
+    return get_storage().put_content(data).split('/', 1)[1]
+
+def send_artifact(artifact_id, download_name):
+    """从共享存储发送文件，ID无效或不存在时返回 None"""
+    if not artifact_id or not ARTIFACT_ID_PATTERN.match(artifact_id):
+        return None
+    if request.if_none_match.contains_weak(artifact_id):
+        # 内容寻址：ID相同即内容相同，无需读取存储
+        response = current_app.response_class(status=304)
+        response.set_etag(artifact_id)
+        return response
+    key = f'artifacts/{artifact_id}'
+    data = get_storage().get(key)
+    if data is None:
+        return None
+    return send_file(io.BytesIO(data), as_attachment=True, download_name=download_name,
+                     etag=artifact_id, last_modified=get_storage().modified(key), max_age=IMMUTABLE_MAX_AGE)
+
+def render_markdown_page(artifact_id, template_name, download_url):
+    """
+    按文件ID渲染 Markdown 预览页：HTML 取自转换缓存（以文件ID即内容摘要为键），
+    带 ETag 且要求浏览器重新验证，刷新页面时只需比较 ETag 返回 304
+
+    Returns:
+        Response: 文件不存在时为 None
+    """
+    if not ARTIFACT_ID_PATTERN.match(artifact_id):
+        return None
+    if request.if_none_match.contains_weak(artifact_id):
+        response = current_app.response_class(status=304)
+    else:
+        html = get_markdown_cache().get(artifact_id)
+        if html is None:
+            data = get_storage().get(f'artifacts/{artifact_id}')
+            if data is None:
+                return None
+            html, _ = get_markdown_cache().render(data.decode('utf-8'), digest=artifact_id)
+        response = make_response(render_template(template_name, html_content=html, download_url=download_url))
+    response.set_etag(artifact_id)
+    response.cache_control.no_cache = True
+    return response
+
+@bp.before_request
+def start_request_log():
+    """分配请求ID（可由请求头 X-Request-Id 指定）并开始记录各阶段耗时"""
+    g.request_id = new_request(request.headers.get(REQUEST_ID_HEADER))
+    g.request_start = time.perf_counter()
+
+@bp.after_request
+def finish_request_log(response):
+    """响应头返回请求ID，并记录一条带状态码、总耗时和阶段耗时的请求日志"""
+    if 'request_id' in g:
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        log_request(request.method, request.path, response.status_code,
+                    (time.perf_counter() - g.request_start) * 1000)
+    return response
+
+@bp.teardown_request
+def end_request_log(exc):
+    end_request()
+
+@bp.before_request
+def start_request_deadline():
+    """按请求头 X-Request-Timeout 或配置 [server] request_timeout 设置本次请求的截止时间"""
+    default = get_setting('server', 'request_timeout', fallback=120.0, type=float)
+    maximum = get_setting('server', 'max_request_timeout', fallback=600.0, type=float)
+    set_deadline(parse_timeout(request.headers.get(DEADLINE_HEADER), default, maximum))
+
+def is_loopback(address):
+    try:
+        return ipaddress.ip_address(address or '').is_loopback
+    except ValueError:
+        return False
+
+@bp.before_request
+def require_admin():
+    """
+    管理接口（/admin/*）访问控制：配置了 [server] admin_token 时须在请求头 X-Admin-Token 中提供该令牌，
+    未配置时只允许本机访问
+    """
+    if not request.path.startswith('/admin/'):
+        return None
+    token = get_setting('server', 'admin_token', fallback='')
+    if token:
+        provided = request.headers.get(ADMIN_TOKEN_HEADER, '')
+        if hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8')):
+            return None
+        return jsonify({'error': '管理令牌无效'}), 401
+    if is_loopback(request.remote_addr):
+        return None
+    return jsonify({'error': '管理接口只允许本机访问（或配置 [server] admin_token）'}), 403
 
 @bp.route('/', methods=['GET'])
 def index():
@@ -35,7 +169,7 @@ def index():
 
 @bp.route('/render', methods=['POST'])
 def render_md():
-    fields_meta, template_str, _ = parse_md_template(DEFAULT_MD_PATH)
+    fields_meta, template_str, _ = parse_md_template(get_template(kind='md').path)
 
     data = {}
     for key, meta in fields_meta.items():
@@ -75,18 +209,30 @@ def render_md():
     out_path = os.path.join(current_app.config['OUTPUT_FOLDER'], 'rendered_syllabus.md')
     with open(out_path, 'w', encoding='utf-8') as f:
         f.write(md)
+    artifact_id = save_artifact(md.encode('utf-8'))
+
+    return redirect(url_for('main.show_rendered_md', artifact_id=artifact_id), code=303)
 
-    return render_template('preview.html', markdown_content=md, download_url=url_for('main.download_md'))
+@bp.route('/render/<artifact_id>', methods=['GET'])
+def show_rendered_md(artifact_id):
+    """渲染结果预览页"""
+    response = render_markdown_page(artifact_id, 'preview.html', url_for('main.download_md', id=artifact_id))
+    if response is None:
+        return redirect(url_for('main.index'))
+    return response
 
 @bp.route('/download/md', methods=['GET'])
 def download_md():
+    response = send_artifact(request.args.get('id'), 'rendered_syllabus.md')
+    if response is not None:
+        return response
     out_path = os.path.join(current_app.config['OUTPUT_FOLDER'], 'rendered_syllabus.md')
     if not os.path.exists(out_path):
         return redirect(url_for('main.index'))
     return send_file(out_path, as_attachment=True, download_name='rendered_syllabus.md')
 
 @bp.route('/ai/generate', methods=['POST'])
-def ai_generate():
+async def ai_generate():
     payload = request.get_json(force=True) or {}
     course_name = payload.get('course_name', '')
     course_code = payload.get('course_code')
@@ -101,113 +247,313 @@ def ai_generate():
     llm_provider = (payload.get('llm_provider') or '').strip()
     llm_api_key = payload.get('llm_api_key')
     llm_model = (payload.get('llm_model') or '').strip()
+    structured_output = (payload.get('structured_output') or 'json_object').strip()
+
+    reset_usage()
+    try:
+        data = await run_until_disconnected(agenerate_syllabus_content(
+            course_name=course_name,
+            course_code=course_code,
+            credit=credit,
+            hours=hours,
+            prerequisites_text=prerequisites_text,
+            num_weeks=num_weeks,
+            focus_points=focus_points,
+            exclude_points=exclude_points,
+            llm_provider=llm_provider,
+            llm_api_key=llm_api_key,
+            llm_model=llm_model,
+            structured_output=structured_output,
+        ), request.environ)
+    except ClientDisconnected:
+        return '', CLIENT_CLOSED_REQUEST
+    except DeadlineExceeded as e:
+        current_app.logger.error(f'生成教学进度表超时: {str(e)}')
+        return jsonify({'error': f'生成超时: {str(e)}'}), 504
+    response = jsonify(data)
+    response.headers.update(usage_headers())
+    return response
+
+@bp.route('/admin/parse-stats', methods=['GET'])
+def parse_stats():
+    """AI响应解析路径统计"""
+    return jsonify(get_parse_stats())
+
+@bp.route('/admin/cache-stats', methods=['GET'])
+def cache_stats():
+    """预取结果缓存与Word文档缓存统计"""
+    return jsonify({**get_response_cache().stats(), 'word': get_docx_cache().stats(),
+                    'html': get_markdown_cache().stats()})
 
-    data = generate_syllabus_content(
-        course_name=course_name,
-        course_code=course_code,
-        credit=credit,
-        hours=hours,
-        prerequisites_text=prerequisites_text,
-        num_weeks=num_weeks,
-        focus_points=focus_points,
-        exclude_points=exclude_points,
-        llm_provider=llm_provider,
-        llm_api_key=llm_api_key,
-        llm_model=llm_model,
-    )
-    return jsonify(data)
+@bp.route('/admin/usage', methods=['GET'])
+def usage_summary():
+    """大模型用量台账汇总：by=day/course/model/provider/stage/settings，days 为统计天数"""
+    by = request.args.get('by', 'day')
+    if by not in SUMMARY_KEYS:
+        return jsonify({'error': f'不支持的汇总维度: {by}'}), 400
+    days = max(1, request.args.get('days', 7, type=int))
+    return jsonify({'by': by, 'days': days, 'rows': get_usage_ledger().summary(by, days)})
+
+@bp.route('/admin/memory', methods=['GET'])
+def memory_stats():
+    """
+    进程内存与Word渲染排队情况；追踪内存分配时附带最大分配点
+
+    top 为分配点条数，group_by=lineno/filename/traceback，compare=1 时与基线快照对比（按增长量排序）
+    """
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in GROUP_BY:
+        return jsonify({'error': f'不支持的汇总方式: {group_by}'}), 400
+    top = min(max(1, request.args.get('top', 20, type=int)), 200)
+    compare = request.args.get('compare', '').lower() in ('1', 'true', 'yes')
+    return jsonify({**memory_report(top, group_by, compare), 'word_render': get_render_limiter().stats(),
+                    'word_cache': get_docx_cache().stats()})
+
+@bp.route('/admin/memory/tracing', methods=['POST'])
+def memory_tracing():
+    """开启或停止追踪内存分配：{"enabled": true, "frames": 调用栈层数}；已在追踪时再次开启只更新基线快照"""
+    payload = request.get_json(silent=True) or {}
+    if payload.get('enabled', True):
+        frames = payload.get('frames')
+        try:
+            frames = int(frames) if frames is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'frames 应为正整数'}), 400
+        start_tracing(frames)
+    else:
+        stop_tracing()
+    return jsonify(memory_report(limit=0))
 
 @bp.route('/teaching-outline', methods=['GET'])
 def teaching_outline():
     """教学大纲生成页面"""
-    return render_template('teaching_outline.html')
+    return render_template('teaching_outline.html', ai_defaults=ai_defaults())
 
 @bp.route('/teaching-outline/generate', methods=['POST'])
-def generate_teaching_outline_api():
+async def generate_teaching_outline_api():
     """教学大纲AI生成API"""
     payload = request.get_json(force=True) or {}
+    params = outline_params(payload)
+    if not params['course_name']:
+        return jsonify({'error': '课程名称不能为空'}), 400
+    # 记录请求频率，供低峰时段的缓存预热选取常用课程
+    record_request(params['course_name'], params)
     
-    # 基本信息
-    course_name = payload.get('course_name', '').strip()
-    write_date = payload.get('write_date', '').strip()
-    assessment_method = payload.get('assessment_method', '').strip()
-    
-    # AI生成参数
-    exclude_items = payload.get('exclude_items', '').strip()
-    
-    # AI精细控制参数
-    system_prompt = payload.get('system_prompt', '').strip()
-    user_prompt = payload.get('user_prompt', '').strip()
+    # 已有相同参数的预取结果时直接取走（进行中的任务则等待其完成）；每个预取结果只使用一次
+    prefetched = None
+    if params['llm_provider'] and params['llm_api_key']:
+        prefetched = get_response_cache().take(cache_key('teaching_outline', params))
+        
+    try:
+        # 生成教学大纲内容
+        reset_usage()
+        outline_data = None
+        if prefetched is not None:
+            status = 'HIT' if prefetched.done() else 'ATTACHED'
+            waited = time.perf_counter()
+            try:
+                # shield：本请求断开时不取消后台任务
+                outline_data = dict(await run_until_disconnected(
+                    asyncio.shield(asyncio.wrap_future(prefetched)), request.environ))
+            except (ClientDisconnected, DeadlineExceeded):
+                raise
+            except Exception as e:
+                # 预取失败时重新生成
+                current_app.logger.warning(f'预取结果不可用，重新生成: {str(e)}')
+            else:
+                set_usage_context(**params)
+                record_cache_hit('teaching_outline_cache', params['llm_provider'].lower(), params['llm_model'],
+                                 latency_ms=(time.perf_counter() - waited) * 1000)
+                outline_data.update(request_fields(params['write_date'], params['assessment_method']))
+        if outline_data is None:
+            outline_data = await run_until_disconnected(agenerate_teaching_outline(**params), request.environ)
+            # 直接复用了历史大纲库中的大纲时标明来源
+            status = 'LIBRARY' if 'teaching_outline_library' in cache_hit_stages() else 'MISS'
+        
+        response = jsonify(outline_data)
+        response.headers.update(usage_headers())
+        response.headers['X-Cache'] = status
+        # 生成后即解析为中间表示并缓存，导出接口可凭该ID直接导出
+        response.headers['X-Outline-Id'] = build_outline(outline_data).digest
+        return response
+        
+    except ClientDisconnected:
+        return '', CLIENT_CLOSED_REQUEST
+    except DeadlineExceeded as e:
+        current_app.logger.error(f'生成教学大纲超时: {str(e)}')
+        return jsonify({'error': f'生成超时: {str(e)}'}), 504
+    except Exception as e:
+        current_app.logger.error(f'生成教学大纲失败: {str(e)}')
+        return jsonify({'error': f'生成失败: {str(e)}'}), 500
+
+@bp.route('/teaching-outline/prefetch', methods=['POST'])
+def prefetch_teaching_outline_api():
+    """
+    教学大纲预取API：页面在课程名称与模型设置稳定后调用，立即返回；
+    服务端在后台生成并放入结果缓存，随后参数相同的正式生成请求取走该结果（只使用一次）
+    """
+    payload = request.get_json(force=True) or {}
+    params = outline_params(payload)
+    if not params['course_name']:
+        return jsonify({'error': '课程名称不能为空'}), 400
+    if not (params['llm_provider'] and params['llm_api_key']):
+        # 离线生成本身只需毫秒级，无需预取
+        return jsonify({'status': 'skipped'})
     
-    # 大模型设置
-    llm_provider = payload.get('llm_provider', '').strip()
-    llm_api_key = payload.get('llm_api_key', '').strip()
-    llm_model = payload.get('llm_model', '').strip()
+    # 编写日期等字段由正式请求填写，不参与预取
+    params.update(write_date=None, assessment_method=None)
+    timeout = get_setting('cache', 'prefetch_timeout', fallback=300.0, type=float)
+    future, started = get_response_cache().submit(
+        cache_key('teaching_outline', params), prefetch_outline, params, timeout)
+    status = 'started' if started else ('ready' if future.done() else 'pending')
+    return jsonify({'status': status}), 202
+
+def prefetch_outline(params, timeout):
+    """
+    后台预取任务：在独立上下文中生成教学大纲（用量单独统计）
+
+    不使用离线内容回退，失败时不缓存；编写日期等字段由取走结果的正式请求填写
+    """
+    reset_usage()
+    set_deadline(timeout)
+    outline_data = generate_teaching_outline(**params, fallback=False)
+    return {k: v for k, v in outline_data.items() if k not in request_fields()}
+
+def outline_params(payload):
+    """从请求体中读取教学大纲生成参数（agenerate_teaching_outline 的关键字参数）"""
+    return {
+        # 基本信息
+        'course_name': (payload.get('course_name') or '').strip(),
+        'write_date': (payload.get('write_date') or '').strip(),
+        'assessment_method': (payload.get('assessment_method') or '').strip(),
+        # AI生成参数
+        'exclude_items': (payload.get('exclude_items') or '').strip(),
+        'focus_modules': (payload.get('focus_modules') or '').strip(),
+        'prompt_mode': (payload.get('prompt_mode') or 'full').strip() or 'full',
+        'structured_output': (payload.get('structured_output') or 'json_object').strip() or 'json_object',
+        'repair_missing': bool(payload.get('repair_missing', True)),
+        'model_routing': payload.get('model_routing'),
+        # 用户明确要求重新生成时不复用历史大纲库
+        'use_library': False if payload.get('regenerate') else payload.get('use_library'),
+        # AI精细控制参数
+        'system_prompt': (payload.get('system_prompt') or '').strip(),
+        'user_prompt': (payload.get('user_prompt') or '').strip(),
+        # 大模型设置
+        'llm_provider': (payload.get('llm_provider') or '').strip(),
+        'llm_api_key': (payload.get('llm_api_key') or '').strip(),
+        'llm_model': (payload.get('llm_model') or '').strip(),
+        # 字数控制参数
+        **length_settings(payload),
+    }
+
+def length_settings(payload):
+    """字数控制参数，请求未提供时使用配置 [ai] 缺省值"""
+    return {key: payload.get(key) or default for key, default in ai_defaults().items()}
+
+@bp.route('/teaching-outline/regenerate', methods=['POST'])
+def regenerate_teaching_outline_api():
+    """教学大纲增量生成API：只重新生成受用户修改影响的字段"""
+    payload = request.get_json(force=True) or {}
     
-    # 字数控制参数
-    positioning_length = payload.get('positioning_length', 100)
-    objectives_length = payload.get('objectives_length', 80)
-    module_content_length = payload.get('module_content_length', 60)
+    previous = payload.get('outline') or {}
+    changes = payload.get('changes') or {}
+    if not isinstance(previous, dict) or not previous.get('课程名称'):
+        return jsonify({'error': '缺少原教学大纲内容'}), 400
     
-    if not course_name:
-        return jsonify({'error': '课程名称不能为空'}), 400
-        
     try:
-        # 生成教学大纲内容
-        outline_data = generate_teaching_outline(
-            course_name=course_name,
-            write_date=write_date,
-            assessment_method=assessment_method,
-            exclude_items=exclude_items,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            llm_provider=llm_provider,
-            llm_api_key=llm_api_key,
-            llm_model=llm_model,
-            positioning_length=positioning_length,
-            objectives_length=objectives_length,
-            module_content_length=module_content_length
+        reset_usage()
+        result = regenerate_outline(
+            previous,
+            edited=changes.get('edited') or {},
+            exclude_items=(changes.get('exclude_items') or '').strip(),
+            rewrite_modules=changes.get('rewrite_modules') or [],
+            llm_provider=(payload.get('llm_provider') or '').strip(),
+            llm_api_key=(payload.get('llm_api_key') or '').strip(),
+            llm_model=(payload.get('llm_model') or '').strip(),
+            **length_settings(payload),
+            structured_output=(payload.get('structured_output') or 'json_object').strip()
         )
         
-        return jsonify(outline_data)
+        response = jsonify(result)
+        response.headers.update(usage_headers())
+        return response
         
+    except DeadlineExceeded as e:
+        current_app.logger.error(f'增量生成教学大纲超时: {str(e)}')
+        return jsonify({'error': f'生成超时: {str(e)}'}), 504
     except Exception as e:
-        current_app.logger.error(f'生成教学大纲失败: {str(e)}')
+        current_app.logger.error(f'增量生成教学大纲失败: {str(e)}')
         return jsonify({'error': f'生成失败: {str(e)}'}), 500
 
+@bp.route('/teaching-outline/library/search', methods=['GET'])
+def search_outline_library():
+    """在历史大纲库中查找相似课程，可作为生成的参考"""
+    course_name = request.args.get('course_name', '').strip()
+    if not course_name:
+        return jsonify({'error': '课程名称不能为空'}), 400
+    
+    threshold = request.args.get('threshold', type=float) or get_setting('library', 'seed_threshold', fallback=75.0, type=float)
+    limit = request.args.get('limit', 5, type=int)
+    return jsonify({'matches': get_library().search(course_name, threshold=threshold, limit=limit)})
+
+@bp.route('/teaching-outline/library/<int:outline_id>', methods=['GET'])
+def get_library_outline(outline_id):
+    """读取一条历史大纲，course_name 参数给出时改写为该课程"""
+    record = get_library().get(outline_id)
+    if not record:
+        return jsonify({'error': '历史大纲不存在'}), 404
+    
+    course_name = request.args.get('course_name', '').strip()
+    if course_name:
+        outline = adapt_outline(record['outline'], record['course_name'], course_name)
+        outline['课程名称'] = course_name
+        record['outline'] = outline
+    return jsonify(record)
+
 @bp.route('/teaching-outline/preview', methods=['POST'])
 def preview_teaching_outline():
     """预览生成的教学大纲"""
     payload = request.get_json(force=True) or {}
     
-    # 读取教学大纲模板
-    template_path = os.path.join(PROJECT_ROOT, 'templates', '教学大纲模板.md')
+    try:
+        template_id = request.args.get('template')
+        get_template(template_id, 'md')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        # 替换模板变量
-        for key, value in payload.items():
-            if value:
-                template_content = template_content.replace(f'{{{{{key}}}}}', str(value))
+        # 按教学大纲模板（?template=模板ID，默认为配置中的默认模板）导出 Markdown
+        template_content = export_markdown(build_outline(payload), template_id)
         
         # 保存生成的文件
         output_path = os.path.join(current_app.config['OUTPUT_FOLDER'], '教学大纲.md')
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(template_content)
+        artifact_id = save_artifact(template_content.encode('utf-8'))
+        # 提前转换并缓存，随后的预览页请求只需查找
+        get_markdown_cache().render(template_content, digest=artifact_id)
         
-        return render_template('teaching_outline_preview.html', 
-                             markdown_content=template_content,
-                             download_url=url_for('main.download_teaching_outline'))
+        return redirect(url_for('main.show_teaching_outline_preview', artifact_id=artifact_id), code=303)
         
     except Exception as e:
         current_app.logger.error(f'预览教学大纲失败: {str(e)}')
         return jsonify({'error': f'预览失败: {str(e)}'}), 500
 
+@bp.route('/teaching-outline/preview/<artifact_id>', methods=['GET'])
+def show_teaching_outline_preview(artifact_id):
+    """教学大纲预览页"""
+    response = render_markdown_page(artifact_id, 'teaching_outline_preview.html',
+                                    url_for('main.download_teaching_outline', id=artifact_id))
+    if response is None:
+        return redirect(url_for('main.teaching_outline'))
+    return response
+
 @bp.route('/download/teaching-outline', methods=['GET'])
 def download_teaching_outline():
     """下载生成的教学大纲"""
+    response = send_artifact(request.args.get('id'), '教学大纲.md')
+    if response is not None:
+        return response
     output_path = os.path.join(current_app.config['OUTPUT_FOLDER'], '教学大纲.md')
     if not os.path.exists(output_path):
         return redirect(url_for('main.teaching_outline'))
@@ -223,31 +569,108 @@ def generate_word_document():
         return jsonify({'error': '课程名称不能为空'}), 400
     
     try:
-        # 生成Word文档
-        word_path = create_word_from_outline(
-            outline_data=payload,
-            course_name=course_name,
-            output_dir=current_app.config['OUTPUT_FOLDER']
-        )
+        template_id = request.args.get('template')
+        get_template(template_id, 'docx')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        # 生成Word文档（?template=模板ID；相同大纲与模板的重复导出直接取缓存）
+        data, etag, hit = export_docx(build_outline(payload), template_id)
+        word_path = write_word_file(data, word_output_path(course_name, current_app.config['OUTPUT_FOLDER']))
         
-        # 返回下载链接
+        # 写入共享存储，返回下载链接
         filename = os.path.basename(word_path)
-        download_url = url_for('main.download_word_document', filename=filename)
+        artifact_id = save_artifact(data)
+        download_url = url_for('main.download_word_document', filename=filename, id=artifact_id)
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'filename': filename,
             'download_url': download_url,
             'message': 'Word文档生成成功'
         })
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        if etag:
+            response.set_etag(etag)
+        return response
         
+    except DeadlineExceeded as e:
+        current_app.logger.error(f'生成Word文档超时: {str(e)}')
+        return jsonify({'error': f'生成超时: {str(e)}'}), 504
     except Exception as e:
         current_app.logger.error(f'生成Word文档失败: {str(e)}')
         return jsonify({'error': f'生成失败: {str(e)}'}), 500
 
+@bp.route('/teaching-outline/export', methods=['POST'])
+def export_teaching_outline():
+    """
+    一次导出多种格式
+
+    请求体：{"outline": 大纲数据} 或 {"outline_id": 生成接口返回的 X-Outline-Id}，
+    以及 "formats": ["md", "html", "docx"]（默认全部）、"templates": {"md": 模板ID, "docx": 模板ID}
+    （可选，默认为配置中的默认模板）。大纲只解析一次，各格式共用
+    """
+    payload = request.get_json(force=True) or {}
+    formats = payload.get('formats') or list(EXPORT_FORMATS)
+    if isinstance(formats, str):
+        formats = [f.strip() for f in formats.split(',') if f.strip()]
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        return jsonify({'error': f"不支持的导出格式: {', '.join(map(str, unknown))}"}), 400
+    templates = payload.get('templates') or {}
+    if not isinstance(templates, dict):
+        return jsonify({'error': 'templates 应为 {"md": 模板ID, "docx": 模板ID}'}), 400
+    try:
+        for kind in ('md', 'docx'):
+            get_template(templates.get(kind), kind)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if payload.get('outline'):
+        outline = build_outline(payload['outline'])
+    else:
+        outline = get_outline(payload.get('outline_id') or '')
+        if outline is None:
+            return jsonify({'error': '大纲不存在或已过期，请提交完整的大纲数据'}), 404
+    if not outline.course_name:
+        return jsonify({'error': '课程名称不能为空'}), 400
+    
+    try:
+        results = export_outline(outline, formats, templates)
+    except DeadlineExceeded as e:
+        current_app.logger.error(f'导出教学大纲超时: {str(e)}')
+        return jsonify({'error': f'导出超时: {str(e)}'}), 504
+    except Exception as e:
+        current_app.logger.error(f'导出教学大纲失败: {str(e)}')
+        return jsonify({'error': f'导出失败: {str(e)}'}), 500
+    
+    basename = os.path.splitext(os.path.basename(word_output_path(outline.course_name, '')))[0]
+    files = {}
+    for fmt, data in results.items():
+        filename = basename + EXPORT_FORMATS[fmt][0]
+        artifact_id = save_artifact(data)
+        files[fmt] = {
+            'filename': filename,
+            'size': len(data),
+            'download_url': url_for('main.download_export', artifact_id=artifact_id, filename=filename),
+        }
+    return jsonify({'outline_id': outline.digest, 'files': files})
+
+@bp.route('/download/export/<artifact_id>/<filename>', methods=['GET'])
+def download_export(artifact_id, filename):
+    """下载导出的文件（共享存储中的内容寻址文件）"""
+    response = send_artifact(artifact_id, filename)
+    if response is None:
+        return jsonify({'error': '文件不存在'}), 404
+    return response
+
 @bp.route('/download/word/<filename>', methods=['GET'])
 def download_word_document(filename):
     """下载Word文档"""
+    response = send_artifact(request.args.get('id'), filename)
+    if response is not None:
+        return response
     file_path = os.path.join(current_app.config['OUTPUT_FOLDER'], filename)
     
     if not os.path.exists(file_path):
@@ -256,17 +679,26 @@ def download_word_document(filename):
     
     return send_file(file_path, as_attachment=True, download_name=filename)
 
+@bp.route('/templates', methods=['GET'])
+def list_templates():
+    """已加载的模板及其占位符：kind=docx/md 只列出一类"""
+    kind = request.args.get('kind')
+    if kind and kind not in TEMPLATE_KINDS.values():
+        return jsonify({'error': f'不支持的模板类型: {kind}'}), 400
+    registry = get_template_registry()
+    return jsonify({'templates': [info.to_dict() for info in registry.list(kind)], 'stats': registry.stats()})
+
 @bp.route('/template/download', methods=['GET'])
 def download_template_document():
-    """下载教学大纲模板文档"""
+    """下载教学大纲模板文档：type=docx/md/variables，id 为模板ID（默认为配置中的默认模板）"""
     template_type = request.args.get('type', 'docx')
     
-    if template_type == 'docx':
-        template_path = os.path.join(PROJECT_ROOT, 'templates', '教学大纲-模板.docx')
-        download_name = '教学大纲-模板.docx'
-    elif template_type == 'md':
-        template_path = os.path.join(PROJECT_ROOT, 'templates', '教学大纲模板.md')
-        download_name = '教学大纲模板.md'
+    if template_type in ('docx', 'md'):
+        try:
+            template_path = get_template(request.args.get('id'), template_type).path
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 404
+        download_name = os.path.basename(template_path)
     elif template_type == 'variables':
         template_path = os.path.join(PROJECT_ROOT, 'templates', '模板变量说明.md')
         download_name = '模板变量说明.md'
@@ -276,4 +708,4 @@ def download_template_document():
     if not os.path.exists(template_path):
         return jsonify({'error': '模板文件不存在'}), 404
     
-    return send_file(template_path, as_attachment=True, download_name=download_name)
\ No newline at end of file
+    return send_file(template_path, as_attachment=True, download_name=download_name, max_age=static_max_age())
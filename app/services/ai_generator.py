@@ -1,12 +1,56 @@
 import re
 import json
+import asyncio
 from typing import List, Dict, Any
 from loguru import logger
 
-try:
-    import requests  # 用于在线大模型接口
-except Exception:
-    requests = None  # 离线模式或未安装requests时回退
+from .deadline import DeadlineExceeded, raise_if_aborted
+from .knowledge_base import get_knowledge_base, plan_module_weeks
+from .llm_client import achat, run_sync
+from .app_config import get_setting
+from .module_rules import get_module_rules
+from .structured_output import build_response_format, object_schema, parse_structured
+from .token_counter import record_usage, set_usage_context
+from .token_budget import syllabus_max_tokens, syllabus_temperature
+
+
+# LLM 返回内容的 JSON Schema，用于结构化输出约束及响应校验
+SCHEDULE_ROW_SCHEMA = object_schema({
+    "周次": {"type": "integer"},
+    "教学内容": {"type": "string"},
+    "学时": {"type": "integer"},
+    "讲授": {"type": "array", "items": {"type": "string"}},
+    "实验/实践": {"type": "array", "items": {"type": "string"}},
+    "作业": {"type": "array", "items": {"type": "string"}},
+})
+
+# 分块生成：第一步只生成目标、内容、教学方法与周次→教学内容计划，第二步按周分块补全明细
+WEEK_PLAN_SCHEMA = object_schema({
+    "objectives": {"type": "string"},
+    "contents": {"type": "string"},
+    "teaching_methods": {"type": "string"},
+    "week_plan": {"type": "array", "items": object_schema({
+        "周次": {"type": "integer"},
+        "教学内容": {"type": "string"},
+        "学时": {"type": "integer"},
+    })},
+})
+
+WEEK_DETAIL_SCHEMA = object_schema({
+    "rows": {"type": "array", "items": object_schema({
+        "周次": {"type": "integer"},
+        "讲授": {"type": "array", "items": {"type": "string"}},
+        "实验/实践": {"type": "array", "items": {"type": "string"}},
+        "作业": {"type": "array", "items": {"type": "string"}},
+    })},
+})
+
+SYLLABUS_SCHEMA = object_schema({
+    "objectives": {"type": "string"},
+    "contents": {"type": "string"},
+    "teaching_methods": {"type": "string"},
+    "schedule_table": {"type": "array", "items": SCHEDULE_ROW_SCHEMA},
+})
 
 
 def _to_int(text: str, default: int | None = None) -> int | None:
@@ -71,75 +115,23 @@ def _gen_teaching_methods() -> str:
     return "\n".join([f"- {m}" for m in methods])
 
 
-def _detail_for_module(module: str) -> List[str]:
-    # 讲授要点（列表）
-    if "重点专题" in module:
-        topic = module.split("：", 1)[-1]
-        return ["原理与框架", "典型模型与结构", f"{topic}案例实战"]
-    if "导论" in module:
-        return ["课程目标", "环境与工具", "案例全景"]
-    if "基础" in module or "概念" in module:
-        return ["关键概念", "数据与特征", "评估指标"]
-    if "核心方法" in module:
-        return ["算法原理", "超参数", "适用场景"]
-    if "评估" in module or "调优" in module:
-        return ["误差分析", "调参流程", "对比实验"]
-    if "工程化" in module:
-        return ["代码规范", "版本管理", "协作流程"]
-    if "综合项目" in module:
-        return ["题目解析", "任务分解", "里程碑与验收"]
-    if "部署" in module:
-        return ["导出与推理", "接口与服务", "监控与回滚"]
-    if "汇报" in module or "选题" in module:
-        return ["选题建议", "调研报告", "展示要点"]
-    return ["知识点讲解", "示例拆解", "注意事项"]
+essential_practice_default = ["课堂实验/练习"]
 
 
-essential_practice_default = ["课堂实验/练习"]
+def _rules_for_module(module: str) -> tuple[List[str], List[str], List[str]]:
+    # 讲授要点、实验/实践、作业（规则见 templates/module_rules.yaml）
+    return get_module_rules().lookup(module)
 
 
-def _practice_for_module(module: str) -> List[str]:
-    # 实验/实践（列表）
-    if "重点专题" in module:
-        topic = module.split("：", 1)[-1]
-        return [f"实现{topic}基础流程", "完成训练与验证"]
-    if "导论" in module:
-        return ["环境搭建", "第一个Hello World"]
-    if "基础" in module or "概念" in module:
-        return ["数据读取/预处理", "可视化"]
-    if "核心方法" in module:
-        return ["基线模型训练", "效果对比"]
-    if "评估" in module or "调优" in module:
-        return ["调参实验", "误差分析"]
-    if "工程化" in module:
-        return ["项目结构化", "单元测试"]
-    if "综合项目" in module:
-        return ["项目关键模块实现"]
-    if "部署" in module:
-        return ["导出模型", "构建推理服务"]
-    return essential_practice_default
-
-
-def _homework_for_module(module: str) -> List[str]:
-    # 作业（列表）
-    if "重点专题" in module:
-        topic = module.split("：", 1)[-1]
-        return [f"撰写{topic}学习小结", "整理关键超参数"]
-    if "导论" in module:
-        return ["安装环境并提交截图"]
-    if "基础" in module or "概念" in module:
-        return ["完成数据处理脚本并说明"]
-    if "核心方法" in module:
-        return ["对比两种方法的效果并报告"]
-    if "评估" in module or "调优" in module:
-        return ["提交调参日志", "对比表"]
-    if "工程化" in module:
-        return ["整理代码规范检查清单"]
-    if "综合项目" in module:
-        return ["提交阶段报告", "下一步计划"]
-    if "部署" in module:
-        return ["部署方案设计", "风控说明"]
-    return ["阅读/小测/代码补全"]
+def _review_week(num_weeks: int, hours: int = 4) -> Dict[str, Any]:
+    return {
+        '周次': num_weeks,
+        '教学内容': '复习与答疑',
+        '学时': hours,
+        '讲授': ['整体回顾', '错题分析', '易混淆点梳理'],
+        '实验/实践': ['综合练习', '模拟测试'],
+        '作业': ['期末复习', '项目收尾'],
+    }
 
 
 def _gen_schedule(course_name: str, total_hours: int | None, num_weeks: int,
@@ -222,9 +214,7 @@ def _gen_schedule(course_name: str, total_hours: int | None, num_weeks: int,
     rows: List[Dict[str, Any]] = []
     for i in range(1, content_weeks + 1):
         module = modules[i - 1]
-        detail = _detail_for_module(module)
-        practice = _practice_for_module(module)
-        homework = _homework_for_module(module)
+        detail, practice, homework = _rules_for_module(module)
         rows.append({
             "周次": i,
             "教学内容": module,
@@ -235,17 +225,64 @@ def _gen_schedule(course_name: str, total_hours: int | None, num_weeks: int,
         })
 
     # 最后一周固定复习与答疑
-    rows.append({
-        "周次": weeks,
-        "教学内容": "复习与答疑",
-        "学时": avg,
-        "讲授": ["整体回顾", "错题分析", "易混淆点梳理"],
-        "实验/实践": ["综合练习", "模拟测试"],
-        "作业": ["期末复习", "项目收尾"],
-    })
+    rows.append(_review_week(weeks, avg))
     return rows
 
 
+def _gen_from_knowledge_base(course_name: str, total_hours: int | None, num_weeks: int,
+                             focus_points: str, exclude_points: str) -> Dict[str, Any] | None:
+    # 按离线知识库匹配课程主题，生成课程专属的目标、内容与进度表；未匹配时返回 None
+    kb = get_knowledge_base()
+    topic, _ = kb.match(course_name)
+    if not topic:
+        return None
+    focuses = _split_list(focus_points)
+    excludes = _split_list(exclude_points)
+    modules = kb.resolve_modules(topic, course_name, focuses, excludes)
+
+    bullets = [str(b).replace("{course}", course_name) for b in (topic.get("knowledge") or []) + (topic.get("skills") or [])]
+    bullets = [b for b in bullets if not any(x in b for x in excludes)]
+    if focuses:
+        bullets.insert(1, f"围绕重点专题：{'、'.join(focuses)}，形成系统化理解")
+    if exclude_points:
+        bullets.append(f"不展开/排除：{exclude_points}")
+    objectives = "\n".join([f"- {b}" for b in bullets])
+    contents = "\n".join([f"- {m['name']}" for m in modules])
+
+    weeks = max(2, int(num_weeks or 18))
+    avg = max(2, round(total_hours / weeks)) if total_hours and total_hours > 0 else 4
+    rows: List[Dict[str, Any]] = []
+    for i, parts in enumerate(plan_module_weeks(modules, weeks - 1), 1):
+        names, detail, practice, homework = [], [], [], []
+        for module, part, count in parts:
+            names.append(module["name"] if part == 1 else f"{module['name']}（续）")
+            # 模块跨多周时讲授要点按周拆分，最后一周加入难点突破
+            points = module["points"] or [module["name"]]
+            chunk = points[(part - 1) * len(points) // count:part * len(points) // count]
+            if part == count and count > 1:
+                chunk = chunk + [f"难点突破：{module['difficulty']}"]
+            detail.extend(chunk or [f"难点突破：{module['difficulty']}"])
+            practice.extend(module["practice"] if part == count or count == 1 else module["practice"][:1])
+            if part == count:
+                homework.extend(module["homework"])
+        rows.append({
+            "周次": i,
+            "教学内容": "；".join(names),
+            "学时": avg,
+            "讲授": detail,
+            "实验/实践": practice or essential_practice_default,
+            "作业": homework or ["课后练习与预习"],
+        })
+    rows.append(_review_week(weeks, avg))
+
+    return {
+        "objectives": objectives,
+        "contents": contents,
+        "teaching_methods": _gen_teaching_methods(),
+        "schedule_table": rows,
+    }
+
+
 def generate_syllabus_content(
     course_name: str,
     course_code: str | None = None,
@@ -259,18 +296,44 @@ def generate_syllabus_content(
     llm_provider: str | None = None,
     llm_api_key: str | None = None,
     llm_model: str | None = None,
+    structured_output: str = "json_object",
+) -> Dict[str, Any]:
+    """
+    生成教学大纲中由 AI 填充的字段（同步接口，参数与返回值同 agenerate_syllabus_content）。
+    """
+    return run_sync(agenerate_syllabus_content(
+        course_name, course_code, credit, hours, prerequisites_text, num_weeks,
+        focus_points, exclude_points, llm_provider, llm_api_key, llm_model, structured_output,
+    ))
+
+
+async def agenerate_syllabus_content(
+    course_name: str,
+    course_code: str | None = None,
+    credit: str | None = None,
+    hours: str | None = None,
+    prerequisites_text: str | None = None,
+    num_weeks: int = 18,
+    focus_points: str = "",
+    exclude_points: str = "",
+    llm_provider: str | None = None,
+    llm_api_key: str | None = None,
+    llm_model: str | None = None,
+    structured_output: str = "json_object",
 ) -> Dict[str, Any]:
     """
     生成教学大纲中由 AI 填充的字段。
     - 当提供 llm_provider + llm_api_key + llm_model 时，优先走在线 LLM；否则使用离线启发式生成。
+    - structured_output 指定在线 LLM 的结构化输出方式（none / json_object / json_schema）。
     返回 keys：objectives, contents, teaching_methods, schedule_table
     """
     total_hours = _to_int(hours, None)
 
     # 优先尝试在线 LLM
-    if llm_provider and llm_api_key and llm_model and requests is not None:
+    if llm_provider and llm_api_key and llm_model:
+        set_usage_context(course_name, structured_output=structured_output)
         try:
-            llm_result = _gen_with_llm(
+            llm_result = await _agen_with_llm(
                 provider=llm_provider,
                 api_key=llm_api_key,
                 model=llm_model,
@@ -279,13 +342,26 @@ def generate_syllabus_content(
                 total_hours=total_hours,
                 focus_points=focus_points or "",
                 exclude_points=exclude_points or "",
+                structured_output=structured_output,
             )
             if llm_result:
                 logger.info("LLM生成内容完成(provider={})", llm_provider)
                 return llm_result
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error("LLM 生成失败，回退离线：{}", str(e))
 
+    # 离线知识库
+    try:
+        kb_result = _gen_from_knowledge_base(course_name or "本课程", total_hours, int(num_weeks or 18),
+                                             focus_points, exclude_points)
+        if kb_result:
+            logger.info("AI生成内容完成(knowledge base)，weeks={} (含最后一周复习)，hours={}", int(num_weeks or 18), total_hours)
+            return kb_result
+    except Exception as e:
+        logger.error("离线知识库生成失败，回退通用模板：{}", str(e))
+
     # 离线启发式
     objectives = _gen_objectives(course_name or "本课程", focus_points, exclude_points)
     contents = _gen_contents(course_name or "本课程", focus_points)
@@ -303,21 +379,31 @@ def generate_syllabus_content(
     return result
 
 
-def _gen_with_llm(provider: str, api_key: str, model: str, course_name: str, num_weeks: int, total_hours: int | None, focus_points: str, exclude_points: str) -> Dict[str, Any] | None:
+async def _achat_completion(provider: str, api_key: str, model: str, sys_prompt: str, user_content: str,
+                            response_format: Dict[str, Any] | None, stage: str, max_tokens: int | None = None) -> str | None:
+    # 调用 Chat Completions 接口，返回 choices[0].message.content；采样温度取自配置 [ai] syllabus_temperature
+    content, _, usage = await achat(provider, api_key, [
+        {"role": "system", "content": sys_prompt},
+        {"role": "user", "content": user_content}
+    ], model, temperature=syllabus_temperature(), max_tokens=max_tokens, response_format=response_format)
+    if content:
+        record_usage(stage, provider, model, sys_prompt + user_content, content, usage)
+    return content
+
+
+async def _agen_with_llm(provider: str, api_key: str, model: str, course_name: str, num_weeks: int, total_hours: int | None, focus_points: str, exclude_points: str,
+                  structured_output: str = "json_object") -> Dict[str, Any] | None:
     """使用在线大模型生成：目前支持 provider in {openai, deepseek}，统一走 Chat Completions 风格接口。
     预期返回与离线版本一致的数据结构。
+    配置 [syllabus] chunked 开启时先生成周次→模块计划，再按周分块并发补全讲授/实验/作业。
     """
     provider = (provider or '').lower()
     if provider not in ("openai", "deepseek"):
         raise ValueError("Unsupported provider: " + provider)
 
-    # 目标端点
-    if provider == 'openai':
-        base_url = 'https://api.openai.com/v1/chat/completions'
-        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    else:  # deepseek
-        base_url = 'https://api.deepseek.com/chat/completions'
-        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    if get_setting('syllabus', 'chunked', fallback=True, type=bool) and num_weeks > 2:
+        return await _agen_with_llm_chunked(provider, api_key, model, course_name, num_weeks, total_hours,
+                                            focus_points, exclude_points, structured_output)
 
     # 统一提示词，要求JSON输出
     sys_prompt = (
@@ -339,60 +425,28 @@ def _gen_with_llm(provider: str, api_key: str, model: str, course_name: str, num
         "exclude_points": exclude_points,
     }
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": json.dumps(user_prompt, ensure_ascii=False)}
-        ],
-        "temperature": 0.3,
-    }
-
-    resp = requests.post(base_url, headers=headers, json=payload, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
-
-    # 解析 choices[0].message.content
-    content = None
-    try:
-        content = data.get('choices', [{}])[0].get('message', {}).get('content')
-    except Exception:
-        content = None
-
+    content = await _achat_completion(provider, api_key, model, sys_prompt, json.dumps(user_prompt, ensure_ascii=False),
+                               build_response_format(provider, structured_output, SYLLABUS_SCHEMA, name="syllabus"),
+                               'syllabus', max_tokens=syllabus_max_tokens(provider, weeks=num_weeks, sections=True))
     if not content:
         # deepseek 可能也有相同字段结构；若没有，直接回退
         return None
 
-    # 期望content是JSON字符串
-    try:
-        obj = json.loads(content)
-    except Exception:
-        # 尝试从 Markdown 代码块中提取
-        import re as _re
-        m = _re.search(r"```(?:json)?\s*([\s\S]*?)```", content)
-        if m:
-            try:
-                obj = json.loads(m.group(1))
-            except Exception:
-                return None
-        else:
-            return None
+    obj, _ = parse_structured(content, SYLLABUS_SCHEMA)
+    if not obj:
+        return None
 
-    # 规范化 schedule_table：确保每行列表字段为数组
-    rows = obj.get('schedule_table') or []
+    # 规范化 schedule_table：Schema 已规整字段类型，这里补齐缺失字段
     norm_rows: List[Dict[str, Any]] = []
-    for i, row in enumerate(rows):
-        if not isinstance(row, dict):
-            continue
-        r = {
+    for i, row in enumerate(obj.get('schedule_table') or []):
+        norm_rows.append({
             '周次': row.get('周次') or (i + 1),
             '教学内容': row.get('教学内容') or '',
             '学时': row.get('学时') or 4,
-            '讲授': row.get('讲授') if isinstance(row.get('讲授'), list) else [],
-            '实验/实践': row.get('实验/实践') if isinstance(row.get('实验/实践'), list) else [],
-            '作业': row.get('作业') if isinstance(row.get('作业'), list) else [],
-        }
-        norm_rows.append(r)
+            '讲授': row.get('讲授') or [],
+            '实验/实践': row.get('实验/实践') or [],
+            '作业': row.get('作业') or [],
+        })
 
     # 保底：长度修正与末周追加
     if not norm_rows or len(norm_rows) < num_weeks:
@@ -402,14 +456,7 @@ def _gen_with_llm(provider: str, api_key: str, model: str, course_name: str, num
         else:
             # 截断为 num_weeks-1 并确保最后一周为复习与答疑
             norm_rows = norm_rows[: max(0, num_weeks - 1)]
-            norm_rows.append({
-                '周次': num_weeks,
-                '教学内容': '复习与答疑',
-                '学时': 4,
-                '讲授': ['整体回顾', '错题分析', '易混淆点梳理'],
-                '实验/实践': ['综合练习', '模拟测试'],
-                '作业': ['期末复习', '项目收尾'],
-            })
+            norm_rows.append(_review_week(num_weeks))
     else:
         # 截断为 num_weeks
         norm_rows = norm_rows[:num_weeks]
@@ -420,4 +467,114 @@ def _gen_with_llm(provider: str, api_key: str, model: str, course_name: str, num
         'teaching_methods': obj.get('teaching_methods') or _gen_teaching_methods(),
         'schedule_table': norm_rows if norm_rows else _gen_schedule(course_name, total_hours, num_weeks, focus_points, exclude_points)
     }
-    return result
\ No newline at end of file
+    return result
+
+async def _agen_with_llm_chunked(provider: str, api_key: str, model: str, course_name: str, num_weeks: int,
+                                 total_hours: int | None, focus_points: str, exclude_points: str,
+                                 structured_output: str = "json_object") -> Dict[str, Any] | None:
+    """两步生成：先生成周次→教学内容计划，再按 [syllabus] chunk_weeks 周一块并发（最多 max_workers 个）生成讲授/实验/作业。
+    合并后校验周次连续、末周固定为复习与答疑；缺失的周次以离线规则补齐。
+    """
+    content_weeks = num_weeks - 1
+    avg = max(2, round(total_hours / num_weeks)) if total_hours and total_hours > 0 else 4
+
+    # 第一步：周次计划
+    plan_prompt = (
+        "你是一名教务专家，请根据课程信息生成教学大纲的课程目标、课程内容、教学方法，以及教学周计划。\n"
+        f"week_plan 为长度={content_weeks}的数组，周次从1到{content_weeks}，每周给出教学内容（模块标题）与学时；"
+        "重点项优先分配到第3~8周，不要包含复习与答疑周。\n"
+        "仅返回JSON对象，键必须为 objectives, contents, teaching_methods, week_plan。"
+    )
+    plan_input = json.dumps({
+        "course_name": course_name,
+        "num_weeks": num_weeks,
+        "total_hours": total_hours,
+        "focus_points": focus_points,
+        "exclude_points": exclude_points,
+    }, ensure_ascii=False)
+    content = await _achat_completion(provider, api_key, model, plan_prompt, plan_input,
+                                      build_response_format(provider, structured_output, WEEK_PLAN_SCHEMA,
+                                                            name="week_plan"),
+                                      'syllabus_plan',
+                                      max_tokens=syllabus_max_tokens(provider, plan_weeks=content_weeks, sections=True))
+    if not content:
+        return None
+    plan, _ = parse_structured(content, WEEK_PLAN_SCHEMA)
+    if not plan:
+        return None
+
+    # 校验计划：按顺序重新编号，缺失的周以离线计划补齐
+    offline = _gen_schedule(course_name, total_hours, num_weeks, focus_points, exclude_points)
+    planned = [row for row in plan.get('week_plan') or []
+               if (row.get('教学内容') or '').strip() not in ('', '复习与答疑')][:content_weeks]
+    week_plan = []
+    for week in range(1, content_weeks + 1):
+        row = planned[week - 1] if week <= len(planned) else offline[week - 1]
+        week_plan.append({'周次': week, '教学内容': row['教学内容'].strip(), '学时': row.get('学时') or avg})
+
+    # 第二步：分块并发生成每周明细
+    chunk_weeks = max(1, get_setting('syllabus', 'chunk_weeks', fallback=6, type=int))
+    chunks = [week_plan[i:i + chunk_weeks] for i in range(0, content_weeks, chunk_weeks)]
+    detail_prompt = (
+        "你是一名教务专家，请为以下教学周补全教学进度明细：每周给出讲授要点、实验/实践、作业（均为字符串列表）。\n"
+        "周次与给定计划一一对应，不要增删周次。\n"
+        "仅返回JSON对象，键为 rows，rows 中每项字段为 周次、讲授、实验/实践、作业。"
+    )
+    detail_format = build_response_format(provider, structured_output, WEEK_DETAIL_SCHEMA, name="week_detail")
+
+    max_workers = max(1, get_setting('syllabus', 'max_workers', fallback=4, type=int))
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def run(chunk):
+        chunk_input = json.dumps({
+            "course_name": course_name,
+            "focus_points": focus_points,
+            "exclude_points": exclude_points,
+            "weeks": [{'周次': w['周次'], '教学内容': w['教学内容']} for w in chunk],
+        }, ensure_ascii=False)
+        async with semaphore:
+            text = await _achat_completion(provider, api_key, model, detail_prompt, chunk_input, detail_format,
+                                           'syllabus_chunk', max_tokens=syllabus_max_tokens(provider, weeks=len(chunk)))
+        rows, _ = parse_structured(text or '', WEEK_DETAIL_SCHEMA)
+        return rows.get('rows') or []
+
+    details: Dict[int, Dict[str, Any]] = {}
+    results = raise_if_aborted(await asyncio.gather(*(run(chunk) for chunk in chunks), return_exceptions=True))
+    for chunk, rows in zip(chunks, results):
+        if isinstance(rows, Exception):
+            logger.error("进度表分块生成失败（第{}~{}周）：{}", chunk[0]['周次'], chunk[-1]['周次'], str(rows))
+            continue
+        expected = [w['周次'] for w in chunk]
+        for offset, row in enumerate(rows):
+            # 周次不在本块范围时按返回顺序对应
+            week = row.get('周次') if row.get('周次') in expected else (
+                expected[offset] if offset < len(expected) else None)
+            if week and week not in details:
+                details[week] = row
+
+    schedule: List[Dict[str, Any]] = []
+    missing = []
+    for week in week_plan:
+        row = details.get(week['周次']) or {}
+        if not (row.get('讲授') or row.get('实验/实践') or row.get('作业')):
+            missing.append(week['周次'])
+        detail, practice, homework = _rules_for_module(week['教学内容'])
+        schedule.append({
+            '周次': week['周次'],
+            '教学内容': week['教学内容'],
+            '学时': week['学时'],
+            '讲授': row.get('讲授') or detail,
+            '实验/实践': row.get('实验/实践') or practice,
+            '作业': row.get('作业') or homework,
+        })
+    schedule.append(_review_week(num_weeks, avg))
+    if missing:
+        logger.warning("进度表第{}周明细缺失，已按离线规则补齐", '、'.join(map(str, missing)))
+    logger.info("进度表分块生成完成：{}周，{}块", content_weeks, len(chunks))
+
+    return {
+        'objectives': plan.get('objectives') or _gen_objectives(course_name, focus_points, exclude_points),
+        'contents': plan.get('contents') or _gen_contents(course_name, focus_points),
+        'teaching_methods': plan.get('teaching_methods') or _gen_teaching_methods(),
+        'schedule_table': schedule,
+    }
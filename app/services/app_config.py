@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置读取
+供各服务模块读取 config.ini，支持 PyInstaller 打包后的资源路径
+"""
+
+import configparser
+import os
+import sys
+import threading
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config_path():
+    """获取 config.ini 路径：打包后位于临时资源目录，开发环境位于项目根目录"""
+    base_path = getattr(sys, '_MEIPASS', PROJECT_ROOT)
+    return os.path.join(base_path, 'config.ini')
+
+
+def get_config(reload=False):
+    """
+    读取配置文件（进程内缓存）
+
+    Args:
+        reload: 是否重新读取
+
+    Returns:
+        ConfigParser: 配置对象，配置文件不存在时为空配置
+    """
+    global _config
+    with _config_lock:
+        if _config is None or reload:
+            config = configparser.ConfigParser()
+            config_path = get_config_path()
+            if os.path.exists(config_path):
+                config.read(config_path, encoding='utf-8')
+            _config = config
+        return _config
+
+
+def get_setting(section, option, fallback=None, type=str):
+    """
+    读取单个配置项
+
+    Args:
+        section: 配置节
+        option: 配置项
+        fallback: 缺省值
+        type: 值类型，支持 str / int / float / bool
+
+    Returns:
+        配置值，缺失或格式错误时返回 fallback
+    """
+    config = get_config()
+    try:
+        if type is bool:
+            return config.getboolean(section, option, fallback=fallback)
+        if type is int:
+            return config.getint(section, option, fallback=fallback)
+        if type is float:
+            return config.getfloat(section, option, fallback=fallback)
+        return config.get(section, option, fallback=fallback)
+    except ValueError:
+        return fallback
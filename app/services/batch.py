@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成
+从课程清单（CSV、JSON Lines 或 XLSX）批量生成教学大纲，无需浏览器（python run.py batch）。
+大模型调用以 I/O 等待为主，在线程池中并发；Word 渲染占用 CPU，在进程池中并行。
+每门课程生成 Markdown 与 Word 两个文件，完成后写入检查点文件，中断后重新运行会跳过已完成的课程
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from loguru import logger
+
+from .template_registry import get_template
+from .word_generator import clean_filename
+
+
+# generate_teaching_outline 的参数；清单的列名可以是参数名或下列中文列名
+OUTLINE_FIELDS = (
+    'course_name', 'write_date', 'assessment_method', 'exclude_items', 'system_prompt', 'user_prompt',
+    'llm_provider', 'llm_api_key', 'llm_model', 'positioning_length', 'objectives_length',
+    'module_content_length', 'focus_modules', 'prompt_mode', 'structured_output', 'repair_missing',
+    'model_routing', 'use_library',
+)
+
+COLUMN_ALIASES = {
+    '课程名称': 'course_name',
+    '编写日期': 'write_date',
+    '考核方式': 'assessment_method',
+    '考核方式及成绩评定办法': 'assessment_method',
+    '排除内容': 'exclude_items',
+    '重点模块': 'focus_modules',
+    '系统提示词': 'system_prompt',
+    '用户提示词': 'user_prompt',
+    '课程定位字数': 'positioning_length',
+    '目标字数': 'objectives_length',
+    '模块内容字数': 'module_content_length',
+    '分组': 'group',
+}
+
+INT_FIELDS = ('positioning_length', 'objectives_length', 'module_content_length')
+BOOL_FIELDS = ('repair_missing', 'model_routing', 'use_library')
+
+# 不参与检查点键计算的字段（更换密钥不应导致重新生成）
+CHECKPOINT_EXCLUDED = ('llm_api_key',)
+
+CHECKPOINT_NAME = '.batch_checkpoint.jsonl'
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', '是')
+
+
+def normalize_row(raw):
+    """
+    清单中的一行转换为生成参数；空值视为未提供
+
+    额外的 group 列（分组）决定输出子目录，其余未知列忽略
+    """
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        key = COLUMN_ALIASES.get(str(key).strip(), str(key).strip())
+        if key not in OUTLINE_FIELDS and key != 'group':
+            continue
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        if key in INT_FIELDS:
+            value = int(float(value))
+        elif key in BOOL_FIELDS:
+            value = _to_bool(value)
+        elif isinstance(value, str):
+            value = value.strip()
+        row[key] = value
+    return row
+
+
+def _read_csv(path):
+    # utf-8-sig：兼容 Excel 导出的带 BOM 的 CSV
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _read_jsonl(path):
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"第{number}行不是有效的JSON: {e}") from None
+    return rows
+
+
+def _read_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("读取 XLSX 课程清单需要安装 openpyxl（pip install openpyxl），或将清单另存为 CSV") from None
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else None for cell in next(rows, ())]
+        return [dict(zip(header, values)) for values in rows if any(v is not None for v in values)]
+    finally:
+        workbook.close()
+
+
+READERS = {
+    '.csv': _read_csv,
+    '.jsonl': _read_jsonl,
+    '.ndjson': _read_jsonl,
+    '.xlsx': _read_xlsx,
+}
+
+
+def read_course_list(path):
+    """读取课程清单，返回生成参数列表（跳过没有课程名称的行）"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"不支持的课程清单格式: {ext}（支持 {', '.join(READERS)}）")
+    rows = [normalize_row(raw) for raw in READERS[ext](path)]
+    return [row for row in rows if row.get('course_name')]
+
+
+def job_key(index, row):
+    """检查点键：行号与生成参数相同才视为同一任务"""
+    params = {k: v for k, v in row.items() if k not in CHECKPOINT_EXCLUDED}
+    payload = json.dumps([index, params], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def job_dir(output_dir, index, row):
+    """输出目录：<输出目录>/[<分组>/]<序号>-<课程名称>"""
+    parts = [output_dir]
+    if row.get('group'):
+        parts.append(clean_filename(str(row['group'])))
+    parts.append(f"{index + 1:04d}-{clean_filename(row['course_name'])}")
+    return os.path.join(*parts)
+
+
+class Checkpoint:
+    """检查点文件：每完成（或失败）一门课程追加一行，重新运行时跳过已完成的课程"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """已完成任务的键集合（后写的记录覆盖先写的）"""
+        status = {}
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断时可能留下不完整的最后一行
+                    continue
+                status[record.get('key')] = record.get('status')
+        return {key for key, value in status.items() if value == 'done'}
+
+    def write(self, **record):
+        line = json.dumps({**record, 'time': time.time()}, ensure_ascii=False) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class ProgressBar:
+    """终端进度条：完成数、吞吐量（门/分钟）与预计剩余时间"""
+
+    def __init__(self, total, completed=0, stream=None, width=30):
+        self.total = total
+        self.completed = completed
+        self.failed = 0
+        self.width = width
+        self.stream = stream or sys.stderr
+        self._initial = completed
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def advance(self, failed=False):
+        with self._lock:
+            self.completed += 1
+            self.failed += int(failed)
+            self.render()
+
+    def render(self):
+        done = self.completed - self._initial
+        elapsed = time.monotonic() - self._start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        left = self.total - self.completed
+        eta = time.strftime('%H:%M:%S', time.gmtime(left / rate)) if rate > 0 else '--:--:--'
+        filled = int(self.width * self.completed / self.total) if self.total else self.width
+        self.stream.write(f"\r[{'#' * filled}{'.' * (self.width - filled)}] {self.completed}/{self.total} "
+                          f"失败 {self.failed} | {rate * 60:.1f} 门/分钟 | 剩余 {eta}  ")
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write('\n')
+        self.stream.flush()
+
+
+def generate_job(row, directory, with_docx, md_template=None):
+    """线程池任务：生成大纲并写入 Markdown，返回 (大纲数据, Word 路径)"""
+    from .exporters import export_markdown
+    from .outline_ir import build_outline
+    from .teaching_outline_generator import generate_teaching_outline
+
+    params = {k: v for k, v in row.items() if k in OUTLINE_FIELDS}
+    # 配置了大模型时，调用失败（密钥失效、额度用尽、网络错误）应记为失败以便重新运行时重试，
+    # 而不是把离线内容当作生成结果
+    outline_data = generate_teaching_outline(**params, fallback=False)
+    os.makedirs(directory, exist_ok=True)
+    name = clean_filename(row['course_name'])
+    md_path = os.path.join(directory, f"教学大纲-{name}.md")
+    tmp_path = f"{md_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(export_markdown(build_outline(outline_data), md_template))
+    os.replace(tmp_path, md_path)
+    return outline_data, os.path.join(directory, f"教学大纲-{name}.docx") if with_docx else None
+
+
+def render_job(outline_data, template_path, output_path):
+    """进程池任务：渲染 Word 文档并写入文件"""
+    from .word_generator import render_word_bytes, write_word_file
+
+    return write_word_file(render_word_bytes(outline_data, template_path), output_path)
+
+
+def run_batch(rows, output_dir, workers=4, render_processes=2, with_docx=True, defaults=None,
+              templates=None, progress=True):
+    """
+    批量生成教学大纲
+
+    Args:
+        rows: read_course_list 返回的生成参数列表
+        output_dir: 输出目录（检查点文件也保存在此）
+        workers: 生成大纲的线程数
+        render_processes: 渲染 Word 的进程数
+        with_docx: 是否生成 Word 文档
+        defaults: 清单中未提供时使用的参数（如大模型设置）
+        templates: 模板ID {'md': ID, 'docx': ID}，未指定的使用默认模板
+
+    Returns:
+        dict: total、skipped（此前已完成）、done、failed
+    """
+    templates = templates or {}
+    md_template = get_template(templates.get('md'), 'md').id
+    # 渲染进程按路径读取 Word 模板，不必各自扫描模板目录
+    docx_path = get_template(templates.get('docx'), 'docx').path if with_docx else None
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(output_dir, CHECKPOINT_NAME))
+    finished = checkpoint.load()
+    jobs = []
+    for index, row in enumerate(rows):
+        row = {**(defaults or {}), **row}
+        key = job_key(index, row)
+        if key not in finished:
+            jobs.append((index, key, row))
+
+    summary = {'total': len(rows), 'skipped': len(rows) - len(jobs), 'done': 0, 'failed': 0}
+    bar = ProgressBar(len(rows), summary['skipped']) if progress else None
+    if bar:
+        bar.render()
+
+    def finish(index, key, row, error=None):
+        if error is None:
+            summary['done'] += 1
+            checkpoint.write(key=key, index=index, course_name=row['course_name'], status='done')
+        else:
+            summary['failed'] += 1
+            logger.error("《{}》生成失败: {}", row['course_name'], error)
+            checkpoint.write(key=key, index=index, course_name=row['course_name'], status='failed',
+                             error=str(error))
+        if bar:
+            bar.advance(failed=error is not None)
+
+    generators = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='batch-generate')
+    renderers = ProcessPoolExecutor(max_workers=max(1, render_processes)) if with_docx else None
+    pending = {}
+    try:
+        for index, key, row in jobs:
+            future = generators.submit(generate_job, row, job_dir(output_dir, index, row), with_docx, md_template)
+            pending[future] = ('generate', index, key, row)
+        while pending:
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                kind, index, key, row = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    finish(index, key, row, e)
+                    continue
+                if kind == 'generate' and with_docx:
+                    outline_data, output_path = result
+                    pending[renderers.submit(render_job, outline_data, docx_path, output_path)] = (
+                        'render', index, key, row)
+                else:
+                    finish(index, key, row)
+    except KeyboardInterrupt:
+        for future in pending:
+            future.cancel()
+        raise
+    finally:
+        generators.shutdown(wait=True, cancel_futures=True)
+        if renderers:
+            renderers.shutdown(wait=True, cancel_futures=True)
+        if bar:
+            bar.close()
+    return summary
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存预热
+在低峰时段按请求频率统计取出最常用的 课程+参数 组合，预先生成（或刷新即将过期的）
+教学大纲存入历史大纲库，并渲染 Word 文档；模型调用按配置的速率限制间隔进行
+"""
+
+import threading
+import time
+from datetime import datetime
+import httpx
+from loguru import logger
+
+from .app_config import get_setting
+from .outline_library import get_library, library_ttl, save_outline, settings_signature
+from .request_stats import get_request_stats
+from .token_budget import ai_defaults
+
+
+# 参与历史大纲库签名的参数（与 agenerate_teaching_outline 一致）
+SIGNATURE_SETTINGS = (
+    'exclude_items', 'system_prompt', 'user_prompt', 'focus_modules',
+    'positioning_length', 'objectives_length', 'module_content_length',
+)
+
+
+def parse_hours(window):
+    """
+    解析低峰时段，如 "1-6" 表示 1:00~6:59，"22-5" 跨越午夜
+
+    Returns:
+        tuple: (开始小时, 结束小时)；格式错误时为 None（不限时段）
+    """
+    try:
+        start, end = (int(h) for h in str(window).split('-', 1))
+    except ValueError:
+        return None
+    return start % 24, end % 24
+
+
+def in_off_peak(now=None, window=None):
+    """当前是否处于低峰时段"""
+    hours = parse_hours(window if window is not None else get_setting('warmer', 'off_peak_hours', fallback='1-6'))
+    if hours is None:
+        return True
+    hour = (now or datetime.now()).hour
+    start, end = hours
+    return start <= hour <= end if start <= end else (hour >= start or hour <= end)
+
+
+class RateLimiter:
+    """按每分钟次数限制调用间隔"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+
+    def wait(self, stop_event=None):
+        """等待到允许下一次调用；stop_event 被设置时返回 False"""
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+        self._next = time.monotonic() + self.interval
+        return True
+
+
+def warmer_llm_settings():
+    """读取预热使用的模型设置（配置 [warmer]）"""
+    return {
+        'llm_provider': get_setting('warmer', 'llm_provider', fallback=''),
+        'llm_api_key': get_setting('warmer', 'llm_api_key', fallback=''),
+        'llm_model': get_setting('warmer', 'llm_model', fallback=''),
+    }
+
+
+def warm_course(course_name, settings, llm, output_dir=None):
+    """
+    生成一门课程的教学大纲，保存到历史大纲库并渲染 Word 文档
+
+    Returns:
+        dict: 生成的大纲内容
+
+    Raises:
+        OutlineGenerationError: 补全后仍有字段缺失（不保存，避免之后的请求复用残缺的大纲）
+    """
+    from .model_router import generate_with_routing, routing_enabled
+    from .teaching_outline_generator import (
+        OutlineGenerationError, find_invalid_fields, generate_with_ai, request_fields,
+    )
+
+    generate = generate_with_routing if routing_enabled() else generate_with_ai
+    defaults = ai_defaults()
+    outline = generate(
+        course_name, settings.get('exclude_items'),
+        settings.get('system_prompt'), settings.get('user_prompt'),
+        llm['llm_provider'], llm['llm_api_key'], llm['llm_model'],
+        settings.get('positioning_length') or defaults['positioning_length'],
+        settings.get('objectives_length') or defaults['objectives_length'],
+        settings.get('module_content_length') or defaults['module_content_length'],
+        focus_modules=settings.get('focus_modules'),
+        prompt_mode=settings.get('prompt_mode') or 'full',
+        structured_output=settings.get('structured_output') or 'json_object',
+    )
+    invalid_fields = find_invalid_fields(outline)
+    if invalid_fields:
+        raise OutlineGenerationError(f"大模型生成的内容不完整，{len(invalid_fields)}个字段缺失: "
+                                     f"{', '.join(invalid_fields[:10])}")
+    save_outline(course_name, outline, settings_signature(**{k: settings.get(k) for k in SIGNATURE_SETTINGS}))
+
+    if output_dir:
+        from .word_generator import create_word_from_outline
+        # 编写日期、考核方式由用户下载前填写，预渲染使用默认值
+        outline_data = {'课程名称': course_name, **request_fields(), **outline}
+        create_word_from_outline(outline_data, course_name, output_dir)
+    return outline
+
+
+def warm_top_courses(top_n=None, output_dir=None, stop_event=None, llm=None):
+    """
+    预热请求最多的课程
+
+    历史大纲库中已有且保存时间未超过 refresh_after 的组合跳过；超过的重新生成以便在
+    库有效期（[library] ttl）到期前刷新。遇到提供商限流（HTTP 429）时结束本轮
+
+    Args:
+        top_n: 预热的组合数，None 表示使用配置 [warmer] top_n
+        output_dir: Word 文档输出目录，None 表示只生成大纲
+        stop_event: threading.Event，设置后尽快结束
+        llm: 模型设置，None 表示使用配置 [warmer]
+
+    Returns:
+        dict: {'generated', 'skipped', 'failed'} 各计数
+    """
+    llm = llm or warmer_llm_settings()
+    summary = {'generated': 0, 'skipped': 0, 'failed': 0}
+    if not (llm['llm_provider'] and llm['llm_api_key']):
+        logger.warning("缓存预热未配置模型（[warmer] llm_provider / llm_api_key），跳过")
+        return summary
+
+    if top_n is None:
+        top_n = get_setting('warmer', 'top_n', fallback=20, type=int)
+    days = get_setting('warmer', 'stats_days', fallback=30, type=int)
+    refresh_after = get_setting('warmer', 'refresh_after', fallback=86400.0, type=float)
+    ttl = library_ttl()
+    if ttl:
+        refresh_after = min(refresh_after, ttl)
+    limiter = RateLimiter(get_setting('warmer', 'rate_per_minute', fallback=6.0, type=float))
+
+    for entry in get_request_stats().top(top_n, days):
+        if stop_event is not None and stop_event.is_set():
+            break
+        course_name, settings = entry['course_name'], entry['settings']
+        signature = settings_signature(**{k: settings.get(k) for k in SIGNATURE_SETTINGS})
+        age = get_library().age(course_name, signature)
+        if age is not None and age < refresh_after:
+            summary['skipped'] += 1
+            continue
+        if not limiter.wait(stop_event):
+            break
+        try:
+            warm_course(course_name, settings, llm, output_dir)
+            summary['generated'] += 1
+            logger.info("缓存预热完成《{}》(请求 {} 次)", course_name, entry['count'])
+        except httpx.HTTPStatusError as e:
+            summary['failed'] += 1
+            if e.response.status_code == 429:
+                logger.warning("模型提供商限流，结束本轮缓存预热")
+                break
+            logger.error(f"缓存预热失败《{course_name}》: {e}")
+        except Exception as e:
+            summary['failed'] += 1
+            logger.error(f"缓存预热失败《{course_name}》: {e}")
+
+    logger.info("缓存预热结束: 生成 {generated}，跳过 {skipped}，失败 {failed}", **summary)
+    return summary
+
+
+def run_warmer_loop(output_dir=None, stop_event=None, check_interval=None):
+    """
+    定时预热：每隔 check_interval 秒检查一次，处于低峰时段且距上一轮超过 [warmer] interval 时执行一轮
+    """
+    stop_event = stop_event or threading.Event()
+    if check_interval is None:
+        check_interval = get_setting('warmer', 'check_interval', fallback=600.0, type=float)
+    last_run = None
+    while not stop_event.is_set():
+        interval = get_setting('warmer', 'interval', fallback=21600.0, type=float)
+        if in_off_peak() and (last_run is None or time.monotonic() - last_run >= interval):
+            last_run = time.monotonic()
+            try:
+                warm_top_courses(output_dir=output_dir, stop_event=stop_event)
+            except Exception as e:
+                logger.error(f"缓存预热异常: {e}")
+        stop_event.wait(check_interval)
+
+
+def start_warmer(output_dir=None):
+    """
+    在后台守护线程中运行定时预热
+
+    Returns:
+        threading.Event: 设置后预热线程退出
+    """
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_warmer_loop, args=(output_dir, stop_event),
+                              name='cache-warmer', daemon=True)
+    thread.start()
+    logger.info("缓存预热线程已启动（低峰时段: {}）", get_setting('warmer', 'off_peak_hours', fallback='1-6'))
+    return stop_event
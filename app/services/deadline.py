@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求截止时间与取消
+每个请求的截止时间保存在上下文变量中，模型调用与 Word 渲染据此限制等待时间；
+客户端断开连接时取消仍在进行的生成任务，释放被占用的模型调用
+"""
+
+import asyncio
+import select
+import socket
+import time
+from contextvars import ContextVar
+from loguru import logger
+
+
+# 客户端可通过该请求头指定本次请求的超时秒数
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+_deadline = ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求已超过截止时间"""
+
+
+class ClientDisconnected(Exception):
+    """客户端已断开连接"""
+
+
+def parse_timeout(value, default, maximum):
+    """
+    解析请求头中的超时秒数
+
+    Returns:
+        float: 超时秒数；缺失或格式错误时为 default，且不超过 maximum
+    """
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = default
+    if seconds <= 0:
+        seconds = default
+    return min(seconds, maximum)
+
+
+def set_deadline(seconds):
+    """设置当前请求的截止时间（seconds 秒后），None 表示不限"""
+    _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def remaining(default=None):
+    """距截止时间的剩余秒数，未设置截止时间时返回 default"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return deadline - time.monotonic()
+
+
+def check_deadline(stage):
+    """已超过截止时间时抛出 DeadlineExceeded"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"{stage}超过请求截止时间")
+
+
+def bounded_timeout(timeout, stage):
+    """取 timeout 与剩余时间中较小者，已超时时抛出 DeadlineExceeded"""
+    check_deadline(stage)
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
+
+
+def raise_if_aborted(results):
+    """
+    检查 asyncio.gather(..., return_exceptions=True) 的结果：其中有超时或被取消的任务时重新抛出，
+    不当作单个任务失败处理（否则超时的请求会以部分离线内容返回成功）
+    """
+    for result in results:
+        if isinstance(result, (DeadlineExceeded, asyncio.CancelledError)):
+            raise result
+    return results
+
+
+def client_disconnected(environ):
+    """
+    检查客户端是否已断开连接（仅支持暴露 werkzeug.socket 的服务器，其他服务器返回 False）
+
+    连接可读且读到 EOF 即表示对端已关闭；请求体已读完，因此不会误读到请求数据
+    """
+    sock = environ.get('werkzeug.socket')
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except ValueError:
+        # TLS 连接不支持 MSG_PEEK，无法判断
+        return False
+    except OSError:
+        return True
+
+
+async def run_until_disconnected(coro, environ, poll_interval=0.5):
+    """
+    运行协程，期间定期检查客户端连接；断开时取消协程（连同其中的模型请求）并抛出 ClientDisconnected
+    """
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=poll_interval)
+        if done:
+            return task.result()
+        if client_disconnected(environ):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            logger.warning("客户端已断开连接，取消生成任务")
+            raise ClientDisconnected()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word文档缓存
+以 规范化的大纲数据 + 模板文件内容摘要 为键缓存渲染好的 .docx 字节，
+同一大纲重复导出时直接返回缓存；模板文件内容变化后旧模板的缓存自动失效
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from loguru import logger
+
+from .app_config import get_setting
+
+
+def canonical_outline_hash(outline_data):
+    """大纲数据的稳定摘要：键排序、统一换行符后序列化"""
+    def normalize(value):
+        if isinstance(value, str):
+            return value.replace('\r\n', '\n')
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    payload = json.dumps(normalize(outline_data), ensure_ascii=False, sort_keys=True,
+                         separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DocxCache:
+    """
+    渲染结果缓存（LRU，按总字节数与条目数限制）
+
+    模板摘要按 (mtime, size) 缓存，文件变化时重新计算；摘要改变时清除该模板的全部条目
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=128):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 键 → (模板路径, 字节)
+        self._size = 0
+        self._templates = {}  # 模板路径 → ((mtime, size), 内容摘要)
+        self._stats = {'hits': 0, 'misses': 0, 'invalidated': 0}
+
+    def template_hash(self, template_path):
+        """模板文件内容摘要；文件变化时清除旧模板的缓存"""
+        stat = os.stat(template_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            known = self._templates.get(template_path)
+            if known and known[0] == version:
+                return known[1]
+        with open(template_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with self._lock:
+            known = self._templates.get(template_path)
+            if known and known[1] != digest:
+                stale = [k for k, (path, _) in self._entries.items() if path == template_path]
+                for key in stale:
+                    self._size -= len(self._entries.pop(key)[1])
+                self._stats['invalidated'] += len(stale)
+                logger.info("Word模板已变化，清除 {} 条缓存: {}", len(stale), template_path)
+            self._templates[template_path] = (version, digest)
+        return digest
+
+    def cache_key(self, outline_data, template_path, outline_hash=None):
+        """缓存键（同时用作 ETag）；outline_hash 为已算好的大纲摘要时不再重复计算"""
+        combined = f"{self.template_hash(template_path)}:{outline_hash or canonical_outline_hash(outline_data)}"
+        return hashlib.sha256(combined.encode('utf-8')).hexdigest()
+
+    def get_or_render(self, outline_data, template_path, render, outline_hash=None):
+        """
+        读取缓存，未命中时调用 render(outline_data, template_path) 渲染并缓存
+
+        Returns:
+            tuple: (.docx 字节, 缓存键, 是否命中)
+        """
+        key = self.cache_key(outline_data, template_path, outline_hash)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1], key, True
+            self._stats['misses'] += 1
+
+        data = render(outline_data, template_path)
+        if len(data) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (template_path, data)
+                    self._size += len(data)
+                while self._entries and (self._size > self.max_bytes or len(self._entries) > self.max_entries):
+                    self._size -= len(self._entries.popitem(last=False)[1][1])
+        return data, key, False
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'bytes': self._size}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_docx_cache():
+    """获取全局Word文档缓存（参数取自配置 [word_cache]）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DocxCache(
+                max_bytes=int(get_setting('word_cache', 'max_mb', fallback=64.0, type=float) * 1024 * 1024),
+                max_entries=get_setting('word_cache', 'max_entries', fallback=128, type=int),
+            )
+        return _cache
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+教学大纲导出
+基于中间表示（outline_ir.Outline）导出 Markdown、HTML、Word；一次请求可导出多种格式，
+HTML 复用同一次导出的 Markdown，Word 以中间表示的摘要查找渲染缓存
+"""
+
+import re
+
+from .markdown_html import markdown_to_html
+from .template_registry import get_template
+from .word_generator import render_word_from_outline
+
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([^}]+)\}\}')
+
+# 导出格式 → (扩展名, MIME 类型)
+EXPORT_FORMATS = {
+    'md': ('.md', 'text/markdown; charset=utf-8'),
+    'html': ('.html', 'text/html; charset=utf-8'),
+    'docx': ('.docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+}
+
+
+def export_markdown(outline, template_id=None):
+    """
+    按 Markdown 模板导出，{{字段}} 替换为大纲内容，空字段保留占位符
+
+    Args:
+        template_id: 模板ID，为空时使用默认 Markdown 模板
+    """
+    flat = outline.to_flat()
+
+    def replace(match):
+        value = flat.get(match.group(1))
+        return str(value) if value else match.group(0)
+
+    return PLACEHOLDER_PATTERN.sub(replace, get_template(template_id, 'md').text)
+
+
+def export_html(outline, template_id=None):
+    """导出 HTML 片段（由 Markdown 导出结果转换）"""
+    return markdown_to_html(export_markdown(outline, template_id))
+
+
+def export_docx(outline, template_id=None):
+    """
+    导出Word文档
+
+    Args:
+        template_id: 模板ID，为空时使用默认 Word 模板
+
+    Returns:
+        tuple: (.docx 字节, ETag, 是否命中缓存)
+    """
+    return render_word_from_outline(outline.to_flat(), get_template(template_id, 'docx').path,
+                                    outline_hash=outline.digest)
+
+
+def export_outline(outline, formats, templates=None):
+    """
+    一次导出多种格式
+
+    Args:
+        outline: 中间表示
+        formats: 格式列表（md / html / docx）
+        templates: 各类模板的ID {'md': ID, 'docx': ID}，未指定的使用默认模板
+
+    Returns:
+        dict: {格式: 字节}
+    """
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"不支持的导出格式: {', '.join(unknown)}")
+    templates = templates or {}
+
+    results = {}
+    md = None
+    if 'md' in formats or 'html' in formats:
+        md = export_markdown(outline, templates.get('md'))
+    if 'md' in formats:
+        results['md'] = md.encode('utf-8')
+    if 'html' in formats:
+        results['html'] = markdown_to_html(md).encode('utf-8')
+    if 'docx' in formats:
+        results['docx'] = export_docx(outline, templates.get('docx'))[0]
+    return results
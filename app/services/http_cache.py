@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 缓存与压缩
+JSON 与 HTML 响应超过阈值时按客户端 Accept-Encoding 协商 brotli / gzip 压缩；
+brotli 为可选依赖，未安装时只使用 gzip。内容寻址的文件可永久缓存，模板文件按 static_max_age 缓存。
+参数取自配置 [http]
+"""
+
+import gzip
+from flask import request
+
+from .app_config import get_setting
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/markdown', 'text/plain', 'text/css',
+                      'application/javascript', 'text/javascript')
+
+
+def supported_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=min(level, 9), mtime=0)
+
+
+def compress_response(response):
+    """after_request 钩子：满足条件的响应就地压缩"""
+    if not get_setting('http', 'compress', fallback=True, type=bool):
+        return response
+    if (response.direct_passthrough or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if not encoding:
+        return response
+    data = response.get_data()
+    if len(data) < get_setting('http', 'compress_min_size', fallback=1024, type=int):
+        return response
+
+    response.set_data(compress(data, encoding, get_setting('http', 'compress_level', fallback=6, type=int)))
+    response.headers['Content-Encoding'] = encoding
+    # 压缩后的内容与原内容不同，强 ETag 改为弱 ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# 内容寻址的文件（URL 中含内容摘要）内容不会改变
+IMMUTABLE_MAX_AGE = 365 * 86400
+
+
+def static_max_age():
+    """模板等静态文件的缓存时间（秒）"""
+    return get_setting('http', 'static_max_age', fallback=86400, type=int)
+
+
+def init_http_cache(app):
+    """注册压缩钩子"""
+    app.after_request(compress_response)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+教学大纲增量生成
+在已有大纲的基础上，根据用户的修改只重新生成受影响的字段，并返回修改前后的差异
+"""
+
+import re
+from loguru import logger
+
+from .teaching_outline_generator import (
+    MODULE_COUNT, MODULE_FIELDS, generate_default_content, outline_field_names, repair_outline,
+    split_focus_modules,
+)
+from .token_counter import set_usage_context
+
+
+# 修改模块名称后需要随之更新的模块字段
+MODULE_NAME_DEPENDENTS = ('教学内容及重点、难点', '职业技能要求', '教学方法建议')
+
+# 修改后需要整体重新生成的字段
+FULL_REGENERATE_FIELDS = ('课程名称',)
+
+
+def _module_num(field):
+    """从 教学模块3、课时3 等字段名中解析模块编号，非模块字段返回 None"""
+    for name in MODULE_FIELDS:
+        if field.startswith(name):
+            suffix = field[len(name):]
+            if suffix.isdigit():
+                return int(suffix)
+    return None
+
+
+def sum_module_hours(outline):
+    """根据 课时1..N 汇总总课时，无法汇总时返回 None"""
+    total = 0
+    for num in range(1, MODULE_COUNT + 1):
+        m = re.search(r'\d+', str(outline.get(f'课时{num}') or ''))
+        if not m:
+            return None
+        total += int(m.group())
+    return f'{total}学时'
+
+
+def fields_mentioning(outline, terms):
+    """查找内容中出现了任一排除项的AI生成字段"""
+    if not terms:
+        return []
+    return [field for field in outline_field_names()
+            if any(term in str(outline.get(field) or '') for term in terms)]
+
+
+def plan_regeneration(previous, edited=None, exclude_items=None, rewrite_modules=None):
+    """
+    计算需要重新生成的字段
+
+    规则：
+    - 修改 课程名称：全部AI字段重新生成
+    - 修改 教学模块N：重新生成该模块的内容、技能要求与教学方法
+    - 排除项：重新生成内容中出现排除项的字段（模块字段按整个模块重新生成）
+    - 指定重写的模块：重新生成该模块的全部字段
+    - 修改 课时N：本地重新汇总总课时，不调用大模型
+
+    Args:
+        previous: 修改前的大纲
+        edited: 用户直接修改的字段 {字段名: 新值}
+        exclude_items: 新的排除项文本
+        rewrite_modules: 需要整体重写的模块编号列表
+
+    Returns:
+        list: 需要调用大模型重新生成的字段（不含用户直接修改的字段）
+    """
+    edited = edited or {}
+    if any(field in edited for field in FULL_REGENERATE_FIELDS):
+        return [f for f in outline_field_names() if f not in edited]
+
+    targets = []
+
+    def add(field):
+        if field not in targets and field not in edited:
+            targets.append(field)
+
+    def add_module(num, fields=MODULE_FIELDS):
+        for name in fields:
+            add(f'{name}{num}')
+
+    for field in edited:
+        if field.startswith('教学模块') and _module_num(field):
+            add_module(_module_num(field), MODULE_NAME_DEPENDENTS)
+
+    # 已遵守的排除项不会出现在内容中，因此只需扫描当前内容
+    for field in fields_mentioning({**previous, **edited}, split_focus_modules(exclude_items)):
+        num = _module_num(field)
+        if num:
+            add_module(num)
+        else:
+            add(field)
+
+    for num in rewrite_modules or []:
+        num = int(num)
+        if 1 <= num <= MODULE_COUNT:
+            add_module(num)
+
+    return targets
+
+
+def diff_outline(before, after):
+    """
+    对比两个版本的大纲
+
+    Returns:
+        dict: {字段名: {'old': 旧值, 'new': 新值}}，只包含有变化的字段
+    """
+    diff = {}
+    for key in list(before.keys()) + [k for k in after.keys() if k not in before]:
+        old, new = before.get(key), after.get(key)
+        if old != new:
+            diff[key] = {'old': old, 'new': new}
+    return diff
+
+
+def regenerate_outline(previous, edited=None, exclude_items=None, rewrite_modules=None,
+                       llm_provider=None, llm_api_key=None, llm_model=None,
+                       positioning_length=100, objectives_length=80, module_content_length=60,
+                       structured_output='json_object'):
+    """
+    增量重新生成教学大纲
+
+    先应用用户修改，再只对受影响的字段调用大模型；未配置大模型时使用默认内容填充
+
+    Returns:
+        dict: outline（合并后的大纲）、diff（与修改前的差异）、regenerated_fields（重新生成的字段）
+    """
+    edited = edited or {}
+    outline = dict(previous)
+    outline.update(edited)
+    course_name = outline.get('课程名称') or ''
+
+    targets = plan_regeneration(previous, edited, exclude_items, rewrite_modules)
+    logger.info("增量生成《{}》：修改{}个字段，需重新生成{}个字段", course_name, len(edited), len(targets))
+
+    if targets:
+        if llm_provider and llm_api_key:
+            set_usage_context(course_name, positioning_length=positioning_length,
+                              objectives_length=objectives_length, module_content_length=module_content_length,
+                              structured_output=structured_output)
+            changes = '、'.join(f'{k}改为“{v}”' for k, v in edited.items() if k in outline_field_names())
+            instructions = f"用户已修改：{changes}，请据此生成。" if changes else None
+            outline = repair_outline(outline, targets, course_name, exclude_items,
+                                     llm_provider, llm_api_key, llm_model,
+                                     positioning_length, objectives_length, module_content_length,
+                                     structured_output=structured_output,
+                                     instructions=instructions, stage='teaching_outline_incremental')
+        else:
+            defaults = generate_default_content(course_name, exclude_items)
+            outline.update({field: defaults[field] for field in targets if field in defaults})
+
+    if any(_module_num(field) and field.startswith('课时') for field in list(edited) + targets):
+        total = sum_module_hours(outline)
+        if total and '总课时' not in edited:
+            outline['总课时'] = total
+
+    return {
+        'outline': outline,
+        'diff': diff_outline(previous, outline),
+        'regenerated_fields': targets,
+    }
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线知识库
+从 templates/knowledge_base.yaml 读取课程主题、教学模块与技能要求，
+建立 课程名称关键词 → 主题 的倒排索引，未配置大模型时按课程名称组装课程专属内容
+"""
+
+import os
+import re
+import threading
+import time
+from loguru import logger
+
+from .app_config import PROJECT_ROOT
+from .text_utils import extract_keywords, normalize_course_name
+
+
+KNOWLEDGE_BASE_PATH = os.path.join(PROJECT_ROOT, 'templates', 'knowledge_base.yaml')
+
+# 每个主题需要提供的教学模块数量（与教学大纲模板一致）
+MODULE_COUNT = 8
+
+
+def _ascii_prefixes(normalized_name):
+    """英文单词的所有前缀，使 java 能匹配 javaweb、python 能匹配 python3"""
+    prefixes = set()
+    for word in re.findall(r'[a-z0-9]+', normalized_name):
+        prefixes.update(word[:i] for i in range(2, len(word) + 1))
+    return prefixes
+
+
+def _keyword_in(keyword, normalized_name):
+    """关键词出现在课程名称中，且英文关键词位于单词开头（避免 ai 匹配 email）"""
+    start = normalized_name.find(keyword)
+    while start >= 0:
+        if not (keyword[0].isascii() and start > 0 and normalized_name[start - 1].isascii()
+                and normalized_name[start - 1].isalnum()):
+            return True
+        start = normalized_name.find(keyword, start + 1)
+    return False
+
+
+def _fill(text, course_name):
+    return str(text or '').replace('{course}', course_name)
+
+
+def _mentions(text, terms):
+    return any(term and term in text for term in terms)
+
+
+class KnowledgeBase:
+    """
+    课程知识库
+
+    文件修改时间变化后自动重新加载并重建索引；索引键为关键词的英文单词与中文二元组，
+    查询时只校验共享索引键的候选关键词
+    """
+
+    def __init__(self, path=KNOWLEDGE_BASE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.defaults = {}
+        self.topics = []
+        # 索引键 → [(主题序号, 规范化关键词)]
+        self._index = {}
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if self._mtime is not None:
+                logger.warning("离线知识库文件不存在: {}", self.path)
+            self._mtime, self.defaults, self.topics, self._index = None, {}, [], {}
+            return
+        if mtime == self._mtime:
+            return
+
+        import yaml
+
+        start = time.perf_counter()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        topics = [t for t in data.get('topics') or [] if len(t.get('modules') or []) >= MODULE_COUNT]
+        index = {}
+        for topic_idx, topic in enumerate(topics):
+            for keyword in list(topic.get('keywords') or []) + [topic.get('name')]:
+                keyword = normalize_course_name(keyword)
+                if not keyword:
+                    continue
+                for token in extract_keywords(keyword):
+                    index.setdefault(token, []).append((topic_idx, keyword))
+        self._mtime, self.defaults, self.topics, self._index = mtime, data.get('defaults') or {}, topics, index
+        logger.info("离线知识库已加载: {} 个主题，{} 个索引键 ({:.1f}ms)",
+                    len(topics), len(index), (time.perf_counter() - start) * 1000)
+
+    def match(self, course_name):
+        """
+        按课程名称匹配主题
+
+        Returns:
+            tuple: (主题 dict, 匹配得分)，得分为命中关键词的总长度；未匹配时为 (None, 0)
+        """
+        query = normalize_course_name(course_name)
+        with self._lock:
+            self._reload_if_changed()
+            if not query or not self._index:
+                return None, 0
+            scores = {}
+            seen = set()
+            for token in extract_keywords(query) | _ascii_prefixes(query):
+                for topic_idx, keyword in self._index.get(token, ()):
+                    if (topic_idx, keyword) in seen:
+                        continue
+                    seen.add((topic_idx, keyword))
+                    if _keyword_in(keyword, query):
+                        scores[topic_idx] = scores.get(topic_idx, 0) + len(keyword)
+            if not scores:
+                return None, 0
+            # 得分相同时取文件中靠前的主题
+            topic_idx = min(scores, key=lambda i: (-scores[i], i))
+            return self.topics[topic_idx], scores[topic_idx]
+
+    def resolve_modules(self, topic, course_name, focus_terms=None, exclude_terms=None):
+        """
+        生成某主题的 8 个教学模块
+
+        涉及排除项的模块用 defaults.fallback_modules 顶替，不够时补充编号的拓展模块；知识库中未覆盖的重点模块
+        依次替换综合项目之前的模块，课时沿用被替换的模块
+
+        Returns:
+            list: [{'name', 'points', 'difficulty', 'skill', 'hours', 'method', 'practice', 'homework'}]
+        """
+        focus_terms = list(focus_terms or [])
+        exclude_terms = list(exclude_terms or [])
+        default_method = self.defaults.get('module_method', '讲授演示结合上机实践')
+
+        def render(module):
+            return {
+                'name': _fill(module.get('name'), course_name),
+                'points': [_fill(p, course_name) for p in module.get('points') or []
+                           if not _mentions(str(p), exclude_terms)],
+                'difficulty': _fill(module.get('difficulty'), course_name),
+                'skill': _fill(module.get('skill'), course_name),
+                'hours': int(module.get('hours') or 8),
+                'method': _fill(module.get('method') or default_method, course_name),
+                'practice': [_fill(p, course_name) for p in module.get('practice') or []],
+                'homework': [_fill(p, course_name) for p in module.get('homework') or []],
+            }
+
+        modules = [render(m) for m in topic['modules'][:MODULE_COUNT]
+                   if not _mentions(str(m.get('name')), exclude_terms)]
+        fallbacks = [render(m) for m in self.defaults.get('fallback_modules') or []
+                     if not _mentions(str(m.get('name')), exclude_terms)]
+        generic_count = 0
+        while len(modules) < MODULE_COUNT:
+            # 通用模块用完后以编号的拓展模块补足
+            if fallbacks:
+                module = fallbacks.pop(0)
+            else:
+                generic_count += 1
+                module = generic_module(generic_count, default_method)
+            modules.insert(len(modules) - 1, module)
+
+        def covered(term):
+            return any(term in m['name'] or any(term in p for p in m['points']) for m in modules)
+
+        replace_at = len(modules) - 2
+        for term in focus_terms:
+            if covered(term) or replace_at < 0:
+                continue
+            hours = modules[replace_at]['hours']
+            modules[replace_at] = {
+                'name': f'重点专题：{term}',
+                'points': [f'{term}基本原理', f'{term}关键方法', f'{term}典型案例'],
+                'difficulty': f'{term}在实际项目中的综合运用',
+                'skill': f'能够运用{term}解决{course_name}中的实际问题',
+                'hours': hours,
+                'method': '案例教学结合上机实践',
+                'practice': [f'完成{term}专项实验'],
+                'homework': [f'撰写{term}学习小结'],
+            }
+            replace_at -= 1
+        return modules[:MODULE_COUNT]
+
+
+def generic_module(num, method):
+    """排除项过多、通用模块不够补位时使用的拓展模块（不含课程名称，避免再次涉及排除项）"""
+    return {
+        'name': f'拓展专题{num}',
+        'points': ['已学知识的综合运用', '拓展案例分析', '学习方法与经验总结'],
+        'difficulty': '已学知识在新场景中的迁移运用',
+        'skill': '能够综合运用已学知识完成拓展任务',
+        'hours': 8,
+        'method': method,
+        'practice': [f'完成拓展专题{num}实践任务'],
+        'homework': [f'提交拓展专题{num}学习报告'],
+    }
+
+
+def format_numbered(items):
+    return '\n'.join(f'{i}. {item}' for i, item in enumerate(items, 1))
+
+
+def plan_module_weeks(modules, content_weeks):
+    """
+    按课时比例把教学模块分配到各内容周
+
+    Returns:
+        list: 每周一项，[(模块 dict, 该模块第几周, 该模块共几周)]；周数少于模块数时一周包含多个模块
+    """
+    if not modules or content_weeks <= 0:
+        return [[] for _ in range(max(content_weeks, 0))]
+    if content_weeks < len(modules):
+        weeks = [[] for _ in range(content_weeks)]
+        for i, module in enumerate(modules):
+            weeks[i * content_weeks // len(modules)].append((module, 1, 1))
+        return weeks
+
+    # 每个模块至少 1 周，其余周数按课时用最大余数法分配
+    total_hours = sum(m['hours'] for m in modules) or len(modules)
+    spare = content_weeks - len(modules)
+    shares = [spare * m['hours'] / total_hours for m in modules]
+    counts = [1 + int(s) for s in shares]
+    for i in sorted(range(len(modules)), key=lambda i: int(shares[i]) - shares[i])[:content_weeks - sum(counts)]:
+        counts[i] += 1
+
+    weeks = []
+    for module, count in zip(modules, counts):
+        weeks.extend([(module, part, count)] for part in range(1, count + 1))
+    return weeks
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """获取全局离线知识库"""
+    global _knowledge_base
+    with _knowledge_base_lock:
+        if _knowledge_base is None:
+            _knowledge_base = KnowledgeBase()
+        return _knowledge_base
+
+
+def build_offline_outline(course_name, exclude_terms=None, focus_terms=None):
+    """
+    按知识库组装课程专属的教学大纲内容（字段与 generate_with_ai 的返回一致）
+
+    Returns:
+        dict: 教学大纲字段；课程名称未匹配到任何主题时返回 None
+    """
+    kb = get_knowledge_base()
+    topic, score = kb.match(course_name)
+    if not topic:
+        return None
+    exclude_terms = list(exclude_terms or [])
+    defaults = kb.defaults
+
+    def lines(key):
+        items = topic.get(key) or defaults.get(key) or []
+        return [_fill(item, course_name) for item in items if not _mentions(str(item), exclude_terms)]
+
+    modules = kb.resolve_modules(topic, course_name, focus_terms, exclude_terms)
+    total_hours = sum(m['hours'] for m in modules)
+    outline = {
+        '课程定位': _fill(topic.get('positioning'), course_name),
+        '知识目标': format_numbered(lines('knowledge')),
+        '技能目标': format_numbered(lines('skills')),
+        '素质目标': format_numbered(lines('qualities')),
+        '教学方式、方法与手段建议': _fill(topic.get('methods') or defaults.get('methods'), course_name),
+        '教学及参考资料': format_numbered(lines('references')),
+        '课程编码': 'CS001',
+        '学时': str(total_hours),
+        '学分': str(max(1, round(total_hours / 18))),
+        '课程类别': topic.get('category') or '专业核心课',
+        '适用专业': topic.get('majors') or '计算机类专业',
+    }
+    for num, module in enumerate(modules, 1):
+        outline[f'教学模块{num}'] = module['name']
+        outline[f'教学内容及重点、难点{num}'] = f"重点：{'、'.join(module['points'])}；难点：{module['difficulty']}。"
+        outline[f'职业技能要求{num}'] = module['skill']
+        outline[f'课时{num}'] = f"{module['hours']}学时"
+        outline[f'教学方法建议{num}'] = module['method']
+    outline['总课时'] = f'{total_hours}学时'
+    logger.info("离线知识库生成《{}》：主题={} 得分={}", course_name, topic.get('id'), score)
+    return outline
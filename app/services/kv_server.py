@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+键值存储服务
+HttpKVStorage 的服务端：GET/PUT/DELETE/HEAD /kv/<key>，数据保存在 SQLite 或本地目录。
+用于多实例部署时的共享存储，也可在本机启动作为测试替身（python run.py kv-server）
+"""
+
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from loguru import logger
+
+from .storage import SQLiteStorage, validate_key
+
+
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+
+class KVRequestHandler(BaseHTTPRequestHandler):
+    """键值请求处理；存储后端为 server.storage"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _key(self):
+        if not self.path.startswith('/kv/'):
+            self._reply(404)
+            return None
+        try:
+            return validate_key(self.path[len('/kv/'):])
+        except ValueError:
+            self._reply(400)
+            return None
+
+    def _reply(self, status, body=b'', content_type='application/octet-stream', modified=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if modified is not None:
+            self.send_header('Last-Modified', formatdate(modified, usegmt=True))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        key = self._key()
+        if key is None:
+            return
+        data = self.server.storage.get(key)
+        if data is None:
+            self._reply(404)
+        else:
+            self._reply(200, data, modified=self.server.storage.modified(key))
+
+    def do_HEAD(self):
+        key = self._key()
+        if key is None:
+            return
+        modified = self.server.storage.modified(key)
+        if modified is None and not self.server.storage.exists(key):
+            self._reply(404)
+        else:
+            self._reply(200, modified=modified)
+
+    def do_PUT(self):
+        key = self._key()
+        if key is None:
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            self._reply(413)
+            return
+        self.server.storage.put(key, self.rfile.read(length))
+        self._reply(204)
+
+    def do_DELETE(self):
+        key = self._key()
+        if key is None:
+            return
+        self.server.storage.delete(key)
+        self._reply(204)
+
+    def log_message(self, format, *args):
+        logger.debug("kv-server {} - {}", self.address_string(), format % args)
+
+
+def create_kv_server(host='127.0.0.1', port=5100, storage=None, db_path='output/kv_store.db'):
+    """
+    创建键值服务（调用 serve_forever 开始服务）
+
+    Args:
+        storage: 存储后端，None 表示使用 db_path 处的 SQLite
+    """
+    server = ThreadingHTTPServer((host, port), KVRequestHandler)
+    server.storage = storage or SQLiteStorage(db_path)
+    return server
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型接口客户端
+基于 httpx 的异步 Chat Completions 调用；等待模型响应时不占用线程，
+同一请求内的多次调用可在一个事件循环中并发。run_sync 供同步接口调用异步实现。
+各次调用共用一个 SSL 上下文（加载证书较慢），httpx 在首次调用时才导入
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+from .app_config import get_setting
+from .deadline import DeadlineExceeded, bounded_timeout, remaining
+from .logging_config import stage
+
+
+PROVIDER_ENDPOINTS = {
+    'deepseek': 'https://api.deepseek.com/v1/chat/completions',
+    'openai': 'https://api.openai.com/v1/chat/completions',
+}
+
+DEFAULT_MODELS = {
+    'deepseek': 'deepseek-chat',
+    'openai': 'gpt-4o-mini',
+}
+
+REQUEST_TIMEOUT = 60
+
+# 可重试的状态码：限流与服务端临时错误
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_ssl_context = None
+_ssl_context_lock = threading.Lock()
+
+
+def ssl_context():
+    """共用的 SSL 上下文（首次调用时创建，服务启动后由后台预热提前完成）"""
+    global _ssl_context
+    with _ssl_context_lock:
+        if _ssl_context is None:
+            import httpx
+
+            _ssl_context = httpx.create_ssl_context()
+        return _ssl_context
+
+
+def parse_usage(result):
+    """
+    读取接口返回的 usage
+
+    Returns:
+        dict: prompt_tokens、completion_tokens、cached_tokens（命中提供商提示词缓存的输入 token），
+              接口未返回 usage 时 token 数为 None
+    """
+    usage = result.get('usage') or {}
+    cached = usage.get('prompt_cache_hit_tokens')  # DeepSeek
+    if cached is None:
+        cached = (usage.get('prompt_tokens_details') or {}).get('cached_tokens')  # OpenAI
+    return {
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'completion_tokens': usage.get('completion_tokens'),
+        'cached_tokens': cached or 0,
+    }
+
+
+async def achat(llm_provider, api_key, messages, model=None, temperature=0.9, max_tokens=None,
+                response_format=None, timeout=REQUEST_TIMEOUT):
+    """
+    异步调用 Chat Completions 接口
+
+    Args:
+        llm_provider: 模型提供商（deepseek / openai）
+        api_key: API密钥
+        messages: 对话消息列表
+        model: 模型名称，为空时使用提供商默认模型
+        temperature: 采样温度
+        max_tokens: 最大输出 token 数，None 表示不限制
+        response_format: 结构化输出参数
+        timeout: 超时秒数，不超过当前请求的剩余时间
+
+    连接失败与 RETRY_STATUS 中的状态码按配置 [ai] max_retries、retry_backoff 指数退避重试，
+    剩余时间不足以等待时不再重试
+
+    Returns:
+        tuple: (模型回复文本, 实际使用的模型名称, 用量)；用量见 parse_usage，另含 latency_ms 与 retries
+    """
+    provider = (llm_provider or '').lower()
+    if provider not in PROVIDER_ENDPOINTS:
+        raise ValueError(f"不支持的模型提供商: {llm_provider}")
+    model = model or DEFAULT_MODELS[provider]
+
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+    }
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    if response_format:
+        payload["response_format"] = response_format
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+
+    import httpx
+
+    max_retries = get_setting('ai', 'max_retries', fallback=2, type=int)
+    backoff = get_setting('ai', 'retry_backoff', fallback=1.0, type=float)
+    retries = 0
+    start = time.perf_counter()
+    with stage('llm'):
+        async with httpx.AsyncClient(timeout=timeout, verify=ssl_context()) as client:
+            while True:
+                call_timeout = bounded_timeout(timeout, '模型调用')
+                try:
+                    response = await asyncio.wait_for(
+                        client.post(PROVIDER_ENDPOINTS[provider], headers=headers, json=payload), call_timeout)
+                except asyncio.TimeoutError:
+                    if remaining(default=1) <= 0:
+                        raise DeadlineExceeded("模型调用超过请求截止时间") from None
+                    raise
+                except httpx.TransportError:
+                    response = None
+                    if retries >= max_retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUS or retries >= max_retries:
+                        break
+                delay = backoff * 2 ** retries
+                if remaining(default=delay + 1) <= delay:
+                    if response is None:
+                        raise DeadlineExceeded("模型调用超过请求截止时间")
+                    break
+                retries += 1
+                logger.warning("模型调用失败（{}），{:.1f}秒后第{}次重试",
+                               response.status_code if response is not None else '连接错误', delay, retries)
+                await asyncio.sleep(delay)
+    latency_ms = (time.perf_counter() - start) * 1000
+    response.raise_for_status()
+    result = response.json()
+    usage = {**parse_usage(result), 'latency_ms': latency_ms, 'retries': retries}
+    choice = result['choices'][0]
+    if choice.get('finish_reason') == 'length':
+        logger.warning("模型输出达到 max_tokens={} 被截断（model={}）", max_tokens, model)
+    return choice['message']['content'], model, usage
+
+
+def run_sync(coro):
+    """
+    在同步代码中运行协程并返回结果
+
+    当前线程没有事件循环时直接 asyncio.run；已在事件循环中（如异步视图内调用同步接口）时
+    在独立线程中运行，避免嵌套事件循环。上下文变量（如用量统计）随调用传递
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(contextvars.copy_context().run, asyncio.run, coro).result()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置
+按配置 [logging] 设置 loguru：所有输出均经队列由后台线程写出，请求线程不等待磁盘 I/O；
+日志文件按大小轮转并压缩，可输出 JSON 结构化记录（带请求ID与各阶段耗时）；
+超长消息截断后再入队。Flask / 标准库 logging 的日志同样转入 loguru
+"""
+
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from loguru import logger
+
+from .app_config import PROJECT_ROOT, get_setting
+
+
+REQUEST_ID_HEADER = 'X-Request-Id'
+
+TEXT_FORMAT = ('<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | '
+               '{extra[request_id]} | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - '
+               '<level>{message}</level>')
+
+_request_id = ContextVar('request_id', default='-')
+_stages = ContextVar('request_stages', default=None)
+
+_configured = False
+_configure_lock = threading.Lock()
+# 单条消息的最大长度（setup_logging 时从配置读取）
+_max_length = 2000
+
+
+def new_request(request_id=None):
+    """开始记录一个请求：设置请求ID（未提供时生成）并清空阶段耗时"""
+    request_id = (request_id or '').strip()[:64] or uuid.uuid4().hex[:16]
+    _request_id.set(request_id)
+    _stages.set({})
+    return request_id
+
+
+def end_request():
+    """请求结束，之后的日志不再带该请求ID"""
+    _request_id.set('-')
+    _stages.set(None)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+@contextmanager
+def stage(name):
+    """记录当前请求中某阶段的耗时；同一阶段多次执行（如并发的模型调用）累计次数与总耗时"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = _stages.get()
+        if stages is not None:
+            count, total = stages.get(name, (0, 0.0))
+            stages[name] = (count + 1, total + (time.perf_counter() - start) * 1000)
+
+
+def stage_timings():
+    """当前请求各阶段耗时：{阶段: {'count', 'ms'}}"""
+    return {name: {'count': count, 'ms': round(total, 1)} for name, (count, total) in (_stages.get() or {}).items()}
+
+
+def truncate(text, limit=None):
+    """截断超长文本，保留开头并注明原长度"""
+    text = str(text)
+    if limit is None:
+        limit = get_setting('logging', 'max_message_length', fallback=2000, type=int)
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(已截断，共{len(text)}字符)"
+
+
+def _patch_record(record):
+    """在调用线程中补充请求ID并截断消息，入队的只有截断后的内容"""
+    record['extra'].setdefault('request_id', _request_id.get())
+    record['message'] = truncate(record['message'], _max_length)
+
+
+def _json_format(record):
+    """JSON 结构化格式：每条日志一行"""
+    payload = {
+        'time': record['time'].isoformat(),
+        'level': record['level'].name,
+        'logger': record['name'],
+        'function': record['function'],
+        'line': record['line'],
+        'message': record['message'],
+        **{k: v for k, v in record['extra'].items() if not k.startswith('_')},
+    }
+    if record['exception'] is not None:
+        exc_type, exc_value, exc_tb = record['exception']
+        payload['exception'] = truncate(''.join(traceback.format_exception(exc_type, exc_value, exc_tb)),
+                                        _max_length * 4)
+    record['extra']['_json'] = json.dumps(payload, ensure_ascii=False, default=str)
+    return '{extra[_json]}\n'
+
+
+class InterceptHandler(logging.Handler):
+    """将标准库 logging（Flask、werkzeug）的记录转给 loguru"""
+
+    def emit(self, record):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+def log_file_path():
+    """日志文件路径：相对路径放在项目 logs 目录下"""
+    log_file = get_setting('logging', 'log_file', fallback='app.log')
+    if os.path.isabs(log_file):
+        return log_file
+    return os.path.join(PROJECT_ROOT, 'logs', log_file)
+
+
+def setup_logging(force=False):
+    """按配置 [logging] 设置日志输出（只执行一次，force 为 True 时重新设置）"""
+    global _configured, _max_length
+    with _configure_lock:
+        if _configured and not force:
+            return
+        level = get_setting('logging', 'log_level', fallback='INFO').upper()
+        as_json = get_setting('logging', 'json', fallback=False, type=bool)
+        _max_length = get_setting('logging', 'max_message_length', fallback=2000, type=int)
+
+        logger.remove()
+        logger.configure(patcher=_patch_record)
+        # enqueue：日志写入由后台线程完成，调用方只负责入队
+        logger.add(sys.stderr, level=level, format=TEXT_FORMAT, enqueue=True, backtrace=False)
+
+        if get_setting('logging', 'log_file', fallback='app.log'):
+            path = log_file_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            logger.add(
+                path,
+                level=level,
+                format=_json_format if as_json else TEXT_FORMAT,
+                colorize=False,
+                rotation=get_setting('logging', 'max_log_size', fallback='10MB'),
+                retention=get_setting('logging', 'backup_count', fallback=5, type=int),
+                compression=get_setting('logging', 'compression', fallback='gz') or None,
+                encoding='utf-8',
+                enqueue=True,
+                backtrace=False,
+            )
+
+        logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
+        _configured = True
+
+
+def log_request(method, path, status, duration_ms):
+    """记录请求结束：状态码、总耗时与各阶段耗时（作为结构化字段）"""
+    logger.bind(method=method, path=path, status=status, duration_ms=round(duration_ms, 1),
+                stages=stage_timings()).info("{} {} {} {:.1f}ms", method, path, status, duration_ms)
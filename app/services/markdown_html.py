@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown 转 HTML
+预览页面在服务端将 Markdown 转为 HTML（启用表格），结果按内容摘要缓存（LRU），
+同一内容再次预览只需一次摘要查找。内容中的原始 HTML 一律转义，仅保留 <br> 换行；
+链接与图片地址只允许 http、https、mailto 与相对地址。markdown 库在首次转换时才导入
+"""
+
+import hashlib
+import html
+import re
+import threading
+from collections import OrderedDict
+
+from .app_config import get_setting
+from .logging_config import stage
+
+
+SAFE_URL_SCHEMES = ('http', 'https', 'mailto')
+URL_SCHEME_PATTERN = re.compile(r'^([a-z][a-z0-9+.\-]*):', re.IGNORECASE)
+# 浏览器解析地址时忽略其中的空白与控制字符（如 "java\tscript:"）
+URL_IGNORED_CHARS = re.compile(r'[\x00-\x20\x7f]+')
+# 需要检查地址的元素与属性
+URL_ATTRIBUTES = (('a', 'href'), ('img', 'src'))
+
+_escape_extension = None
+
+
+def is_safe_url(url):
+    """地址是否为 http、https、mailto 或相对地址（先按浏览器的方式还原字符实体与空白）"""
+    match = URL_SCHEME_PATTERN.match(URL_IGNORED_CHARS.sub('', html.unescape(url)))
+    return match is None or match.group(1).lower() in SAFE_URL_SCHEMES
+
+
+def escape_html_extension():
+    """
+    不解析内容中的原始 HTML 的扩展（模型生成或用户编辑的内容按普通文本显示）
+
+    同时移除 javascript:、data: 等其他协议的链接与图片地址，链接文字保留为普通文本
+    """
+    global _escape_extension
+    if _escape_extension is None:
+        from markdown.extensions import Extension
+        from markdown.treeprocessors import Treeprocessor
+
+        class UnsafeUrlTreeprocessor(Treeprocessor):
+            def run(self, root):
+                for tag, attribute in URL_ATTRIBUTES:
+                    for element in root.iter(tag):
+                        url = element.get(attribute)
+                        if url is not None and not is_safe_url(url):
+                            del element.attrib[attribute]
+
+        class EscapeHtmlExtension(Extension):
+            def extendMarkdown(self, md):
+                md.preprocessors.deregister('html_block')
+                md.inlinePatterns.deregister('html')
+                # 在行内解析（优先级 20）生成链接之后执行
+                md.treeprocessors.register(UnsafeUrlTreeprocessor(md), 'unsafe_url', 5)
+
+        _escape_extension = EscapeHtmlExtension
+    return _escape_extension()
+
+
+def convert(text):
+    """Markdown 转 HTML（不缓存）"""
+    import markdown
+
+    with stage('markdown_html'):
+        html = markdown.markdown(text, extensions=['tables', escape_html_extension()], output_format='html')
+    # 进度表单元格用 <br> 分隔多项内容
+    return html.replace('&lt;br&gt;', '<br>')
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class MarkdownCache:
+    """转换结果缓存：内容摘要 → HTML"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, digest):
+        """按内容摘要取已转换的 HTML，未缓存时返回 None"""
+        with self._lock:
+            html = self._entries.get(digest)
+            if html is not None:
+                self._entries.move_to_end(digest)
+                self._stats['hits'] += 1
+            return html
+
+    def render(self, text, digest=None):
+        """
+        转换 Markdown，相同内容直接取缓存
+
+        Args:
+            digest: 已算好的内容摘要（如共享存储中的文件ID），为空时计算
+
+        Returns:
+            tuple: (HTML, 内容摘要)
+        """
+        digest = digest or content_hash(text)
+        with self._lock:
+            html = self._entries.get(digest)
+            if html is not None:
+                self._entries.move_to_end(digest)
+                self._stats['hits'] += 1
+                return html, digest
+            self._stats['misses'] += 1
+        html = convert(text)
+        with self._lock:
+            self._entries[digest] = html
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html, digest
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_markdown_cache():
+    """获取全局 Markdown 转换缓存（条目数取自配置 [export] html_cache_entries）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MarkdownCache(get_setting('export', 'html_cache_entries', fallback=256, type=int))
+        return _cache
+
+
+def markdown_to_html(text):
+    """Markdown 转 HTML（启用表格扩展，结果缓存）"""
+    return get_markdown_cache().render(text)[0]
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存分析
+基于 tracemalloc 的内存快照：追踪到的当前与峰值内存、按代码行（或文件、调用栈）汇总的最大分配点，
+以及与基线快照的差异，供 /admin/memory 查看；measure_peak 测量一段代码的峰值内存（基准测试使用）。
+进程常驻内存（RSS）取自 /proc（Linux）或 resource 模块，无法获取时为 None。参数取自配置 [memory]
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from loguru import logger
+
+from .app_config import get_setting
+
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# 不计入统计的分配（tracemalloc 自身与模块导入）
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_baseline = None
+_baseline_lock = threading.Lock()
+_libc = None
+
+
+def rss_bytes():
+    """进程当前常驻内存（字节）"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes():
+    """进程启动以来的最大常驻内存（字节）"""
+    try:
+        import resource
+    except ImportError:
+        # Windows 没有 resource 模块
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def start_tracing(frames=None):
+    """开始追踪内存分配并记录基线快照；已在追踪时只更新基线"""
+    if not tracemalloc.is_tracing():
+        frames = frames or get_setting('memory', 'tracemalloc_frames', fallback=1, type=int)
+        tracemalloc.start(max(1, frames))
+        logger.info("已开始追踪内存分配（保存 {} 层调用栈）", tracemalloc.get_traceback_limit())
+    take_baseline()
+
+
+def stop_tracing():
+    """停止追踪并丢弃基线快照"""
+    global _baseline
+    with _baseline_lock:
+        _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("已停止追踪内存分配")
+
+
+def take_baseline():
+    """记录基线快照，之后的快照可与之对比"""
+    global _baseline
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    with _baseline_lock:
+        _baseline = (time.time(), snapshot)
+
+
+def _stat_dict(stat, group_by):
+    frames = stat.traceback if group_by == 'traceback' else stat.traceback[:1]
+    entry = {
+        'location': [f"{frame.filename}:{frame.lineno}" for frame in frames],
+        'size_kb': round(stat.size / 1024, 1),
+        'count': stat.count,
+    }
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+        entry['count_diff'] = stat.count_diff
+    return entry
+
+
+def top_allocations(limit=20, group_by='lineno', compare=False):
+    """
+    当前最大的分配点
+
+    Args:
+        group_by: 汇总方式 lineno（代码行）/ filename（文件）/ traceback（调用栈）
+        compare: 与基线快照对比，按增长量排序
+
+    Returns:
+        list: [{'location', 'size_kb', 'count'[, 'size_diff_kb', 'count_diff']}]
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"不支持的汇总方式: {group_by}")
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    with _baseline_lock:
+        baseline = _baseline
+    if compare and baseline is not None:
+        stats = snapshot.compare_to(baseline[1], group_by)
+    else:
+        stats = snapshot.statistics(group_by)
+    return [_stat_dict(stat, group_by) for stat in stats[:limit]]
+
+
+def memory_report(limit=20, group_by='lineno', compare=False):
+    """进程内存概况；正在追踪时附带最大分配点（limit 为 0 时不生成快照）"""
+    report = {
+        'rss_mb': _mb(rss_bytes()),
+        'peak_rss_mb': _mb(peak_rss_bytes()),
+        'tracing': tracemalloc.is_tracing(),
+    }
+    if report['tracing']:
+        current, peak = tracemalloc.get_traced_memory()
+        with _baseline_lock:
+            baseline = _baseline
+        report.update({
+            'traced_mb': _mb(current),
+            'traced_peak_mb': _mb(peak),
+            'baseline_time': baseline[0] if baseline else None,
+            'group_by': group_by,
+            'compare': bool(compare and baseline),
+        })
+        if limit > 0:
+            report['top'] = top_allocations(limit, group_by, compare)
+    return report
+
+
+def _mb(value):
+    return None if value is None else round(value / (1024 * 1024), 2)
+
+
+class _RssSampler(threading.Thread):
+    """后台定时读取 RSS，记录最大值"""
+
+    def __init__(self, interval):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes() or 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes() or 0)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, rss_bytes() or 0)
+
+
+@contextmanager
+def measure_peak(trace_python=True, sample_rss=True, interval=0.002):
+    """
+    测量代码块执行期间的峰值内存
+
+    lxml 等扩展模块直接调用 malloc，tracemalloc 统计不到，因此同时定时采样 RSS；
+    tracemalloc 自身也占用内存，只关心 RSS 时设置 trace_python=False
+
+    用法：
+        with measure_peak() as result:
+            ...
+        result['peak']      # Python 分配的峰值（相对进入时，字节）
+        result['retained']  # 退出时仍未释放的 Python 分配
+        result['rss_peak']  # RSS 峰值相对进入时的增长（无法读取 RSS 时为 None）
+    """
+    started = trace_python and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    if trace_python:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    rss_before = rss_bytes() if sample_rss else None
+    sampler = None
+    if rss_before is not None:
+        sampler = _RssSampler(interval)
+        sampler.start()
+    result = {'peak': None, 'retained': None, 'rss_peak': None}
+    try:
+        yield result
+    finally:
+        if sampler is not None:
+            sampler.stop()
+            result['rss_peak'] = sampler.peak - rss_before
+        if trace_python:
+            current, peak = tracemalloc.get_traced_memory()
+            result['peak'] = peak - before
+            result['retained'] = current - before
+        if started:
+            tracemalloc.stop()
+
+
+def release_memory():
+    """
+    把空闲的堆内存归还给操作系统（glibc malloc_trim）
+
+    渲染高峰过后，已释放的对象图所占的内存通常仍留在进程堆中，RSS 不会下降；其他平台不做处理
+    """
+    global _libc
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        if _libc is None:
+            import ctypes
+
+            _libc = ctypes.CDLL('libc.so.6')
+        return bool(_libc.malloc_trim(0))
+    except (OSError, AttributeError):
+        # 非 glibc（如 musl）没有 malloc_trim
+        return False
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按字段复杂度分配模型
+元数据与简短目标使用快速/低价模型，教学模块内容使用能力更强的模型；
+各档位并发调用，结果合并为与 generate_with_ai 相同的扁平结构。
+学时与总课时不交给模型生成，合并后由各模块课时汇总，避免与模块课时不一致
+"""
+
+import asyncio
+from loguru import logger
+
+from .app_config import get_setting
+from .deadline import raise_if_aborted
+from .incremental_generator import sum_module_hours
+from .llm_client import run_sync
+from .structured_output import build_response_format, parse_structured
+from .teaching_outline_generator import (
+    MODULE_FIELDS, acall_llm, arepair_outline, build_compact_prompt, find_invalid_fields, outline_max_tokens,
+    outline_schema,
+)
+from .token_counter import record_usage
+
+
+# 字段分组：每组对应 [ai_routing] 中 group_<组名> 配置的档位
+FIELD_GROUPS = {
+    'metadata': ('课程编码', '学分', '课程类别', '适用专业'),
+    'goals': ('课程定位', '知识目标', '技能目标', '素质目标', '教学方式、方法与手段建议', '教学及参考资料'),
+    'modules': ('modules',),
+}
+
+# 由 课时1..N 汇总得出的字段
+DERIVED_HOURS_FIELDS = ('学时', '总课时')
+
+DEFAULT_GROUP_TIERS = {'metadata': 'fast', 'goals': 'fast', 'modules': 'strong'}
+
+# 各提供商的默认档位模型
+DEFAULT_TIER_MODELS = {
+    'deepseek': {'fast': 'deepseek-chat', 'strong': 'deepseek-chat'},
+    'openai': {'fast': 'gpt-4o-mini', 'strong': 'gpt-4o'},
+}
+
+
+def routing_enabled():
+    """是否在配置中启用了模型分级"""
+    return get_setting('ai_routing', 'enabled', fallback=False, type=bool)
+
+
+def resolve_tier_models(llm_provider, llm_model=None):
+    """
+    计算各档位使用的模型
+
+    用户在页面上指定的模型用于 strong 档，fast 档取配置 <provider>_fast
+
+    Returns:
+        dict: {档位: 模型名称}
+    """
+    provider = (llm_provider or '').lower()
+    defaults = DEFAULT_TIER_MODELS.get(provider, {})
+    return {
+        'fast': get_setting('ai_routing', f'{provider}_fast', fallback=defaults.get('fast')),
+        'strong': llm_model or get_setting('ai_routing', f'{provider}_strong', fallback=defaults.get('strong')),
+    }
+
+
+def resolve_group_tiers():
+    """读取每个字段分组所属的档位（fast / strong）"""
+    tiers = {}
+    for group, default_tier in DEFAULT_GROUP_TIERS.items():
+        tier = get_setting('ai_routing', f'group_{group}', fallback=default_tier)
+        tiers[group] = tier if tier in ('fast', 'strong') else default_tier
+    return tiers
+
+
+def fill_total_hours(data):
+    """用各模块课时之和填写学时与总课时（模块课时不完整时保持原样，交由补全流程处理）"""
+    total = sum_module_hours(data)
+    if total:
+        data.update(dict.fromkeys(DERIVED_HOURS_FIELDS, total))
+    return data
+
+
+def generate_with_routing(course_name, exclude_items,
+                          system_prompt, user_prompt,
+                          llm_provider, llm_api_key, llm_model,
+                          positioning_length=100, objectives_length=80, module_content_length=60,
+                          focus_modules=None, prompt_mode='compact', structured_output='json_object',
+                          repair_missing=True):
+    """按字段分组调用不同档位的模型（同步接口，见 agenerate_with_routing）"""
+    return run_sync(agenerate_with_routing(
+        course_name, exclude_items, system_prompt, user_prompt,
+        llm_provider, llm_api_key, llm_model,
+        positioning_length, objectives_length, module_content_length,
+        focus_modules=focus_modules, prompt_mode=prompt_mode, structured_output=structured_output,
+        repair_missing=repair_missing
+    ))
+
+
+async def agenerate_with_routing(course_name, exclude_items,
+                                 system_prompt, user_prompt,
+                                 llm_provider, llm_api_key, llm_model,
+                                 positioning_length=100, objectives_length=80, module_content_length=60,
+                                 focus_modules=None, prompt_mode='compact', structured_output='json_object',
+                                 repair_missing=True):
+    """
+    按字段分组并发调用不同档位的模型生成教学大纲内容
+
+    同一档位的分组合并为一次调用，各档位在事件循环中并发执行；分级调用始终使用精简提示词，
+    prompt_mode 仅为与 generate_with_ai 保持相同签名。返回结构与 generate_with_ai 一致
+    """
+    tier_models = resolve_tier_models(llm_provider, llm_model)
+    fields_by_tier = {}
+    for group, tier in resolve_group_tiers().items():
+        fields_by_tier.setdefault(tier, []).extend(FIELD_GROUPS[group])
+    logger.info("模型分级生成《{}》：{}", course_name,
+                '；'.join(f'{tier_models[tier]}={len(fields)}项' for tier, fields in fields_by_tier.items()))
+
+    async def run(model, fields):
+        prompt = build_compact_prompt(course_name, exclude_items,
+                                      system_prompt, user_prompt,
+                                      positioning_length, objectives_length, module_content_length,
+                                      focus_modules=focus_modules, fields=fields)
+        schema = outline_schema(fields)
+        response_format = build_response_format(llm_provider, structured_output, schema, name='teaching_outline')
+        max_tokens = outline_max_tokens(llm_provider, fields,
+                                        positioning_length, objectives_length, module_content_length)
+        response, used_model, usage = await acall_llm(llm_provider, prompt, llm_api_key, model, response_format,
+                                                      max_tokens=max_tokens)
+        record_usage('teaching_outline_routed', llm_provider.lower(), used_model, prompt, response, usage)
+        data, _ = parse_structured(response, schema, flatten_fields=MODULE_FIELDS)
+        return data
+
+    data = {}
+    # 各任务继承当前上下文，用量记录汇总到当前请求
+    results = raise_if_aborted(await asyncio.gather(
+        *(run(tier_models[tier], fields) for tier, fields in fields_by_tier.items()), return_exceptions=True))
+    for result in results:
+        if isinstance(result, Exception):
+            # 单个档位失败时其字段交由补全流程处理
+            logger.error(f"模型分级调用失败: {result}")
+        else:
+            data.update(result)
+    if not data:
+        raise RuntimeError("模型分级调用全部失败")
+
+    invalid_fields = find_invalid_fields(fill_total_hours(data))
+    if invalid_fields and repair_missing:
+        data = await arepair_outline(data, invalid_fields, course_name, exclude_items,
+                                     llm_provider, llm_api_key, tier_models['strong'],
+                                     positioning_length, objectives_length, module_content_length,
+                                     structured_output=structured_output)
+        fill_total_hours(data)
+    return data
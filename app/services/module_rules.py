@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线进度表规则
+从 templates/module_rules.yaml 读取 关键词 → 讲授/实验/作业 规则，编译为单个正则，
+一次匹配同时得到三类列表；规则文件修改后自动重新加载（检查间隔不小于 check_interval 秒）
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from loguru import logger
+
+from .app_config import PROJECT_ROOT, get_setting
+
+
+MODULE_RULES_PATH = os.path.join(PROJECT_ROOT, 'templates', 'module_rules.yaml')
+
+RULE_FIELDS = ('detail', 'practice', 'homework')
+
+# 规则文件缺失时的兜底结果
+FALLBACK_RULE = {
+    'detail': ['知识点讲解', '示例拆解', '注意事项'],
+    'practice': ['课堂实验/练习'],
+    'homework': ['阅读/小测/代码补全'],
+}
+
+
+class ModuleRules:
+    """
+    模块标题规则匹配器
+
+    所有关键词编译为一个前瞻正则 (?=(kw1|kw2|...))，单次扫描即可找出标题中的全部
+    关键词（含重叠），再取序号最小的规则；同一标题的结果按规则文件版本缓存。
+    标题来自大模型生成的内容，取值不受限，缓存按 LRU 保留最近的 max_entries 个
+    """
+
+    def __init__(self, path=MODULE_RULES_PATH, max_entries=1024, check_interval=2.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = None
+        self._mtime = None
+        self._pattern = None
+        self._keyword_rule = {}
+        self._rules = []
+        self._default = FALLBACK_RULE
+        self._cache = OrderedDict()
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        rules, default = [], FALLBACK_RULE
+        if mtime is not None:
+            import yaml
+
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            rules = [r for r in data.get('rules') or [] if r.get('keywords')]
+            default = {**FALLBACK_RULE, **(data.get('default') or {})}
+
+        keyword_rule = {}
+        for idx, rule in enumerate(rules):
+            for keyword in rule['keywords']:
+                keyword_rule.setdefault(str(keyword), idx)
+        # 长关键词优先，保证同一位置取最长匹配
+        alternation = '|'.join(re.escape(k) for k in sorted(keyword_rule, key=len, reverse=True))
+        self._pattern = re.compile(f'(?=({alternation}))') if alternation else None
+        self._keyword_rule, self._rules, self._default = keyword_rule, rules, default
+        self._mtime = mtime
+        self._cache.clear()
+        logger.info("离线进度表规则已加载: {} 条规则，{} 个关键词", len(rules), len(keyword_rule))
+
+    def lookup(self, module):
+        """
+        按模块标题查找讲授要点、实验/实践与作业
+
+        Returns:
+            tuple: (讲授 list, 实验/实践 list, 作业 list)
+        """
+        module = str(module or '')
+        with self._lock:
+            self._reload_if_changed()
+            cached = self._cache.get(module)
+            if cached is not None:
+                self._cache.move_to_end(module)
+            else:
+                rule = self._default
+                if self._pattern is not None:
+                    hits = [self._keyword_rule[m.group(1)] for m in self._pattern.finditer(module)]
+                    if hits:
+                        rule = {**self._default, **self._rules[min(hits)]}
+                topic = module.split('：', 1)[-1]
+                cached = tuple(tuple(str(item).replace('{topic}', topic) for item in rule.get(field) or ())
+                               for field in RULE_FIELDS)
+                self._cache[module] = cached
+                if len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return tuple(list(items) for items in cached)
+
+
+_module_rules = None
+_module_rules_lock = threading.Lock()
+
+
+def get_module_rules():
+    """获取全局进度表规则（结果缓存条数与规则文件检查间隔取自配置 [syllabus] rule_cache_entries、rule_check_interval）"""
+    global _module_rules
+    with _module_rules_lock:
+        if _module_rules is None:
+            _module_rules = ModuleRules(
+                max_entries=get_setting('syllabus', 'rule_cache_entries', fallback=1024, type=int),
+                check_interval=get_setting('syllabus', 'rule_check_interval', fallback=2.0, type=float),
+            )
+        return _module_rules
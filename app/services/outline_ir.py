@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+教学大纲中间表示
+将页面/接口传来的大纲数据（扁平的 教学模块N 字段或 modules 数组、schedule_table 进度表）
+一次性解析为紧凑的类型化结构，Markdown、HTML、Word 导出均基于同一份中间表示；
+解析结果按内容摘要缓存，同一大纲的多次导出无需重复解析
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .app_config import get_setting
+from .docx_cache import canonical_outline_hash
+
+
+# 教学模块字段（与 teaching_outline_generator.MODULE_FIELDS 一致）及对应属性名
+MODULE_ATTRS = (
+    ('教学模块', 'name'),
+    ('教学内容及重点、难点', 'content'),
+    ('职业技能要求', 'skills'),
+    ('课时', 'hours'),
+    ('教学方法建议', 'method'),
+)
+
+MODULE_KEY_PATTERN = re.compile(r'^(%s)(\d+)$' % '|'.join(re.escape(field) for field, _ in MODULE_ATTRS))
+
+# 进度表行字段及对应属性名（列表字段保存为元组）
+SCHEDULE_ATTRS = (
+    ('周次', 'week'),
+    ('教学内容', 'content'),
+    ('学时', 'hours'),
+)
+SCHEDULE_LIST_ATTRS = (
+    ('讲授', 'lectures'),
+    ('实验/实践', 'practice'),
+    ('作业', 'homework'),
+)
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _items(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_text(v) for v in value)
+    return (_text(value),) if value not in (None, '') else ()
+
+
+@dataclass(slots=True, frozen=True)
+class OutlineModule:
+    """教学模块（一行教学内容）"""
+    number: int
+    name: str = ''
+    content: str = ''
+    skills: str = ''
+    hours: str = ''
+    method: str = ''
+
+
+@dataclass(slots=True, frozen=True)
+class ScheduleRow:
+    """教学进度表的一周"""
+    week: object = ''
+    content: str = ''
+    hours: object = ''
+    lectures: tuple = ()
+    practice: tuple = ()
+    homework: tuple = ()
+
+    def to_dict(self):
+        row = {field: getattr(self, attr) for field, attr in SCHEDULE_ATTRS}
+        row.update({field: list(getattr(self, attr)) for field, attr in SCHEDULE_LIST_ATTRS})
+        return row
+
+
+@dataclass(slots=True, frozen=True)
+class Outline:
+    """
+    教学大纲
+
+    fields 保存课程名称与模块之外的其余字段（课程编码、课程定位等，键名不变），
+    modules 按编号排序，digest 为扁平数据的规范化摘要（同时用作各类缓存的键）
+    """
+    course_name: str
+    fields: dict
+    modules: tuple
+    schedule: tuple
+    digest: str
+
+    @classmethod
+    def from_payload(cls, data):
+        """解析大纲数据；教学模块可以是扁平的 教学模块N 字段，也可以是 modules 数组"""
+        fields, flat_modules = {}, {}
+        for key, value in data.items():
+            if key in ('课程名称', 'modules', 'schedule_table'):
+                continue
+            match = MODULE_KEY_PATTERN.match(key)
+            if match:
+                flat_modules.setdefault(int(match.group(2)), {})[match.group(1)] = _text(value)
+            else:
+                fields[key] = value
+
+        if not flat_modules and isinstance(data.get('modules'), list):
+            for index, module in enumerate(data['modules'], 1):
+                if isinstance(module, dict):
+                    number = module.get('模块编号') or index
+                    flat_modules[int(number)] = {field: _text(module.get(field)) for field, _ in MODULE_ATTRS}
+
+        modules = tuple(
+            OutlineModule(number, **{attr: values.get(field, '') for field, attr in MODULE_ATTRS})
+            for number, values in sorted(flat_modules.items())
+        )
+        schedule = tuple(
+            ScheduleRow(**{attr: row.get(field, '') for field, attr in SCHEDULE_ATTRS},
+                        **{attr: _items(row.get(field)) for field, attr in SCHEDULE_LIST_ATTRS})
+            for row in data.get('schedule_table') or () if isinstance(row, dict)
+        )
+        outline = cls(_text(data.get('课程名称')).strip(), fields, modules, schedule, '')
+        object.__setattr__(outline, 'digest', canonical_outline_hash(outline.to_flat()))
+        return outline
+
+    def to_flat(self):
+        """转换为模板使用的扁平字段（课程名称、教学模块N、课时N……），有进度表时附带 schedule_table"""
+        flat = {'课程名称': self.course_name, **self.fields}
+        for module in self.modules:
+            for field, attr in MODULE_ATTRS:
+                flat[f'{field}{module.number}'] = getattr(module, attr)
+        if self.schedule:
+            flat['schedule_table'] = [row.to_dict() for row in self.schedule]
+        return flat
+
+
+class OutlineCache:
+    """中间表示缓存（LRU），按摘要查找"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, digest):
+        with self._lock:
+            outline = self._entries.get(digest)
+            if outline is not None:
+                self._entries.move_to_end(digest)
+            return outline
+
+    def put(self, outline):
+        with self._lock:
+            self._entries[outline.digest] = outline
+            self._entries.move_to_end(outline.digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return outline
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_outline_cache():
+    """获取全局中间表示缓存（条目数取自配置 [export] outline_cache_entries）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OutlineCache(get_setting('export', 'outline_cache_entries', fallback=256, type=int))
+        return _cache
+
+
+def build_outline(data):
+    """解析大纲数据并放入缓存，返回中间表示"""
+    outline = Outline.from_payload(data)
+    cached = get_outline_cache().get(outline.digest)
+    return cached or get_outline_cache().put(outline)
+
+
+def get_outline(digest):
+    """按摘要取已缓存的中间表示，不存在时返回 None"""
+    return get_outline_cache().get(digest)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史大纲库
+将成功生成的教学大纲保存到 SQLite，生成前按课程名称相似度（rapidfuzz）查找可复用的大纲
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+from .app_config import PROJECT_ROOT, get_setting
+from .text_utils import course_variant, extract_keywords, normalize_course_name
+
+
+# 复用大纲时随请求变化、不从库中取的字段
+REQUEST_FIELDS = ('课程名称', '编写日期', '考核方式及成绩评定办法')
+
+
+def settings_signature(**settings):
+    """生成参数签名：排除项、提示词、字数等设置相同的大纲才可直接复用"""
+    payload = json.dumps({k: settings[k] for k in sorted(settings)}, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class OutlineLibrary:
+    """
+    历史大纲库
+
+    SQLite 负责持久化，内存中维护 规范化名称 → 记录 及 关键词 → 记录 的倒排索引，
+    查询时先精确匹配，再在共享关键词的候选集上做模糊匹配
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # 每个参数签名一组：{'names': {规范化名称: id}, 'keywords': {关键词: set(规范化名称)}}
+        self._index = {}
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outlines (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    course_name TEXT NOT NULL,
+                    normalized_name TEXT NOT NULL,
+                    keywords TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    outline_json TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (normalized_name, signature)
+                )
+            """)
+            rows = conn.execute("SELECT id, course_name, normalized_name, signature FROM outlines").fetchall()
+            indexed = []
+            for row_id, course_name, normalized_name, signature in rows:
+                # 规范化规则变化后（如保留 + #）按原课程名称重新规范化；与已有记录冲突时保留已有记录
+                renamed = normalize_course_name(course_name)
+                if renamed != normalized_name:
+                    if not conn.execute("UPDATE OR IGNORE outlines SET normalized_name = ?, keywords = ? WHERE id = ?",
+                                        (renamed, ' '.join(sorted(extract_keywords(renamed))), row_id)).rowcount:
+                        continue
+                indexed.append((row_id, renamed, signature))
+        for row_id, normalized_name, signature in indexed:
+            self._add_to_index(row_id, normalized_name, signature)
+        logger.info("历史大纲库已加载: {} 条记录", len(rows))
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _add_to_index(self, row_id, normalized_name, signature):
+        group = self._index.setdefault(signature, {'names': {}, 'keywords': {}})
+        group['names'][normalized_name] = row_id
+        for keyword in extract_keywords(normalized_name):
+            group['keywords'].setdefault(keyword, set()).add(normalized_name)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(group['names']) for group in self._index.values())
+
+    def save(self, course_name, outline, signature):
+        """保存（或覆盖）某课程在该参数签名下的大纲"""
+        normalized_name = normalize_course_name(course_name)
+        if not normalized_name:
+            return None
+        keywords = ' '.join(sorted(extract_keywords(normalized_name)))
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO outlines (course_name, normalized_name, keywords, signature, outline_json, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (normalized_name, signature) DO UPDATE SET
+                    course_name = excluded.course_name,
+                    outline_json = excluded.outline_json,
+                    created_at = excluded.created_at
+            """, (course_name, normalized_name, keywords, signature,
+                  json.dumps(outline, ensure_ascii=False), time.time()))
+            row_id = conn.execute("SELECT id FROM outlines WHERE normalized_name = ? AND signature = ?",
+                                  (normalized_name, signature)).fetchone()[0]
+            self._add_to_index(row_id, normalized_name, signature)
+        return row_id
+
+    def search(self, course_name, signature=None, threshold=75, limit=5, same_variant=False):
+        """
+        按课程名称相似度查找历史大纲
+
+        Args:
+            course_name: 课程名称
+            signature: 参数签名，None 表示不限
+            threshold: 最低相似度（0-100）
+            limit: 最多返回条数
+            same_variant: 只返回 + #、册次/级别标记与查询相同的课程（见 course_variant）
+
+        Returns:
+            list: [{'id', 'course_name', 'score', 'signature'}]，按相似度降序
+        """
+        query = normalize_course_name(course_name)
+        if not query:
+            return []
+        keywords = extract_keywords(query)
+        variant = course_variant(query)
+        from rapidfuzz import fuzz, process
+
+        matches = []
+        with self._lock:
+            groups = [(signature, self._index.get(signature))] if signature else list(self._index.items())
+            for sig, group in groups:
+                if not group:
+                    continue
+                if query in group['names']:
+                    matches.append((query, 100.0, group['names'][query], sig))
+                    continue
+                candidates = set()
+                for keyword in keywords:
+                    candidates |= group['keywords'].get(keyword, set())
+                if same_variant:
+                    candidates = {name for name in candidates if course_variant(name) == variant}
+                for name, score, _ in process.extract(query, list(candidates), scorer=fuzz.ratio,
+                                                      score_cutoff=threshold, limit=limit):
+                    matches.append((name, score, group['names'][name], sig))
+        matches.sort(key=lambda m: m[1], reverse=True)
+
+        results = []
+        if matches:
+            ids = [m[2] for m in matches[:limit]]
+            with self._connect() as conn:
+                names = dict(conn.execute(
+                    f"SELECT id, course_name FROM outlines WHERE id IN ({','.join('?' * len(ids))})", ids))
+            for _, score, row_id, sig in matches[:limit]:
+                results.append({'id': row_id, 'course_name': names.get(row_id, ''),
+                                'score': round(score, 1), 'signature': sig})
+        return results
+
+    def get(self, row_id):
+        """读取一条历史大纲并记录命中次数"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT course_name, outline_json, created_at FROM outlines WHERE id = ?",
+                               (row_id,)).fetchone()
+            if not row:
+                return None
+            conn.execute("UPDATE outlines SET hits = hits + 1 WHERE id = ?", (row_id,))
+        return {'id': row_id, 'course_name': row[0], 'outline': json.loads(row[1]), 'created_at': row[2]}
+
+    def age(self, course_name, signature):
+        """
+        某课程在该参数签名下的大纲已保存多久
+
+        Returns:
+            float: 距保存时间的秒数；没有记录时为 None
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT created_at FROM outlines WHERE normalized_name = ? AND signature = ?",
+                               (normalize_course_name(course_name), signature)).fetchone()
+        return time.time() - row[0] if row else None
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def library_enabled():
+    """是否把生成的完整大纲存入历史大纲库"""
+    return get_setting('library', 'enabled', fallback=True, type=bool)
+
+
+def library_reuse():
+    """
+    未指定时是否直接复用库中的大纲（默认否：复用时不调用大模型，同一课程再次生成会得到同一份大纲）
+    """
+    return get_setting('library', 'reuse', fallback=False, type=bool)
+
+
+def library_ttl():
+    """历史大纲的有效期（秒），0 表示不过期"""
+    return get_setting('library', 'ttl', fallback=0.0, type=float)
+
+
+def get_library():
+    """获取全局历史大纲库（首次调用时加载）"""
+    global _library
+    with _library_lock:
+        if _library is None:
+            db_path = get_setting('library', 'db_path', fallback='output/outline_library.db')
+            if not os.path.isabs(db_path):
+                db_path = os.path.join(PROJECT_ROOT, db_path)
+            _library = OutlineLibrary(db_path)
+        return _library
+
+
+def adapt_outline(stored_outline, stored_course_name, course_name):
+    """将相似课程的大纲改写为当前课程：替换正文中的课程名称，去掉随请求变化的字段"""
+    adapted = {}
+    for key, value in stored_outline.items():
+        if key in REQUEST_FIELDS:
+            continue
+        if isinstance(value, str) and stored_course_name and stored_course_name != course_name:
+            value = value.replace(stored_course_name, course_name)
+        adapted[key] = value
+    return adapted
+
+
+def find_reusable_outline(course_name, signature):
+    """
+    查找可直接复用的历史大纲（参数签名相同、相似度不低于 reuse_threshold、版本标记相同且未超过有效期）
+
+    Returns:
+        tuple: (改写后的大纲 dict, 匹配信息 dict)，未找到时为 (None, None)
+    """
+    threshold = get_setting('library', 'reuse_threshold', fallback=95.0, type=float)
+    start = time.perf_counter()
+    matches = get_library().search(course_name, signature=signature, threshold=threshold, limit=1,
+                                   same_variant=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if not matches:
+        logger.debug("历史大纲库未命中《{}》({:.1f}ms)", course_name, elapsed_ms)
+        return None, None
+
+    match = matches[0]
+    record = get_library().get(match['id'])
+    if not record:
+        return None, None
+    ttl = library_ttl()
+    if ttl and time.time() - record['created_at'] > ttl:
+        logger.info("历史大纲《{}》已过期，重新生成", record['course_name'])
+        return None, None
+    logger.info("历史大纲库命中《{}》→《{}》(相似度={}, {:.1f}ms)",
+                course_name, record['course_name'], match['score'], elapsed_ms)
+    return adapt_outline(record['outline'], record['course_name'], course_name), match
+
+
+def save_outline(course_name, outline, signature):
+    """保存成功生成的大纲，失败时只记录日志"""
+    try:
+        get_library().save(course_name, outline, signature)
+    except Exception as e:
+        logger.error(f"保存历史大纲失败: {e}")
@@ -1,13 +1,25 @@
 import os
-import yaml
-from jinja2 import Template
+import threading
+
+_parsed = {}
+_compiled = {}
+_cache_lock = threading.Lock()
 
 
 def parse_md_template(md_path: str):
     """
     读取带 YAML Front Matter 的 Markdown 模板
     返回：fields(dict), template_body(str), meta(dict)
+    解析结果按文件修改时间缓存，文件修改后重新解析
     """
+    mtime = os.path.getmtime(md_path)
+    with _cache_lock:
+        cached = _parsed.get(md_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    import yaml
+
     with open(md_path, 'r', encoding='utf-8') as f:
         content = f.read()
 
@@ -21,9 +33,24 @@ def parse_md_template(md_path: str):
         body = content
 
     fields = (meta or {}).get('fields', {})
-    return fields, body, meta
+    result = (fields, body, meta)
+    with _cache_lock:
+        _parsed[md_path] = (mtime, result)
+    return result
+
+
+def compile_template(template_str: str):
+    """编译 Jinja2 模板，相同模板内容只编译一次"""
+    with _cache_lock:
+        template = _compiled.get(template_str)
+    if template is None:
+        from jinja2 import Template
+
+        template = Template(template_str)
+        with _cache_lock:
+            _compiled[template_str] = template
+    return template
 
 
 def render_to_markdown(template_str: str, data: dict) -> str:
-    template = Template(template_str)
-    return template.render(**data)
\ No newline at end of file
+    return compile_template(template_str).render(**data)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求频率统计
+按天记录各课程（及生成参数）的请求次数，供缓存预热选出最常用的课程
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+from .app_config import PROJECT_ROOT, get_setting
+from .text_utils import normalize_course_name
+
+
+# 参与统计的生成参数（不含API密钥等随用户变化的字段）
+STAT_SETTINGS = (
+    'exclude_items', 'system_prompt', 'user_prompt', 'focus_modules',
+    'positioning_length', 'objectives_length', 'module_content_length',
+    'prompt_mode', 'structured_output',
+)
+
+
+class RequestStats:
+    """请求频率统计（SQLite）"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS request_stats (
+                    day TEXT NOT NULL,
+                    normalized_name TEXT NOT NULL,
+                    settings_json TEXT NOT NULL,
+                    course_name TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    last_seen REAL NOT NULL,
+                    PRIMARY KEY (day, normalized_name, settings_json)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def record(self, course_name, settings):
+        """记录一次生成请求"""
+        normalized_name = normalize_course_name(course_name)
+        if not normalized_name:
+            return
+        settings_json = json.dumps({k: settings.get(k) for k in STAT_SETTINGS}, ensure_ascii=False, sort_keys=True)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO request_stats (day, normalized_name, settings_json, course_name, count, last_seen)
+                VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (day, normalized_name, settings_json) DO UPDATE SET
+                    count = count + 1,
+                    course_name = excluded.course_name,
+                    last_seen = excluded.last_seen
+            """, (time.strftime('%Y-%m-%d', time.localtime(now)), normalized_name, settings_json, course_name, now))
+
+    def top(self, limit=100, days=30):
+        """
+        最近 days 天请求最多的 课程+参数 组合
+
+        Returns:
+            list: [{'course_name', 'settings', 'count', 'last_seen'}]，按请求次数降序
+        """
+        since = time.strftime('%Y-%m-%d', time.localtime(time.time() - days * 86400))
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT normalized_name, settings_json, SUM(count) AS total, MAX(last_seen) AS last_seen,
+                       (SELECT course_name FROM request_stats r2
+                        WHERE r2.normalized_name = r1.normalized_name AND r2.settings_json = r1.settings_json
+                        ORDER BY last_seen DESC LIMIT 1)
+                FROM request_stats r1
+                WHERE day >= ?
+                GROUP BY normalized_name, settings_json
+                ORDER BY total DESC, last_seen DESC
+                LIMIT ?
+            """, (since, limit)).fetchall()
+        return [{'course_name': course_name, 'settings': json.loads(settings_json), 'count': total,
+                 'last_seen': last_seen}
+                for _, settings_json, total, last_seen, course_name in rows]
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_request_stats():
+    """获取全局请求频率统计"""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            db_path = get_setting('warmer', 'stats_db', fallback='output/request_stats.db')
+            if not os.path.isabs(db_path):
+                db_path = os.path.join(PROJECT_ROOT, db_path)
+            _stats = RequestStats(db_path)
+        return _stats
+
+
+def record_request(course_name, settings):
+    """记录生成请求，失败时只记录日志"""
+    try:
+        get_request_stats().record(course_name, settings)
+    except Exception as e:
+        logger.error(f"记录请求统计失败: {e}")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预取结果缓存
+预取请求在后台低并发线程池中提前生成，随后参数相同的正式请求直接使用已完成的结果或等待进行中的任务。
+每个预取结果只使用一次：用户再次点击生成时重新调用大模型，而不是在有效期内重复返回同一份大纲。
+已完成的结果同时写入共享存储，其他实例（或重启后的本实例）也可取用
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from loguru import logger
+
+from .app_config import get_setting
+
+
+# 不参与缓存键、由正式请求单独填写的字段
+PASSTHROUGH_FIELDS = ('write_date', 'assessment_method')
+
+
+def cache_key(kind, params):
+    """
+    计算缓存键
+
+    Args:
+        kind: 结果类型（如 teaching_outline）
+        params: 生成参数；API密钥只以摘要参与计算，不同密钥的结果互不共享
+    """
+    canonical = {k: v for k, v in params.items() if k not in PASSTHROUGH_FIELDS}
+    if canonical.get('llm_api_key'):
+        canonical['llm_api_key'] = hashlib.sha256(canonical['llm_api_key'].encode('utf-8')).hexdigest()
+    payload = json.dumps([kind, canonical], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    预取结果缓存
+
+    每个键对应一个 Future：进行中的任务与已完成的结果统一以 Future 表示，正式请求取走后即从缓存中移除；
+    失败的任务不缓存。按 LRU 淘汰，超过 TTL 的结果视为失效。
+    store 为共享存储后端时，内存未命中再查共享存储，取走时一并删除
+    """
+
+    def __init__(self, ttl=3600, max_entries=256, workers=2, store=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._store = store
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 键 → (创建时间, Future)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self._stats = {'hits': 0, 'attached': 0, 'misses': 0, 'prefetched': 0, 'shared_hits': 0}
+
+    def _evict(self, now):
+        for key in [k for k, (created, _) in self._entries.items() if now - created > self.ttl]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def take(self, key):
+        """
+        取走预取结果（只能取走一次）
+
+        Returns:
+            Future: 已完成或进行中的结果；未命中时为 None
+        """
+        with self._lock:
+            now = time.time()
+            entry = self._entries.pop(key, None)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._stats['hits' if entry[1].done() else 'attached'] += 1
+                found = entry[1]
+            else:
+                found = None
+
+        if found is not None:
+            self._discard(key)
+            return found
+        stored = self._load(key)
+        if stored is not None:
+            self._discard(key)
+        with self._lock:
+            if stored is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['shared_hits'] += 1
+        future = Future()
+        future.set_result(stored[1])
+        return future
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        在后台生成结果，同一键已有有效结果或进行中的任务时不重复提交
+
+        Returns:
+            tuple: (Future, 是否新提交)
+        """
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                return entry[1], False
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._entries[key] = (now, future)
+            self._stats['prefetched'] += 1
+            self._evict(now)
+        future.add_done_callback(lambda f: self._on_done(key, now, f))
+        return future, True
+
+    def _on_done(self, key, created, future):
+        """后台任务结束：尚未被取走的成功结果写入共享存储，失败的从缓存中移除"""
+        if future.cancelled() or future.exception() is not None:
+            if not future.cancelled():
+                logger.error("后台生成失败: {}", future.exception())
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] is future:
+                    del self._entries[key]
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            pending = entry is not None and entry[1] is future
+        if pending:
+            self._save(key, created, future.result())
+
+    def _load(self, key):
+        """从共享存储读取未过期的结果，返回 (创建时间, 结果) 或 None；已过期的随即删除"""
+        if self._store is None:
+            return None
+        try:
+            data = self._store.get(f'responses/{key}')
+            if data is None:
+                return None
+            record = json.loads(data)
+        except Exception as e:
+            logger.error(f"读取共享缓存失败: {e}")
+            return None
+        if time.time() - record['created'] > self.ttl:
+            self._discard(key)
+            return None
+        return record['created'], record['value']
+
+    def _discard(self, key):
+        if self._store is None:
+            return
+        try:
+            self._store.delete(f'responses/{key}')
+        except Exception as e:
+            logger.error(f"删除共享缓存失败: {e}")
+
+    def _save(self, key, created, value):
+        if self._store is None:
+            return
+        try:
+            record = json.dumps({'created': created, 'value': value}, ensure_ascii=False)
+            self._store.put(f'responses/{key}', record.encode('utf-8'))
+        except Exception as e:
+            logger.error(f"写入共享缓存失败: {e}")
+
+    def stats(self):
+        with self._lock:
+            pending = sum(1 for _, future in self._entries.values() if not future.done())
+            return {**self._stats, 'entries': len(self._entries), 'pending': pending}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """获取全局预取结果缓存（参数取自配置 [cache]，[storage] share_responses 决定是否写入共享存储）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            store = None
+            if get_setting('storage', 'share_responses', fallback=True, type=bool):
+                from .storage import get_storage
+                store = get_storage()
+            _cache = ResponseCache(
+                ttl=get_setting('cache', 'ttl', fallback=3600, type=int),
+                max_entries=get_setting('cache', 'max_entries', fallback=256, type=int),
+                workers=get_setting('cache', 'prefetch_workers', fallback=2, type=int),
+                store=store,
+            )
+        return _cache
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时统计与后台预热
+记录各启动阶段与模块导入的耗时（python run.py --startup-report 输出报告）；服务开始监听后
+在后台线程中预先加载 Word 模板、Markdown 模板、大模型调用共用的 SSL 上下文与存储后端，
+首个请求不再承担这些开销。大模型调用的 httpx.AsyncClient 属于各自的事件循环，每次调用新建，
+不预建连接池。本模块只依赖标准库，须在其他模块之前导入才能统计全部导入耗时
+"""
+
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+_start = time.perf_counter()
+_phases = []
+_phases_lock = threading.Lock()
+
+
+def elapsed_ms():
+    """自启动起经过的毫秒数"""
+    return (time.perf_counter() - _start) * 1000
+
+
+def mark(name):
+    """记录到达某个启动节点的时间"""
+    with _phases_lock:
+        _phases.append((name, elapsed_ms(), None))
+
+
+@contextmanager
+def phase(name):
+    """记录一个启动阶段的耗时"""
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        with _phases_lock:
+            _phases.append((name, (end - _start) * 1000, (end - begin) * 1000))
+
+
+class ImportTimer:
+    """
+    统计模块首次导入的耗时（替换 builtins.__import__）
+
+    records: 模块名 → [累计耗时, 自身耗时]（毫秒），自身耗时不含其间导入的其他模块
+    """
+
+    def __init__(self):
+        self.records = {}
+        self._original = None
+        self._children = []
+
+    def _new_modules(self, name, globals, fromlist, level):
+        if level:
+            package = (globals or {}).get('__package__') or ''
+            try:
+                name = importlib.util.resolve_name('.' * level + name, package)
+            except (ImportError, ValueError):
+                return []
+        names = [name] + [f"{name}.{item}" for item in fromlist or () if item != '*']
+        return [n for n in names if n and n not in sys.modules]
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        new = self._new_modules(name, globals, fromlist, level)
+        if not new:
+            return self._original(name, globals, locals, fromlist, level)
+        self._children.append(0.0)
+        begin = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            total = (time.perf_counter() - begin) * 1000
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += total
+            loaded = [n for n in new if n in sys.modules]
+            if loaded:
+                self.records[loaded[0]] = [total, total - children]
+
+    def install(self):
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+
+_import_timer = None
+
+
+def enable_import_timing():
+    """开始统计导入耗时（应在导入应用模块之前调用）"""
+    global _import_timer
+    if _import_timer is None:
+        _import_timer = ImportTimer()
+        _import_timer.install()
+    return _import_timer
+
+
+def startup_report(top=15):
+    """启动耗时报告：各阶段耗时，以及自身耗时最多的模块导入"""
+    lines = ['启动阶段（自启动起 ms / 阶段耗时 ms）:']
+    with _phases_lock:
+        phases = list(_phases)
+    for name, at, duration in phases:
+        lines.append(f"  {name:<28} {at:>9.1f}" + (f" {duration:>9.1f}" if duration is not None else ''))
+    if _import_timer is not None:
+        records = sorted(_import_timer.records.items(), key=lambda item: item[1][1], reverse=True)
+        total = sum(self_ms for _, (_, self_ms) in records)
+        lines.append(f"模块导入（共 {len(records)} 个，合计 {total:.1f} ms；自身 ms / 累计 ms）:")
+        for name, (cumulative, self_ms) in records[:top]:
+            lines.append(f"  {name:<40} {self_ms:>8.1f} {cumulative:>9.1f}")
+    return '\n'.join(lines)
+
+
+def _warm_template_registry():
+    from .template_registry import get_template_registry
+
+    get_template_registry().refresh(force=True)
+
+
+def _warm_word_template():
+    from docx import Document
+    from .docx_cache import get_docx_cache
+    from .template_registry import get_template
+
+    path = get_template(kind='docx').path
+    Document(path)
+    get_docx_cache().template_hash(path)
+
+
+def _warm_markdown_templates():
+    from .markdown_html import convert
+    from .renderer import parse_md_template
+    from .template_registry import get_template
+
+    parse_md_template(get_template(kind='md').path)
+    convert('| 预热 |\n| --- |\n| 1 |')
+
+
+def _warm_ssl_and_storage():
+    from .llm_client import ssl_context
+    from .storage import get_storage
+
+    ssl_context()
+    get_storage()
+
+
+WARM_UP_STEPS = (
+    ('template_registry', _warm_template_registry),
+    ('word_template', _warm_word_template),
+    ('markdown_templates', _warm_markdown_templates),
+    ('ssl_and_storage', _warm_ssl_and_storage),
+)
+
+
+def warm_up():
+    """依次执行各预热步骤；某一步失败只记录日志，不影响服务"""
+    from loguru import logger
+
+    with phase('warm_up'):
+        for name, step in WARM_UP_STEPS:
+            try:
+                with phase(f'warm_up.{name}'):
+                    step()
+            except Exception as e:
+                logger.warning("启动预热 {} 失败: {}", name, e)
+
+
+def start_warm_up():
+    """在后台线程中预热（服务开始监听后调用），返回线程"""
+    thread = threading.Thread(target=warm_up, name='startup-warm-up', daemon=True)
+    thread.start()
+    return thread
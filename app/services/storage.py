@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享存储
+生成的文件（Markdown、Word）与大模型结果缓存统一通过存储后端读写，多个实例配置同一后端
+（共享目录、SQLite 文件或键值服务）后，任一实例生成的文件都可由其他实例提供下载。
+后端由配置 [storage] backend 选择：local / sqlite / http。
+保存的内容按命名空间设有保留时间（见 retention_policy），后台线程定期清理过期内容
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from loguru import logger
+
+from .app_config import PROJECT_ROOT, get_setting
+
+
+# 键由字母、数字及 _ . - / 组成，/ 分隔命名空间，如 artifacts/<sha256>
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+(/[A-Za-z0-9_.-]+)*$')
+
+
+def validate_key(key):
+    """检查键的格式，拒绝 .. 等可能越出存储目录的键"""
+    if not isinstance(key, str) or not KEY_PATTERN.match(key) or '..' in key.split('/'):
+        raise ValueError(f"无效的存储键: {key!r}")
+    return key
+
+
+def content_key(data, namespace='artifacts'):
+    """按内容计算键：<namespace>/<sha256>"""
+    return f"{namespace}/{hashlib.sha256(data).hexdigest()}"
+
+
+class StorageBackend:
+    """
+    存储后端接口
+
+    put 须保证原子性：读取方只会看到旧内容或完整的新内容，不会读到写了一半的数据
+    """
+
+    def get(self, key):
+        """读取内容，不存在时返回 None"""
+        raise NotImplementedError
+
+    def put(self, key, data):
+        """写入（覆盖）内容"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """删除内容，不存在时忽略"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        return self.get(key) is not None
+
+    def modified(self, key):
+        """最后写入时间（时间戳），不存在或后端不支持时返回 None"""
+        return None
+
+    def touch(self, key, data):
+        """内容已存在时更新其修改时间（推迟过期清理），不存在时写入；默认重新写入"""
+        self.put(key, data)
+
+    def keys(self, namespace):
+        """
+        列出命名空间下的全部键
+
+        Returns:
+            list: [(键, 修改时间)]
+
+        Raises:
+            NotImplementedError: 后端不支持列出键
+        """
+        raise NotImplementedError
+
+    def prune(self, namespace, max_age, now=None):
+        """
+        删除命名空间下修改时间早于 max_age 秒之前的内容
+
+        Returns:
+            int: 删除的条数
+        """
+        cutoff = (now or time.time()) - max_age
+        removed = 0
+        for key, modified in self.keys(namespace):
+            if modified < cutoff:
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def put_content(self, data, namespace='artifacts'):
+        """
+        按内容寻址保存：键由内容的 SHA-256 决定，相同内容只保存一份；
+        已存在时只更新修改时间，刚返回给客户端的文件不会被过期清理
+
+        Returns:
+            str: 内容键
+        """
+        key = content_key(data, namespace)
+        self.touch(key, data)
+        return key
+
+
+class LocalStorage(StorageBackend):
+    """本地（或共享挂载的）目录：先写临时文件再 os.replace，保证原子替换"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, *validate_key(key).split('/'))
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def modified(self, key):
+        try:
+            return os.path.getmtime(self._path(key))
+        except OSError:
+            return None
+
+    def touch(self, key, data):
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            self.put(key, data)
+
+    def keys(self, namespace):
+        directory = self._path(namespace)
+        found = []
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                # 跳过写入中的临时文件
+                if filename.startswith('.tmp-'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    modified = os.path.getmtime(path)
+                except OSError:
+                    continue
+                found.append(('/'.join([namespace, *os.path.relpath(path, directory).split(os.sep)]), modified))
+        return found
+
+    def put(self, key, data):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite 文件：每次写入为单条事务"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    key TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM blobs WHERE key = ?", (validate_key(key),)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def exists(self, key):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM blobs WHERE key = ?", (validate_key(key),)).fetchone() is not None
+
+    def modified(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT updated_at FROM blobs WHERE key = ?", (validate_key(key),)).fetchone()
+        return row[0] if row else None
+
+    def touch(self, key, data):
+        with self._connect() as conn:
+            updated = conn.execute("UPDATE blobs SET updated_at = ? WHERE key = ?",
+                                   (time.time(), validate_key(key))).rowcount
+        if not updated:
+            self.put(key, data)
+
+    def keys(self, namespace):
+        # 键中不含 GLOB 通配符（见 KEY_PATTERN）
+        with self._connect() as conn:
+            return conn.execute("SELECT key, updated_at FROM blobs WHERE key GLOB ?",
+                                (f"{validate_key(namespace)}/*",)).fetchall()
+
+    def prune(self, namespace, max_age, now=None):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM blobs WHERE key GLOB ? AND updated_at < ?",
+                                (f"{validate_key(namespace)}/*", (now or time.time()) - max_age)).rowcount
+
+    def put(self, key, data):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO blobs (key, data, updated_at) VALUES (?, ?, ?)",
+                         (validate_key(key), sqlite3.Binary(data), time.time()))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM blobs WHERE key = ?", (validate_key(key),))
+
+
+class HttpKVStorage(StorageBackend):
+    """
+    键值服务：GET/PUT/DELETE/HEAD {url}/kv/<key>
+
+    服务端可以是 kv_server（python run.py kv-server）或任何实现同样接口的服务。
+    接口不支持列出键，过期内容由服务端清理（kv_server 自带清理线程）
+    """
+
+    def __init__(self, url, timeout=10):
+        import httpx
+
+        self.url = url.rstrip('/')
+        self._client = httpx.Client(timeout=timeout)
+
+    def _url(self, key):
+        return f"{self.url}/kv/{validate_key(key)}"
+
+    def get(self, key):
+        response = self._client.get(self._url(key))
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.content
+
+    def exists(self, key):
+        response = self._client.head(self._url(key))
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def modified(self, key):
+        response = self._client.head(self._url(key))
+        if response.status_code == 404 or 'Last-Modified' not in response.headers:
+            return None
+        response.raise_for_status()
+        return parsedate_to_datetime(response.headers['Last-Modified']).timestamp()
+
+    def put(self, key, data):
+        self._client.put(self._url(key), content=data,
+                         headers={'Content-Type': 'application/octet-stream'}).raise_for_status()
+
+    def delete(self, key):
+        response = self._client.delete(self._url(key))
+        if response.status_code != 404:
+            response.raise_for_status()
+
+
+def _resolve_path(path):
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def create_storage(backend=None):
+    """按配置 [storage] 创建存储后端"""
+    backend = (backend or get_setting('storage', 'backend', fallback='local')).lower()
+    if backend == 'local':
+        return LocalStorage(_resolve_path(get_setting('storage', 'root', fallback='output/storage')))
+    if backend == 'sqlite':
+        return SQLiteStorage(_resolve_path(get_setting('storage', 'sqlite_path', fallback='output/storage.db')))
+    if backend == 'http':
+        return HttpKVStorage(get_setting('storage', 'url', fallback='http://127.0.0.1:5100'),
+                             timeout=get_setting('storage', 'timeout', fallback=10.0, type=float))
+    raise ValueError(f"不支持的存储后端: {backend}")
+
+
+def retention_policy():
+    """
+    各命名空间的保留秒数（0 表示不清理）
+
+    生成的文件取配置 [storage] artifact_ttl；预取结果与 [cache] ttl 相同，过期后已不可使用
+    """
+    return {
+        'artifacts': get_setting('storage', 'artifact_ttl', fallback=604800.0, type=float),
+        'responses': get_setting('cache', 'ttl', fallback=3600.0, type=float),
+    }
+
+
+def prune_storage(storage=None, policy=None):
+    """
+    按保留时间清理存储中的过期内容
+
+    Returns:
+        dict: {命名空间: 删除条数}；后端不支持清理时为空
+    """
+    storage = storage or get_storage()
+    removed = {}
+    for namespace, max_age in (policy or retention_policy()).items():
+        if max_age <= 0:
+            continue
+        try:
+            removed[namespace] = storage.prune(namespace, max_age)
+        except NotImplementedError:
+            logger.debug("存储后端 {} 不支持清理，由服务端负责", type(storage).__name__)
+            return {}
+    if any(removed.values()):
+        logger.info("已清理过期存储内容: {}", removed)
+    return removed
+
+
+def run_retention_loop(storage=None, stop_event=None, interval=None):
+    """每隔 interval 秒（默认配置 [storage] sweep_interval）清理一次过期内容"""
+    stop_event = stop_event or threading.Event()
+    if interval is None:
+        interval = get_setting('storage', 'sweep_interval', fallback=3600.0, type=float)
+    while not stop_event.is_set():
+        try:
+            prune_storage(storage)
+        except Exception as e:
+            logger.error(f"清理过期存储内容失败: {e}")
+        stop_event.wait(interval)
+
+
+def start_retention_sweeper(storage=None):
+    """
+    在后台守护线程中定期清理过期内容（[storage] sweep_interval 为 0 时不启动）
+
+    Returns:
+        threading.Event: 设置后清理线程退出；未启动时为 None
+    """
+    interval = get_setting('storage', 'sweep_interval', fallback=3600.0, type=float)
+    if interval <= 0:
+        return None
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_retention_loop, args=(storage, stop_event, interval),
+                              name='storage-retention', daemon=True)
+    thread.start()
+    return stop_event
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """获取全局存储后端"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage()
+            logger.info("存储后端: {}", type(_storage).__name__)
+        return _storage
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型结构化输出
+统一处理 JSON 模式请求参数、响应解析、字段校验与类型规整，
+并统计各解析路径（直接解析 / 代码块提取 / 大括号提取 / 截断修复 / 失败）的命中次数
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from loguru import logger
+
+
+# none：不约束输出；json_object：JSON 模式；json_schema：按 JSON Schema 约束输出
+STRUCTURED_OUTPUT_MODES = ('none', 'json_object', 'json_schema')
+
+# 各提供商支持的结构化输出方式
+PROVIDER_SUPPORT = {
+    'openai': ('json_object', 'json_schema'),
+    'deepseek': ('json_object',),
+}
+
+PARSE_PATHS = ('direct', 'fenced', 'braces', 'truncated', 'failed')
+
+_FENCED_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)```")
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def get_parse_stats():
+    """
+    获取解析路径统计
+
+    Returns:
+        dict: 各解析路径命中次数、被规整的字段数、以扁平模块字段返回的回复数及回退率
+    """
+    with _stats_lock:
+        stats = {path: _stats.get(path, 0) for path in PARSE_PATHS}
+        stats['coerced_fields'] = _stats.get('coerced_fields', 0)
+        stats['missing_fields'] = _stats.get('missing_fields', 0)
+        stats['flat_modules'] = _stats.get('flat_modules', 0)
+    total = sum(stats[path] for path in PARSE_PATHS)
+    stats['total'] = total
+    stats['fallback_rate'] = round((total - stats['direct']) / total, 4) if total else 0.0
+    return stats
+
+
+def reset_parse_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def object_schema(properties):
+    """构建严格模式的对象 Schema：所有字段必填且不允许额外字段"""
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(properties.keys()),
+        'additionalProperties': False,
+    }
+
+
+def build_response_format(provider, mode, schema=None, name='outline'):
+    """
+    根据提供商能力生成 response_format 请求参数
+
+    提供商不支持 json_schema 时降级为 json_object；都不支持时返回 None（不约束）
+
+    Args:
+        provider: 模型提供商
+        mode: 结构化输出方式，见 STRUCTURED_OUTPUT_MODES
+        schema: json_schema 模式使用的 JSON Schema
+        name: Schema 名称
+
+    Returns:
+        dict | None: 请求体中的 response_format
+    """
+    mode = mode or 'none'
+    if mode not in STRUCTURED_OUTPUT_MODES:
+        raise ValueError(f"不支持的结构化输出方式: {mode}")
+
+    supported = PROVIDER_SUPPORT.get((provider or '').lower(), ())
+    if mode == 'json_schema' and ('json_schema' not in supported or not schema):
+        mode = 'json_object'
+    if mode == 'none' or mode not in supported:
+        return None
+    if mode == 'json_object':
+        return {'type': 'json_object'}
+    return {
+        'type': 'json_schema',
+        'json_schema': {'name': name, 'strict': True, 'schema': schema},
+    }
+
+
+def _salvage_truncated(text):
+    """
+    修复被 max_tokens 截断的 JSON：回退到最后一个完整的值，再补齐未闭合的括号
+
+    Returns:
+        dict | None: 修复后的对象，文本并非截断或无法修复时返回 None
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    stack = []
+    in_string = escaped = False
+    last_cut = None
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            if not stack:
+                return None
+            stack.pop()
+            if not stack:
+                # 对象已完整闭合，说明不是截断问题
+                return None
+            last_cut = (i + 1, tuple(stack))
+        elif ch == ',':
+            last_cut = (i, tuple(stack))
+    if last_cut is None:
+        return None
+    pos, pending = last_cut
+    try:
+        return json.loads(text[start:pos] + ''.join(reversed(pending)))
+    except json.JSONDecodeError:
+        return None
+
+
+def extract_json(text):
+    """
+    从模型回复中提取 JSON 对象，并记录命中的解析路径
+
+    依次尝试：直接解析、```json 代码块、首尾大括号之间的内容、截断修复
+
+    Returns:
+        dict | None: 解析得到的对象，失败时返回 None
+    """
+    obj, path = None, 'failed'
+    if text:
+        try:
+            obj, path = json.loads(text), 'direct'
+        except json.JSONDecodeError:
+            m = _FENCED_RE.search(text)
+            if m:
+                try:
+                    obj, path = json.loads(m.group(1)), 'fenced'
+                except json.JSONDecodeError:
+                    obj = None
+            if obj is None:
+                start, end = text.find('{'), text.rfind('}')
+                if 0 <= start < end:
+                    try:
+                        obj, path = json.loads(text[start:end + 1]), 'braces'
+                    except json.JSONDecodeError:
+                        obj = None
+            if obj is None:
+                obj, path = _salvage_truncated(text), 'truncated'
+
+    if not isinstance(obj, dict):
+        obj, path = None, 'failed'
+    _count(path)
+    if path != 'direct':
+        logger.warning("模型回复未能直接解析为JSON，解析路径: {}", path)
+    return obj
+
+
+def _coerce_string(value):
+    if isinstance(value, list):
+        return '\n'.join(str(v) for v in value if v is not None)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _coerce_integer(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    m = re.search(r'\d+', str(value))
+    return int(m.group()) if m else None
+
+
+def _coerce_string_list(value):
+    if isinstance(value, str):
+        return [x.strip() for x in re.split(r'[\n,，、;；]+', value) if x.strip()]
+    return [_coerce_string(v) for v in value if v not in (None, '')]
+
+
+def coerce(value, schema, path='', problems=None):
+    """
+    按 Schema 校验并规整数据类型
+
+    支持 object / array / string / integer 子集；无法规整的值会被丢弃，
+    缺失或丢弃的字段路径记录在 problems 中
+
+    Returns:
+        规整后的值（无法规整时为 None）
+    """
+    if problems is None:
+        problems = []
+    stype = schema.get('type')
+
+    if stype == 'object':
+        if not isinstance(value, dict):
+            problems.append(path or '$')
+            return None
+        result = {}
+        properties = schema.get('properties', {})
+        for key, sub_schema in properties.items():
+            sub_path = f'{path}.{key}' if path else key
+            if key not in value or value[key] is None or value[key] == '':
+                problems.append(sub_path)
+                continue
+            sub_value = coerce(value[key], sub_schema, sub_path, problems)
+            if sub_value is not None:
+                result[key] = sub_value
+        # 非严格 Schema 时保留额外字段
+        if schema.get('additionalProperties', True) is not False:
+            for key, extra in value.items():
+                result.setdefault(key, extra)
+        return result
+
+    if stype == 'array':
+        items_schema = schema.get('items', {})
+        if items_schema.get('type') == 'string' and isinstance(value, (str, list)):
+            coerced = _coerce_string_list(value)
+            if not isinstance(value, list):
+                _count('coerced_fields')
+            return coerced
+        if not isinstance(value, list):
+            problems.append(path)
+            return None
+        result = []
+        for i, item in enumerate(value):
+            item_value = coerce(item, items_schema, f'{path}[{i}]', problems)
+            if item_value is not None:
+                result.append(item_value)
+        return result
+
+    if stype == 'integer':
+        coerced = _coerce_integer(value)
+        if coerced is None:
+            problems.append(path)
+        elif coerced is not value:
+            _count('coerced_fields')
+        return coerced
+
+    if stype == 'string':
+        if not isinstance(value, str):
+            _count('coerced_fields')
+            return _coerce_string(value)
+        return value
+
+    return value
+
+
+def flatten_modules(data, fields, key='modules', number_key='模块编号'):
+    """
+    将 modules 数组展开为“字段名+模块编号”的扁平字段（如 教学模块1、课时1）
+
+    未给出模块编号的模块按数组顺序编号
+    """
+    modules = data.pop(key, None)
+    if not isinstance(modules, list):
+        return data
+    for index, module in enumerate(modules, 1):
+        if not isinstance(module, dict):
+            continue
+        module_num = _coerce_integer(module.get(number_key, index)) or index
+        for field in fields:
+            if field in module:
+                data[f'{field}{module_num}'] = module[field]
+    return data
+
+
+def nest_flat_modules(data, fields, key='modules', number_key='模块编号'):
+    """
+    将扁平字段（如 教学模块1、课时1）归并到 modules 数组中，是 flatten_modules 的逆操作
+
+    兼容不按 modules 数组、而是直接返回扁平字段的模型回复，使其同样经过 Schema 校验；
+    modules 中已有同一模块编号的字段时以 modules 为准
+    """
+    flat_re = re.compile('^(' + '|'.join(re.escape(field) for field in fields) + r')(\d+)$')
+    flat = {}
+    for name in list(data):
+        m = flat_re.match(name)
+        if m:
+            flat.setdefault(int(m.group(2)), {})[m.group(1)] = data.pop(name)
+    if not flat:
+        return data
+    _count('flat_modules')
+    logger.warning("AI响应以扁平字段返回了{}个模块，已归并到 {}", len(flat), key)
+    modules = data.get(key)
+    if not isinstance(modules, list):
+        modules = data[key] = []
+    by_num = {}
+    for index, module in enumerate(modules, 1):
+        if isinstance(module, dict):
+            by_num.setdefault(_coerce_integer(module.get(number_key, index)) or index, module)
+    for module_num in sorted(flat):
+        module = by_num.get(module_num)
+        if module is None:
+            module = {number_key: module_num}
+            modules.append(module)
+        for field, value in flat[module_num].items():
+            module.setdefault(field, value)
+    return data
+
+
+def parse_structured(text, schema, flatten_fields=None):
+    """
+    解析模型回复：提取 JSON →（可选）归并扁平模块字段 → 按 Schema 校验规整 →（可选）展开 modules
+
+    Args:
+        text: 模型回复文本
+        schema: 期望的 JSON Schema
+        flatten_fields: 需要从 modules 展开的字段，None 表示不展开；
+            Schema 含 modules 时，回复中的同名扁平字段（如 教学模块1）先归并到 modules 再校验
+
+    Returns:
+        tuple: (规整后的数据 dict，缺失或无效的字段路径 list)；无法解析时数据为空 dict
+    """
+    obj = extract_json(text)
+    if obj is None:
+        logger.error("无法解析AI响应(长度={}): {}", len(text or ''), (text or '')[:200])
+        return {}, ['$']
+
+    if flatten_fields and 'modules' in schema.get('properties', {}):
+        nest_flat_modules(obj, flatten_fields)
+    problems = []
+    data = coerce(obj, schema, '', problems) or {}
+    if problems:
+        _count('missing_fields', len(problems))
+        logger.warning("AI响应存在缺失或无效字段: {}", ', '.join(problems[:20]))
+    if flatten_fields:
+        flatten_modules(data, flatten_fields)
+    return data, problems
@@ -5,16 +5,89 @@
 使用AI自动生成教学大纲的各个部分
 """
 
+import re
 import json
-import requests
 from datetime import datetime
 from loguru import logger
 
+from .deadline import DeadlineExceeded
+from .llm_client import achat, run_sync
+from .structured_output import build_response_format, object_schema, parse_structured
+from .token_counter import record_cache_hit, record_usage, set_usage_context
+from .token_budget import ai_defaults, budget_max_tokens, default_temperature, estimate_outline_tokens
+
+
+# 教学模块数量及每个模块的字段
+MODULE_COUNT = 8
+MODULE_FIELDS = ('教学模块', '教学内容及重点、难点', '职业技能要求', '课时', '教学方法建议')
+
+# AI 需要返回的顶层字段
+TOP_LEVEL_FIELDS = (
+    '课程定位', '知识目标', '技能目标', '素质目标',
+    '教学方式、方法与手段建议', '教学及参考资料',
+    '课程编码', '学时', '学分', '课程类别', '适用专业', '总课时',
+)
+
+PROMPT_MODES = ('full', 'compact')
+
+DEFAULT_ASSESSMENT_METHOD = "平时成绩30% + 期中考试30% + 期末考试40%"
+
+
+class OutlineGenerationError(RuntimeError):
+    """大模型未能生成完整的教学大纲（不使用离线内容回退时抛出）"""
+
+
+# AI 返回内容的 JSON Schema，用于结构化输出约束及响应校验
+OUTLINE_SCHEMA = object_schema({
+    **{field: {'type': 'string'} for field in TOP_LEVEL_FIELDS},
+    'modules': {
+        'type': 'array',
+        'items': object_schema({
+            '模块编号': {'type': 'integer'},
+            **{field: {'type': 'string'} for field in MODULE_FIELDS},
+        }),
+    },
+})
+
 
 def generate_teaching_outline(course_name, write_date=None, assessment_method=None, 
                             exclude_items=None, system_prompt=None, user_prompt=None,
                             llm_provider=None, llm_api_key=None, llm_model=None,
-                            positioning_length=100, objectives_length=80, module_content_length=60):
+                            positioning_length=None, objectives_length=None, module_content_length=None,
+                            focus_modules=None, prompt_mode='full', structured_output='json_object',
+                            repair_missing=True, model_routing=None, use_library=None, fallback=True):
+    """
+    生成完整的教学大纲内容（同步接口，参数与返回值同 agenerate_teaching_outline）
+    """
+    return run_sync(agenerate_teaching_outline(
+        course_name, write_date, assessment_method,
+        exclude_items, system_prompt, user_prompt,
+        llm_provider, llm_api_key, llm_model,
+        positioning_length, objectives_length, module_content_length,
+        focus_modules=focus_modules, prompt_mode=prompt_mode, structured_output=structured_output,
+        repair_missing=repair_missing, model_routing=model_routing, use_library=use_library, fallback=fallback
+    ))
+
+
+def request_fields(write_date=None, assessment_method=None):
+    """
+    由请求直接填写、不经大模型生成的字段（未填写时使用默认值）
+
+    Returns:
+        dict: 编写日期、考核方式及成绩评定办法
+    """
+    return {
+        '编写日期': write_date or datetime.now().strftime("%Y年%m月"),
+        '考核方式及成绩评定办法': assessment_method or DEFAULT_ASSESSMENT_METHOD,
+    }
+
+
+async def agenerate_teaching_outline(course_name, write_date=None, assessment_method=None,
+                                     exclude_items=None, system_prompt=None, user_prompt=None,
+                                     llm_provider=None, llm_api_key=None, llm_model=None,
+                                     positioning_length=None, objectives_length=None, module_content_length=None,
+                                     focus_modules=None, prompt_mode='full', structured_output='json_object',
+                                     repair_missing=True, model_routing=None, use_library=None, fallback=True):
     """
     生成完整的教学大纲内容
     
@@ -27,42 +100,94 @@ def generate_teaching_outline(course_name, write_date=None, assessment_method=No
         llm_provider: 大模型提供商
         llm_api_key: API密钥
         llm_model: 模型名称
+        positioning_length / objectives_length / module_content_length: 字数要求，None 表示使用配置 [ai] 缺省值
+        prompt_mode: 提示词模式，full（完整）或 compact（精简）
+        structured_output: 结构化输出方式，none / json_object / json_schema
+        repair_missing: 是否对缺失或无效字段发起补全请求
+        model_routing: 是否按字段复杂度分配模型，None 表示使用配置 [ai_routing] enabled
+        use_library: 是否直接复用历史大纲库中相似课程的大纲（不调用大模型），None 表示使用配置 [library] reuse；
+            生成的完整大纲是否存入库由配置 [library] enabled 决定
+        fallback: 大模型调用失败时是否使用离线内容；为 False 时抛出 OutlineGenerationError，
+            补全后仍有字段缺失也视为失败（批量生成与预取使用，避免把离线内容当作生成结果）
     
     Returns:
         dict: 包含所有模板变量的字典
+
+    Raises:
+        OutlineGenerationError: fallback 为 False 且大模型生成失败
     """
     
     # 设置默认值
-    if not write_date:
-        write_date = datetime.now().strftime("%Y年%m月")
-    
-    if not assessment_method:
-        assessment_method = "平时成绩30% + 期中考试30% + 期末考试40%"
+    defaults = ai_defaults()
+    positioning_length = positioning_length or defaults['positioning_length']
+    objectives_length = objectives_length or defaults['objectives_length']
+    module_content_length = module_content_length or defaults['module_content_length']
     
     # 构建基础数据
     outline_data = {
         '课程名称': course_name,
-        '编写日期': write_date,
-        '考核方式及成绩评定办法': assessment_method,
+        **request_fields(write_date, assessment_method),
     }
     
     # 如果有AI配置，使用AI生成内容
     if llm_provider and llm_api_key:
+        set_usage_context(course_name, positioning_length=positioning_length, objectives_length=objectives_length,
+                          module_content_length=module_content_length, prompt_mode=prompt_mode,
+                          structured_output=structured_output)
+        from .outline_library import (
+            find_reusable_outline, library_enabled, library_reuse, save_outline, settings_signature,
+        )
+        if use_library is None:
+            use_library = library_reuse()
+        signature = settings_signature(
+            exclude_items=exclude_items, system_prompt=system_prompt, user_prompt=user_prompt,
+            focus_modules=focus_modules, positioning_length=positioning_length,
+            objectives_length=objectives_length, module_content_length=module_content_length,
+        )
+        if use_library:
+            try:
+                reused, _ = find_reusable_outline(course_name, signature)
+                if reused:
+                    record_cache_hit('teaching_outline_library', llm_provider.lower(), llm_model)
+                    outline_data.update(reused)
+                    return outline_data
+            except Exception as e:
+                logger.error(f"查询历史大纲库失败: {e}")
+        
         try:
-            ai_generated = generate_with_ai(
+            from .model_router import agenerate_with_routing, routing_enabled
+            if model_routing is None:
+                model_routing = routing_enabled()
+            generate = agenerate_with_routing if model_routing else agenerate_with_ai
+            ai_generated = await generate(
                 course_name, exclude_items,
                 system_prompt, user_prompt,
                 llm_provider, llm_api_key, llm_model,
-                positioning_length, objectives_length, module_content_length
+                positioning_length, objectives_length, module_content_length,
+                focus_modules=focus_modules, prompt_mode=prompt_mode,
+                structured_output=structured_output,
+                repair_missing=repair_missing
             )
+            invalid_fields = find_invalid_fields(ai_generated)
+            if invalid_fields and not fallback:
+                raise OutlineGenerationError(f"大模型生成的内容不完整，{len(invalid_fields)}个字段缺失: "
+                                             f"{', '.join(invalid_fields[:10])}")
             outline_data.update(ai_generated)
+            # 只保存完整的大纲，残缺的大纲不供之后的请求复用
+            if library_enabled() and ai_generated and not invalid_fields:
+                save_outline(course_name, ai_generated, signature)
+        except (DeadlineExceeded, OutlineGenerationError):
+            # 超时或不允许回退时的失败交给调用方处理，不使用离线内容
+            raise
         except Exception as e:
+            if not fallback:
+                raise OutlineGenerationError(f"AI生成失败: {e}") from e
             logger.error(f"AI生成失败: {e}")
             # 如果AI生成失败，使用默认模板
-            outline_data.update(generate_default_content(course_name))
+            outline_data.update(generate_default_content(course_name, exclude_items, focus_modules))
     else:
-        # 使用默认模板生成
-        outline_data.update(generate_default_content(course_name))
+        # 使用离线知识库或默认模板生成
+        outline_data.update(generate_default_content(course_name, exclude_items, focus_modules))
     
     return outline_data
 
@@ -70,39 +195,249 @@ def generate_teaching_outline(course_name, write_date=None, assessment_method=No
 def generate_with_ai(course_name, exclude_items,
                     system_prompt, user_prompt, 
                     llm_provider, llm_api_key, llm_model,
-                    positioning_length=100, objectives_length=80, module_content_length=60):
+                    positioning_length=100, objectives_length=80, module_content_length=60,
+                    focus_modules=None, prompt_mode='full', structured_output='json_object',
+                    repair_missing=True):
+    """使用AI生成教学大纲内容（同步接口，见 agenerate_with_ai）"""
+    return run_sync(agenerate_with_ai(
+        course_name, exclude_items, system_prompt, user_prompt,
+        llm_provider, llm_api_key, llm_model,
+        positioning_length, objectives_length, module_content_length,
+        focus_modules=focus_modules, prompt_mode=prompt_mode, structured_output=structured_output,
+        repair_missing=repair_missing
+    ))
+
+
+async def agenerate_with_ai(course_name, exclude_items,
+                            system_prompt, user_prompt,
+                            llm_provider, llm_api_key, llm_model,
+                            positioning_length=100, objectives_length=80, module_content_length=60,
+                            focus_modules=None, prompt_mode='full', structured_output='json_object',
+                            repair_missing=True):
     """
     使用AI生成教学大纲内容
+
+    repair_missing 为 True 时，对缺失或无效的字段发起一次只包含这些字段的补全请求
     """
     
     # 构建提示词
     prompt = build_prompt(course_name, exclude_items, 
                          system_prompt, user_prompt,
-                         positioning_length, objectives_length, module_content_length)
+                         positioning_length, objectives_length, module_content_length,
+                         focus_modules=focus_modules, prompt_mode=prompt_mode)
     
-    # 根据不同的模型提供商调用API
-    if llm_provider.lower() == 'deepseek':
-        response = call_deepseek_api(prompt, llm_api_key, llm_model or 'deepseek-chat')
-    elif llm_provider.lower() == 'openai':
-        response = call_openai_api(prompt, llm_api_key, llm_model or 'gpt-4o-mini')
-    else:
-        raise ValueError(f"不支持的模型提供商: {llm_provider}")
+    response_format = build_response_format(llm_provider, structured_output,
+                                            OUTLINE_SCHEMA, name='teaching_outline')
+    
+    # 根据不同的模型提供商调用API，max_tokens 按字数要求估算
+    max_tokens = outline_max_tokens(llm_provider, list(TOP_LEVEL_FIELDS) + ['modules'],
+                                    positioning_length, objectives_length, module_content_length)
+    response, model, usage = await acall_llm(llm_provider, prompt, llm_api_key, llm_model, response_format,
+                                             max_tokens=max_tokens)
+    record_usage('teaching_outline', llm_provider.lower(), model, prompt, response, usage)
     
     # 解析AI响应
-    return parse_ai_response(response)
+    data = parse_ai_response(response)
+    
+    invalid_fields = find_invalid_fields(data)
+    if invalid_fields and repair_missing:
+        data = await arepair_outline(data, invalid_fields, course_name, exclude_items,
+                              llm_provider, llm_api_key, model,
+                              positioning_length, objectives_length, module_content_length,
+                              structured_output=structured_output)
+    return data
+
+
+def call_llm(llm_provider, prompt, api_key, model=None, response_format=None, max_tokens=None):
+    """按提供商调用大模型（同步接口，见 acall_llm）"""
+    return run_sync(acall_llm(llm_provider, prompt, api_key, model, response_format, max_tokens=max_tokens))
+
+
+async def acall_llm(llm_provider, prompt, api_key, model=None, response_format=None, max_tokens=None):
+    """
+    按提供商调用大模型
+
+    采样温度取自配置 [ai] default_temperature；max_tokens 为空时按缺省字数生成完整大纲估算
+
+    Returns:
+        tuple: (模型回复文本, 实际使用的模型名称, 用量)
+    """
+    if not max_tokens:
+        max_tokens = outline_max_tokens(llm_provider, list(TOP_LEVEL_FIELDS) + ['modules'], **ai_defaults())
+    return await achat(llm_provider, api_key, [{"role": "user", "content": prompt}], model,
+                       temperature=default_temperature(), max_tokens=max_tokens, response_format=response_format)
+
+
+def outline_max_tokens(llm_provider, fields, positioning_length=100, objectives_length=80, module_content_length=60):
+    """按要生成的字段与字数要求计算 max_tokens（fields 含 'modules' 表示全部教学模块）"""
+    expected = estimate_outline_tokens(fields, positioning_length, objectives_length, module_content_length,
+                                       module_count=MODULE_COUNT, module_fields=MODULE_FIELDS)
+    return budget_max_tokens(llm_provider, expected)
+
+
+def outline_field_names():
+    """教学大纲中应由AI生成的全部扁平字段名"""
+    fields = list(TOP_LEVEL_FIELDS)
+    for num in range(1, MODULE_COUNT + 1):
+        fields.extend(f'{field}{num}' for field in MODULE_FIELDS)
+    return fields
+
+
+# 模型照抄提示词示例时出现的占位内容
+PLACEHOLDER_PATTERN = re.compile(
+    r'^(约\d+字|第[一二三四五六七八九十]+个教学模块名称|课程代码|总学时数|学分数|课程类型|'
+    r'适用的专业名称|所有模块的总课时|课时安排|技能要求|教学方法|详细内容、重点和难点)'
+)
+
+# 必须包含数字的字段
+NUMERIC_FIELDS = ('学时', '学分', '总课时', '课时')
+
+
+def find_invalid_fields(data):
+    """
+    检查AI生成结果中缺失或无效的字段
+
+    无效包括：空值、照抄提示词示例的占位内容、学时/学分/课时N 中没有数字
+
+    Returns:
+        list: 需要重新生成的扁平字段名
+    """
+    invalid = []
+    for field in outline_field_names():
+        value = str(data.get(field) or '').strip()
+        if not value or PLACEHOLDER_PATTERN.match(value):
+            invalid.append(field)
+        elif field.rstrip('0123456789') in NUMERIC_FIELDS and not re.search(r'\d', value):
+            invalid.append(field)
+    return invalid
+
+
+def build_repair_prompt(course_name, data, invalid_fields, exclude_items=None,
+                        positioning_length=100, objectives_length=80, module_content_length=60,
+                        instructions=None):
+    """
+    构建补全提示词：附带已生成内容作为上下文，只要求生成缺失或无效的字段
+
+    instructions 为附加说明（如用户修改了哪些内容）
+    """
+    # 上下文只保留有效字段，长文本截断以节省token
+    context = {}
+    for field in outline_field_names():
+        if field in invalid_fields or not data.get(field):
+            continue
+        value = str(data[field])
+        context[field] = value if len(value) <= 60 else value[:60] + '…'
+
+    exclude_line = f"严格避免以下内容：{exclude_items.strip()}\n" if exclude_items and exclude_items.strip() else ''
+    instruction_line = f"{instructions.strip()}\n" if instructions and instructions.strip() else ''
+    return f"""你正在补全《{course_name}》课程的教学大纲，以下是已生成的内容（JSON）：
+{json.dumps(context, ensure_ascii=False)}
+请与已有内容保持一致、不重复，仅生成下列缺失字段，返回一个JSON对象，键名与下列完全一致：
+{json.dumps(invalid_fields, ensure_ascii=False)}
+{instruction_line}{exclude_line}字数：课程定位约{positioning_length}字；知识目标、技能目标、素质目标各约{objectives_length}字；教学内容及重点、难点约{module_content_length}字；学时、学分、课时N须含数字（如"8学时"）。
+"""
+
+
+def repair_outline(data, invalid_fields, course_name, exclude_items,
+                   llm_provider, llm_api_key, llm_model,
+                   positioning_length=100, objectives_length=80, module_content_length=60,
+                   structured_output='json_object', instructions=None, stage='teaching_outline_repair'):
+    """补全缺失或无效字段（同步接口，见 arepair_outline）"""
+    return run_sync(arepair_outline(
+        data, invalid_fields, course_name, exclude_items,
+        llm_provider, llm_api_key, llm_model,
+        positioning_length, objectives_length, module_content_length,
+        structured_output=structured_output, instructions=instructions, stage=stage
+    ))
+
+
+async def arepair_outline(data, invalid_fields, course_name, exclude_items,
+                          llm_provider, llm_api_key, llm_model,
+                          positioning_length=100, objectives_length=80, module_content_length=60,
+                          structured_output='json_object', instructions=None, stage='teaching_outline_repair'):
+    """
+    针对缺失或无效字段发起补全请求，并将结果合并到已生成内容中
+
+    Returns:
+        dict: 合并后的数据；补全失败时原样返回
+    """
+    logger.info("发起字段补全请求(stage={})，共{}个字段: {}", stage, len(invalid_fields), ', '.join(invalid_fields[:20]))
+    prompt = build_repair_prompt(course_name, data, invalid_fields, exclude_items,
+                                 positioning_length, objectives_length, module_content_length,
+                                 instructions=instructions)
+    schema = object_schema({field: {'type': 'string'} for field in invalid_fields})
+    response_format = build_response_format(llm_provider, structured_output, schema, name='outline_repair')
+
+    max_tokens = outline_max_tokens(llm_provider, invalid_fields,
+                                    positioning_length, objectives_length, module_content_length)
+    try:
+        response, model, usage = await acall_llm(llm_provider, prompt, llm_api_key, llm_model, response_format,
+                                                 max_tokens=max_tokens)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"AI补全请求失败: {e}")
+        return data
+    record_usage(stage, llm_provider.lower(), model, prompt, response, usage)
+
+    repaired, _ = parse_structured(response, schema)
+    merged = dict(data)
+    merged.update({k: v for k, v in repaired.items() if k in invalid_fields})
+
+    remaining = find_invalid_fields(merged)
+    if remaining:
+        logger.warning("补全后仍有{}个字段缺失，将使用默认值: {}", len(remaining), ', '.join(remaining[:20]))
+    return merged
+
+
+def split_focus_modules(text):
+    """将“数据库设计，网络编程、系统架构”形式的重点模块文本拆分为列表（去重保序）"""
+    if not text or not str(text).strip():
+        return []
+    items = re.split(r'[,，、;；\n]+', str(text))
+    result = []
+    for item in items:
+        item = item.strip().rstrip('。.')
+        if item and item not in result:
+            result.append(item)
+    return result
+
+
+# 系统提示词中“重点模块：...”一行
+FOCUS_PATTERN = re.compile(r'重点[^\n:：]*[:：]\s*([^\n]+)')
+
+
+def extract_focus_from_system(system_prompt):
+    """从系统提示词中提取“重点模块：...”后列出的重点模块"""
+    if not system_prompt or ('重点' not in system_prompt and '模块' not in system_prompt):
+        return []
+    focus_match = FOCUS_PATTERN.search(system_prompt)
+    if not focus_match:
+        return []
+    return split_focus_modules(focus_match.group(1))
 
 
 def build_prompt(course_name, exclude_items=None,
                 system_prompt=None, user_prompt=None, 
-                positioning_length=100, objectives_length=80, module_content_length=60):
+                positioning_length=100, objectives_length=80, module_content_length=60,
+                focus_modules=None, prompt_mode='full'):
     """
     构建AI生成的提示词
+
+    prompt_mode 为 compact 时使用精简提示词：模块结构只描述一次，重点模块要求合并去重
     """
+    if prompt_mode == 'compact':
+        return build_compact_prompt(course_name, exclude_items,
+                                    system_prompt, user_prompt,
+                                    positioning_length, objectives_length, module_content_length,
+                                    focus_modules=focus_modules)
+    if prompt_mode not in PROMPT_MODES:
+        raise ValueError(f"不支持的提示词模式: {prompt_mode}")
     
     # 解析重点模块，确保AI真正关注用户输入
     focus_requirements = ""
     if focus_modules and focus_modules.strip():
-        focus_list = [m.strip() for m in focus_modules.replace('，', ',').split(',') if m.strip()]
+        focus_list = split_focus_modules(focus_modules)
         if focus_list:
             focus_requirements = f"""
 【❗️最高优先级】重点功能模块强制要求：
@@ -132,16 +467,9 @@ def build_prompt(course_name, exclude_items=None,
     if system_prompt and system_prompt.strip():
         # 从系统提示词中提取重点模块
         focus_modules_from_system = ""
-        import re
-        # 查找重点模块相关关键词
-        if '重点' in system_prompt or '模块' in system_prompt:
-            # 提取重点模块信息
-            focus_match = re.search(r'重点[^\n]*[:]（\])*([^\n]+)', system_prompt)
-            if focus_match:
-                focus_content = focus_match.group(1).strip()
-                focus_list = [m.strip() for m in focus_content.replace('，', ',').split(',') if m.strip()]
-                if focus_list:
-                    focus_modules_from_system = f"""
+        focus_list = extract_focus_from_system(system_prompt)
+        if focus_list:
+            focus_modules_from_system = f"""
 
 【❗️最高优先级】重点功能模块强制要求：
 用户在系统提示词中明确指定了以下重点模块：{', '.join(focus_list)}
@@ -175,7 +503,7 @@ def build_prompt(course_name, exclude_items=None,
 你是一位资深的课程设计专家，请为《{course_name}》课程生成高质量、个性化的教学大纲内容。
 
 {system_requirements}
-
+{focus_requirements}
 🎯 课程特色化强制要求：
 根据课程名称《{course_name}》，所有生成内容必须与该课程高度相关：
 - 教学模块名称必须包含{course_name}的关键技术词汇，禁止使用“基础理论”等通用词
@@ -292,154 +620,123 @@ def build_prompt(course_name, exclude_items=None,
     return prompt
 
 
-def call_deepseek_api(prompt, api_key, model):
+def build_compact_prompt(course_name, exclude_items=None,
+                         system_prompt=None, user_prompt=None,
+                         positioning_length=100, objectives_length=80, module_content_length=60,
+                         focus_modules=None, fields=None):
+    """
+    构建精简提示词
+
+    与完整提示词要求一致，但模块结构只给出一次并注明数量，
+    重点模块（表单输入与系统提示词中提取的）合并为一条要求；
+    fields 指定只生成部分顶层字段（可包含 modules），None 表示全部
+    """
+    fields = list(fields) if fields else list(TOP_LEVEL_FIELDS) + ['modules']
+    with_modules = 'modules' in fields
+
+    focus_list = split_focus_modules(focus_modules)
+    for item in extract_focus_from_system(system_prompt):
+        if item not in focus_list:
+            focus_list.append(item)
+
+    requirements = [
+        f"内容专业准确，符合高等教育教学大纲规范，紧扣《{course_name}》的具体技术点与应用场景",
+    ]
+    if with_modules:
+        requirements += [
+            f"教学模块名称须含《{course_name}》关键技术词，禁用“基础理论”等通用名；重点难点针对具体技术难点",
+            f"{MODULE_COUNT}个模块循序渐进，课时合理，总计64-72学时",
+        ]
+        if focus_list:
+            requirements.append(
+                f"重点模块（最高优先级）：{'；'.join(focus_list)}。"
+                f"至少{min(len(focus_list), 6)}个模块直接体现，模块名含其关键词，内容围绕其具体技术展开"
+            )
+    elif focus_list:
+        requirements.append(f"课程重点：{'；'.join(focus_list)}")
+    if exclude_items and exclude_items.strip():
+        requirements.append(f"严格避免以下内容：{exclude_items.strip()}")
+    if system_prompt and system_prompt.strip():
+        # 重点模块已合并到上一条要求，这里去掉重复部分
+        rules = FOCUS_PATTERN.sub('', system_prompt).strip(' 、，,;；\n')
+        if rules:
+            requirements.append(f"遵循基调和规则：{rules}")
+    if user_prompt and user_prompt.strip():
+        requirements.append(f"特别突出：{user_prompt.strip()}")
+
+    lengths = []
+    if '课程定位' in fields:
+        lengths.append(f"课程定位约{positioning_length}字")
+    if any(f in fields for f in ('知识目标', '技能目标', '素质目标')):
+        lengths.append(f"知识目标、技能目标、素质目标各约{objectives_length}字")
+    if with_modules:
+        lengths.append(f"每个模块的教学内容及重点、难点约{module_content_length}字")
+
+    top_keys = json.dumps(fields, ensure_ascii=False)
+    module_keys = json.dumps(['模块编号'] + list(MODULE_FIELDS), ensure_ascii=False)
+    requirement_lines = "\n".join(f"{i}. {r}" for i, r in enumerate(requirements, 1))
+
+    prompt = f"""你是资深课程设计专家，请为《{course_name}》课程生成教学大纲，仅返回一个JSON对象。
+要求：
+{requirement_lines}
+"""
+    if lengths:
+        prompt += f"字数：{'；'.join(lengths)}。\n"
+    prompt += f"JSON顶层键：{top_keys}\n"
+    if with_modules:
+        prompt += f'modules为长度{MODULE_COUNT}的数组，元素键：{module_keys}，模块编号依次为1-{MODULE_COUNT}，课时如"8学时"。\n'
+    return prompt
+
+
+def outline_schema(fields=None):
+    """OUTLINE_SCHEMA 中只保留指定顶层字段的子 Schema，None 表示完整 Schema"""
+    if not fields:
+        return OUTLINE_SCHEMA
+    properties = OUTLINE_SCHEMA['properties']
+    return object_schema({field: properties[field] for field in fields if field in properties})
+
+
+def call_deepseek_api(prompt, api_key, model, response_format=None):
     """
     调用DeepSeek API
     """
-    url = "https://api.deepseek.com/v1/chat/completions"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    data = {
-        "model": model,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.9,
-        "max_tokens": 4000
-    }
-    
-    response = requests.post(url, headers=headers, json=data, timeout=60)
-    response.raise_for_status()
-    
-    result = response.json()
-    return result['choices'][0]['message']['content']
+    return call_llm('deepseek', prompt, api_key, model, response_format)[0]
 
 
-def call_openai_api(prompt, api_key, model):
+def call_openai_api(prompt, api_key, model, response_format=None):
     """
     调用OpenAI API
     """
-    url = "https://api.openai.com/v1/chat/completions"
-    
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    data = {
-        "model": model,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.9,
-        "max_tokens": 4000
-    }
-    
-    response = requests.post(url, headers=headers, json=data, timeout=60)
-    response.raise_for_status()
-    
-    result = response.json()
-    return result['choices'][0]['message']['content']
+    return call_llm('openai', prompt, api_key, model, response_format)[0]
 
 
 def parse_ai_response(response_text):
     """
     解析AI返回的JSON响应
+
+    按 OUTLINE_SCHEMA 校验规整后，将 modules 数组展开为 教学模块N 等扁平字段；
+    无法解析时返回空字典
+    """
+    data, _ = parse_structured(response_text, OUTLINE_SCHEMA, flatten_fields=MODULE_FIELDS)
+    return data
+
+
+def generate_default_content(course_name, exclude_items=None, focus_modules=None):
     """
+    生成离线教学大纲内容：优先按离线知识库组装课程专属内容，课程未匹配任何主题时使用通用模板
+    """
+    from .knowledge_base import build_offline_outline
     try:
-        # 尝试直接解析JSON
-        data = json.loads(response_text)
-        
-        # 处理新的modules数组格式，将其展开为扁平结构
-        if 'modules' in data and isinstance(data['modules'], list):
-            modules_data = data.pop('modules')  # 移除modules数组
-            
-            # 将modules数组中的每个模块展开为原来的扁平字段格式
-            for module in modules_data:
-                if isinstance(module, dict) and '模块编号' in module:
-                    module_num = module['模块编号']
-                    
-                    # 将模块数据映射到原来的字段名
-                    if '教学模块' in module:
-                        data[f'教学模块{module_num}'] = module['教学模块']
-                    if '教学内容及重点、难点' in module:
-                        data[f'教学内容及重点、难点{module_num}'] = module['教学内容及重点、难点']
-                    if '职业技能要求' in module:
-                        data[f'职业技能要求{module_num}'] = module['职业技能要求']
-                    if '课时' in module:
-                        data[f'课时{module_num}'] = module['课时']
-                    if '教学方法建议' in module:
-                        data[f'教学方法建议{module_num}'] = module['教学方法建议']
-        
-        return data
-        
-    except json.JSONDecodeError:
-        # 如果不是纯JSON，尝试提取JSON部分
-        try:
-            # 查找JSON代码块
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-                data = json.loads(json_str)
-                
-                # 处理modules数组格式
-                if 'modules' in data and isinstance(data['modules'], list):
-                    modules_data = data.pop('modules')
-                    for module in modules_data:
-                        if isinstance(module, dict) and '模块编号' in module:
-                            module_num = module['模块编号']
-                            if '教学模块' in module:
-                                data[f'教学模块{module_num}'] = module['教学模块']
-                            if '教学内容及重点、难点' in module:
-                                data[f'教学内容及重点、难点{module_num}'] = module['教学内容及重点、难点']
-                            if '职业技能要求' in module:
-                                data[f'职业技能要求{module_num}'] = module['职业技能要求']
-                            if '课时' in module:
-                                data[f'课时{module_num}'] = module['课时']
-                            if '教学方法建议' in module:
-                                data[f'教学方法建议{module_num}'] = module['教学方法建议']
-                
-                return data
-            
-            # 查找大括号包围的JSON
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                data = json.loads(json_str)
-                
-                # 处理modules数组格式
-                if 'modules' in data and isinstance(data['modules'], list):
-                    modules_data = data.pop('modules')
-                    for module in modules_data:
-                        if isinstance(module, dict) and '模块编号' in module:
-                            module_num = module['模块编号']
-                            if '教学模块' in module:
-                                data[f'教学模块{module_num}'] = module['教学模块']
-                            if '教学内容及重点、难点' in module:
-                                data[f'教学内容及重点、难点{module_num}'] = module['教学内容及重点、难点']
-                            if '职业技能要求' in module:
-                                data[f'职业技能要求{module_num}'] = module['职业技能要求']
-                            if '课时' in module:
-                                data[f'课时{module_num}'] = module['课时']
-                            if '教学方法建议' in module:
-                                data[f'教学方法建议{module_num}'] = module['教学方法建议']
-                
-                return data
-                
-        except json.JSONDecodeError:
-            pass
-    
-    # 如果解析失败，返回默认内容
-    logger.error(f"无法解析AI响应: {response_text}")
-    return {}
+        outline = build_offline_outline(course_name, split_focus_modules(exclude_items),
+                                        split_focus_modules(focus_modules))
+        if outline:
+            return outline
+    except Exception as e:
+        logger.error(f"离线知识库生成失败: {e}")
+    return generate_generic_content(course_name)
 
 
-def generate_default_content(course_name):
+def generate_generic_content(course_name):
     """
     生成默认的教学大纲内容模板
     """
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模板注册表
+扫描模板目录中的全部 Word（.docx）与 Markdown（.md）模板，加载时解析并索引各模板的 {{占位符}}，
+Markdown 模板的内容一并缓存。之后按修改时间检查文件变化，只重新加载新增或修改的模板。
+请求按模板ID（文件名去掉扩展名）选择模板，未指定时使用配置 [templates] 中的默认模板
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from loguru import logger
+
+from .app_config import PROJECT_ROOT, get_setting
+
+
+TEMPLATE_KINDS = {
+    '.docx': 'docx',
+    '.md': 'md',
+}
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{([^{}]+)\}\}')
+XML_TAG_PATTERN = re.compile(r'<[^>]+>')
+# Word 正文、页眉、页脚中可能含有占位符
+DOCX_TEXT_PARTS = re.compile(r'^word/(document|header\d*|footer\d*)\.xml$')
+
+
+@dataclass(slots=True, frozen=True)
+class TemplateInfo:
+    """已加载的模板"""
+    id: str
+    kind: str
+    path: str
+    version: tuple
+    digest: str
+    placeholders: tuple
+    text: str | None = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'filename': os.path.basename(self.path),
+            'digest': self.digest,
+            'modified': self.version[0] / 1e9,
+            'placeholders': list(self.placeholders),
+        }
+
+
+def docx_placeholders(data):
+    """
+    提取 Word 模板中的占位符
+
+    占位符可能被拆分到多个 run 中，按段落去掉 XML 标签后再匹配
+    """
+    names = []
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        for name in package.namelist():
+            if not DOCX_TEXT_PARTS.match(name):
+                continue
+            xml = package.read(name).decode('utf-8')
+            for paragraph in xml.split('</w:p>'):
+                names.extend(PLACEHOLDER_PATTERN.findall(XML_TAG_PATTERN.sub('', paragraph)))
+    return names
+
+
+def _unique(names):
+    return tuple(dict.fromkeys(name.strip() for name in names if name.strip()))
+
+
+def load_template(path, template_id, kind):
+    """读取并解析模板文件"""
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    text = None
+    if kind == 'md':
+        text = data.decode('utf-8')
+        placeholders = _unique(PLACEHOLDER_PATTERN.findall(text))
+    else:
+        placeholders = _unique(docx_placeholders(data))
+    return TemplateInfo(
+        id=template_id, kind=kind, path=path, version=(stat.st_mtime_ns, stat.st_size),
+        digest=hashlib.sha256(data).hexdigest(), placeholders=placeholders, text=text,
+    )
+
+
+class TemplateRegistry:
+    """
+    模板注册表
+
+    每次查询前检查目录变化（间隔不小于 check_interval 秒），只重新解析修改时间或大小变化的文件
+    """
+
+    def __init__(self, directory, exclude=(), check_interval=2.0):
+        self.directory = directory
+        self.exclude = {name.lower() for name in exclude}
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._checked = None
+        self._stats = {'loads': 0, 'reloads': 0, 'removed': 0}
+
+    def _scan(self):
+        """目录中的模板文件：{(类型, ID): (路径, 版本)}"""
+        found = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            logger.warning("模板目录不存在: {}", self.directory)
+            return found
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            kind = TEMPLATE_KINDS.get(ext.lower())
+            # ~$ 开头为 Word 打开文档时生成的锁定文件
+            if (kind is None or entry.name.startswith(('.', '~$')) or entry.name.lower() in self.exclude
+                    or not entry.is_file()):
+                continue
+            stat = entry.stat()
+            found[(kind, stem)] = (entry.path, (stat.st_mtime_ns, stat.st_size))
+        return found
+
+    def refresh(self, force=False):
+        """检查模板目录，加载新增或修改的模板并移除已删除的模板"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._checked is not None and now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            found = self._scan()
+            for key in [key for key in self._templates if key not in found]:
+                del self._templates[key]
+                self._stats['removed'] += 1
+                logger.info("模板已移除: {}", key[1])
+            for (kind, template_id), (path, version) in found.items():
+                current = self._templates.get((kind, template_id))
+                if current is not None and current.version == version:
+                    continue
+                try:
+                    self._templates[(kind, template_id)] = load_template(path, template_id, kind)
+                except (OSError, ValueError, zipfile.BadZipFile) as e:
+                    logger.error("加载模板失败 {}: {}", path, e)
+                    continue
+                self._stats['reloads' if current is not None else 'loads'] += 1
+                logger.info("模板已{}: {}（{}个占位符）", '更新' if current is not None else '加载', os.path.basename(path),
+                            len(self._templates[(kind, template_id)].placeholders))
+
+    def get(self, template_id=None, kind='docx'):
+        """
+        按ID获取模板
+
+        Args:
+            template_id: 模板ID，为空时使用配置 [templates] default_<类型>
+
+        Raises:
+            ValueError: 模板不存在
+        """
+        template_id = template_id or default_template_id(kind)
+        self.refresh()
+        with self._lock:
+            info = self._templates.get((kind, template_id))
+        if info is None:
+            raise ValueError(f"模板不存在: {template_id}.{kind}")
+        return info
+
+    def list(self, kind=None):
+        self.refresh()
+        with self._lock:
+            templates = [info for (k, _), info in self._templates.items() if kind is None or k == kind]
+        return sorted(templates, key=lambda info: (info.kind, info.id))
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'templates': len(self._templates)}
+
+
+DEFAULT_TEMPLATE_IDS = {
+    'docx': '教学大纲-模板',
+    'md': '教学大纲模板',
+}
+
+
+def default_template_id(kind):
+    return get_setting('templates', f'default_{kind}', fallback=DEFAULT_TEMPLATE_IDS[kind])
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry():
+    """获取全局模板注册表（目录取自配置 [paths] templates_dir，排除文件与检查间隔取自 [templates]）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            directory = get_setting('paths', 'templates_dir', fallback='templates')
+            if not os.path.isabs(directory):
+                directory = os.path.join(PROJECT_ROOT, directory)
+            exclude = [name.strip() for name in
+                       get_setting('templates', 'exclude', fallback='README.md, 模板变量说明.md').split(',')
+                       if name.strip()]
+            _registry = TemplateRegistry(directory, exclude,
+                                         get_setting('templates', 'check_interval', fallback=2.0, type=float))
+        return _registry
+
+
+def get_template(template_id=None, kind='docx'):
+    """按ID获取模板，见 TemplateRegistry.get"""
+    return get_template_registry().get(template_id, kind)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本工具
+课程名称规范化与关键词切分，供历史大纲库和离线知识库建立索引。
+规范化保留 + 与 #（C++、C# 不同于 C），课程名称末尾的册次/级别标记（上/下、I/II、1/2）
+由 course_variant 取出，相似度再高、标记不同的课程也不是同一门课
+"""
+
+import re
+import unicodedata
+
+
+# 规范化后课程名称末尾的册次/级别标记；英文与数字标记须与前面的英文单词分开（python3、web dev 不算）
+VARIANT_PATTERN = re.compile(r'((?<![a-z0-9+#])(?:[ivx]+|\d+)|[上中下]|[一二三四五六七八九十]+)[册篇]?$')
+
+
+def normalize_course_name(name):
+    """规范化课程名称：全角转半角、转小写、去掉空白与除 + # 以外的标点"""
+    name = unicodedata.normalize('NFKC', str(name or '')).lower()
+    return re.sub(r'[^\w+#]+|_+', '', name)
+
+
+def course_variant(normalized_name):
+    """
+    区分同名课程不同版本的标记
+
+    Returns:
+        tuple: (名称中的 + 与 #, 末尾的册次/级别标记)，如 c++语言程序设计 → ('++', '')，
+            python程序设计上 → ('', '上')
+    """
+    match = VARIANT_PATTERN.search(normalized_name)
+    return ''.join(re.findall(r'[+#]', normalized_name)), match.group(1) if match else ''
+
+
+def extract_keywords(normalized_name):
+    """提取索引关键词：英文/数字单词（含 + #）及中文二元组"""
+    keywords = set(re.findall(r'[a-z0-9+#]+', normalized_name))
+    for chunk in re.findall(r'[^a-z0-9+#]+', normalized_name):
+        if len(chunk) == 1:
+            keywords.add(chunk)
+        keywords.update(chunk[i:i + 2] for i in range(len(chunk) - 1))
+    return keywords
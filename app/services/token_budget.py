@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输出长度预算
+按要求的字数（课程定位、目标、模块内容）与模块数估算模型输出的 token 数，留出余量后作为 max_tokens，
+并限制在配置与提供商允许的范围内：字数设置大时不再被固定上限截断，字数设置小时也不预留过大的输出。
+采样温度与各字数参数的缺省值取自配置 [ai]
+"""
+
+import math
+import re
+
+from .app_config import get_setting
+
+
+# 提供商允许的最大输出 token 数
+PROVIDER_MAX_OUTPUT = {
+    'deepseek': 8192,
+    'openai': 16384,
+}
+
+# 未指定字数的字段的典型字数
+TYPICAL_FIELD_CHARS = {
+    '课程编码': 10,
+    '学时': 6,
+    '学分': 4,
+    '课程类别': 8,
+    '适用专业': 20,
+    '总课时': 6,
+    '教学方式、方法与手段建议': 120,
+    '教学及参考资料': 120,
+    '教学模块': 16,
+    '职业技能要求': 50,
+    '课时': 6,
+    '教学方法建议': 40,
+}
+
+# 每个字段的 JSON 结构开销（键名、引号、逗号等）
+FIELD_OVERHEAD_TOKENS = 12
+
+# 教学进度表每周一行（讲授、实验/实践、作业列表）与周计划每周一行的 token 数
+WEEK_DETAIL_TOKENS = 160
+WEEK_PLAN_TOKENS = 30
+# 课程目标、课程内容、教学方法三部分的 token 数
+SYLLABUS_SECTIONS_TOKENS = 800
+
+
+def ai_defaults():
+    """配置 [ai] 中各生成参数的缺省值"""
+    return {
+        'positioning_length': get_setting('ai', 'default_positioning_length', fallback=100, type=int),
+        'objectives_length': get_setting('ai', 'default_objectives_length', fallback=80, type=int),
+        'module_content_length': get_setting('ai', 'default_module_content_length', fallback=60, type=int),
+    }
+
+
+def default_temperature():
+    """教学大纲生成的采样温度"""
+    return get_setting('ai', 'default_temperature', fallback=0.9, type=float)
+
+
+def syllabus_temperature():
+    """教学进度表生成的采样温度（结构化内容，默认较低）"""
+    return get_setting('ai', 'syllabus_temperature', fallback=0.3, type=float)
+
+
+def field_chars(field, positioning_length, objectives_length, module_content_length):
+    """单个扁平字段（如 课程定位、教学内容及重点、难点3）的预期字数"""
+    name = re.sub(r'\d+$', '', field)
+    if name == '课程定位':
+        return positioning_length
+    if name in ('知识目标', '技能目标', '素质目标'):
+        return objectives_length
+    if name == '教学内容及重点、难点':
+        return module_content_length
+    return TYPICAL_FIELD_CHARS.get(name, 30)
+
+
+def estimate_outline_tokens(fields, positioning_length=100, objectives_length=80, module_content_length=60,
+                            module_count=8, module_fields=()):
+    """
+    估算生成指定字段所需的输出 token 数（中文约每字 1 个 token）
+
+    Args:
+        fields: 顶层字段名或扁平字段名；'modules' 表示 module_count 个模块的全部 module_fields
+    """
+    lengths = (positioning_length, objectives_length, module_content_length)
+    total = 0
+    for field in fields:
+        if field == 'modules':
+            per_module = sum(field_chars(f, *lengths) + FIELD_OVERHEAD_TOKENS for f in module_fields)
+            total += module_count * (per_module + FIELD_OVERHEAD_TOKENS)
+        else:
+            total += field_chars(field, *lengths) + FIELD_OVERHEAD_TOKENS
+    return total
+
+
+def budget_max_tokens(provider, expected_tokens):
+    """
+    由预期输出 token 数计算 max_tokens
+
+    预期值乘以配置 [ai] max_tokens_headroom 作为余量，不低于 min_output_tokens，
+    不超过 max_output_tokens 及提供商允许的上限
+    """
+    headroom = get_setting('ai', 'max_tokens_headroom', fallback=1.5, type=float)
+    lower = get_setting('ai', 'min_output_tokens', fallback=512, type=int)
+    upper = get_setting('ai', 'max_output_tokens', fallback=8192, type=int)
+    upper = min(upper, PROVIDER_MAX_OUTPUT.get((provider or '').lower(), upper))
+    return max(min(lower, upper), min(upper, math.ceil(expected_tokens * headroom)))
+
+
+def syllabus_max_tokens(provider, weeks=0, plan_weeks=0, sections=False):
+    """教学进度表相关调用的 max_tokens：weeks 为生成明细的周数，plan_weeks 为周计划的周数"""
+    expected = weeks * WEEK_DETAIL_TOKENS + plan_weeks * WEEK_PLAN_TOKENS
+    if sections:
+        expected += SYLLABUS_SECTIONS_TOKENS
+    return budget_max_tokens(provider, expected)
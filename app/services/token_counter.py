@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token 估算与用量统计
+按请求累计各次大模型调用的 token 数（优先使用接口返回的 usage，缺失时在本地粗略估算），
+便于对比不同提示词模式的成本；每次调用同时写入用量台账（usage_ledger）
+"""
+
+import math
+import re
+from contextvars import ContextVar
+from loguru import logger
+
+from .logging_config import current_request_id
+from .usage_ledger import record_llm_call
+
+
+# 中日韩文字及全角标点：按每字约 1 个 token 估算
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+# 英文单词与数字：按每 4 个字符约 1 个 token 估算
+_WORD_RE = re.compile(r'[A-Za-z0-9_]+')
+# 其余可见符号（JSON 标点、emoji 等）：每个约 1 个 token
+_OTHER_RE = re.compile(r'[^\sA-Za-z0-9_\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+# 当前请求内的调用记录，由 reset_usage() 初始化
+_usage_records = ContextVar('usage_records', default=None)
+# 当前请求内命中缓存（未调用模型）的阶段，由 reset_usage() 初始化
+_cache_hit_stages = ContextVar('cache_hit_stages', default=None)
+# 当前生成任务的课程名称与参数，写入用量台账
+_usage_context = ContextVar('usage_context', default=None)
+
+# 写入台账的生成参数（影响输出长度与成本）
+LEDGER_SETTINGS = ('positioning_length', 'objectives_length', 'module_content_length', 'prompt_mode',
+                   'structured_output')
+
+
+def estimate_tokens(text):
+    """
+    估算文本的 token 数（不依赖具体分词器）
+
+    Args:
+        text: 待估算文本
+
+    Returns:
+        int: 估算的 token 数
+    """
+    if not text:
+        return 0
+    text = str(text)
+    cjk = len(_CJK_RE.findall(text))
+    words = sum(math.ceil(len(w) / 4) for w in _WORD_RE.findall(text))
+    other = len(_OTHER_RE.findall(text))
+    return cjk + words + other
+
+
+def reset_usage():
+    """开始统计一个新请求的 token 用量"""
+    records = []
+    _usage_records.set(records)
+    _cache_hit_stages.set([])
+    return records
+
+
+def set_usage_context(course_name, **settings):
+    """设置当前生成任务的课程名称与参数（只保留 LEDGER_SETTINGS 中的参数），之后的调用记录均归属于该课程"""
+    _usage_context.set({
+        'course_name': course_name or '',
+        'settings': {k: settings[k] for k in LEDGER_SETTINGS if settings.get(k) is not None},
+    })
+
+
+def _ledger_context():
+    context = _usage_context.get() or {}
+    return {'course_name': context.get('course_name', ''), 'settings': context.get('settings'),
+            'request_id': None if current_request_id() == '-' else current_request_id()}
+
+
+def record_usage(stage, provider, model, prompt, completion, usage=None):
+    """
+    记录一次大模型调用的 token 用量，写入日志与用量台账
+
+    Args:
+        stage: 调用阶段（如 teaching_outline、syllabus）
+        provider: 模型提供商
+        model: 模型名称
+        prompt: 发送的提示词
+        completion: 模型返回的文本
+        usage: llm_client.achat 返回的用量；接口未返回 token 数时按文本估算
+
+    Returns:
+        dict: 本次调用的用量记录
+    """
+    usage = usage or {}
+    estimated = usage.get('prompt_tokens') is None or usage.get('completion_tokens') is None
+    record = {
+        'stage': stage,
+        'provider': provider,
+        'model': model,
+        'prompt_tokens': estimate_tokens(prompt) if estimated else usage['prompt_tokens'],
+        'completion_tokens': estimate_tokens(completion) if estimated else usage['completion_tokens'],
+    }
+    record['total_tokens'] = record['prompt_tokens'] + record['completion_tokens']
+
+    records = _usage_records.get()
+    if records is not None:
+        records.append(record)
+
+    logger.info("LLM调用用量(stage={}, provider={}, model={}): prompt={} completion={} total={}{}",
+                stage, provider, model,
+                record['prompt_tokens'], record['completion_tokens'], record['total_tokens'],
+                '（估算）' if estimated else '')
+    record_llm_call(stage=stage, provider=provider, model=model,
+                    prompt_tokens=record['prompt_tokens'], completion_tokens=record['completion_tokens'],
+                    cached_tokens=usage.get('cached_tokens') or 0, estimated=estimated,
+                    latency_ms=usage.get('latency_ms') or 0.0, retries=usage.get('retries') or 0,
+                    **_ledger_context())
+    return record
+
+
+def record_cache_hit(stage, provider, model, latency_ms=0.0):
+    """记录一次命中缓存（结果缓存或历史大纲库）、未调用模型的生成"""
+    stages = _cache_hit_stages.get()
+    if stages is not None:
+        stages.append(stage)
+    record_llm_call(stage=stage, provider=provider, model=model or '', cache_hit=True, latency_ms=latency_ms,
+                    **_ledger_context())
+
+
+def cache_hit_stages():
+    """当前请求内命中缓存的阶段（如 teaching_outline_library）"""
+    return list(_cache_hit_stages.get() or [])
+
+
+def get_usage():
+    """
+    汇总当前请求的 token 用量
+
+    Returns:
+        dict: prompt_tokens、completion_tokens、total_tokens、calls
+    """
+    records = _usage_records.get() or []
+    prompt_tokens = sum(r['prompt_tokens'] for r in records)
+    completion_tokens = sum(r['completion_tokens'] for r in records)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'calls': len(records),
+    }
+
+
+def usage_headers(usage=None):
+    """将用量汇总转换为响应头"""
+    usage = usage or get_usage()
+    return {
+        'X-Prompt-Tokens': str(usage['prompt_tokens']),
+        'X-Completion-Tokens': str(usage['completion_tokens']),
+        'X-Total-Tokens': str(usage['total_tokens']),
+    }
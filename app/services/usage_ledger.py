@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型用量台账
+每次大模型调用（及命中结果缓存、历史大纲库而未调用模型的请求）记录一行：提供商、模型、
+提示词与回复 token 数（取自接口返回的 usage，缺失时为本地估算）、耗时、重试次数与估算费用，
+连同课程名称与字数参数一起保存到 SQLite，可按天、课程、模型、阶段或参数汇总（含 p95 耗时）。
+参数取自配置 [usage_ledger]
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+from .app_config import PROJECT_ROOT, get_config, get_setting
+
+
+# 每百万 token 的价格（美元）：(输入, 输出, 命中提供商缓存的输入)，可用配置 price.<模型> 覆盖
+DEFAULT_PRICES = {
+    'deepseek-chat': (0.27, 1.10, 0.07),
+    'deepseek-reasoner': (0.55, 2.19, 0.14),
+    'gpt-4o-mini': (0.15, 0.60, 0.075),
+    'gpt-4o': (2.50, 10.00, 1.25),
+}
+
+# 汇总维度 → SQL 表达式
+SUMMARY_KEYS = {
+    'day': 'day',
+    'course': 'course_name',
+    'model': 'model',
+    'provider': 'provider',
+    'stage': 'stage',
+    'settings': 'settings_json',
+}
+
+
+def model_prices(model):
+    """模型价格 (输入, 输出, 缓存输入)，未知模型返回 None"""
+    option = f'price.{(model or "").lower()}'
+    config = get_config()
+    if config.has_option('usage_ledger', option):
+        try:
+            values = [float(v) for v in config.get('usage_ledger', option).split(',')]
+        except ValueError:
+            logger.warning("价格配置格式错误: {}", option)
+        else:
+            if len(values) >= 2:
+                return values[0], values[1], values[2] if len(values) > 2 else values[0]
+    return DEFAULT_PRICES.get((model or '').lower())
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens=0):
+    """估算一次调用的费用（美元），未知模型返回 None"""
+    prices = model_prices(model)
+    if prices is None:
+        return None
+    input_price, output_price, cached_price = prices
+    cached_tokens = min(cached_tokens or 0, prompt_tokens or 0)
+    return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
+
+
+def percentile(values, q):
+    """按最近秩法计算百分位数，values 为空时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class UsageLedger:
+    """用量台账（SQLite）"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_usage (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    day TEXT NOT NULL,
+                    request_id TEXT,
+                    course_name TEXT NOT NULL DEFAULT '',
+                    stage TEXT NOT NULL,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    cached_tokens INTEGER NOT NULL DEFAULT 0,
+                    estimated INTEGER NOT NULL DEFAULT 0,
+                    latency_ms REAL NOT NULL DEFAULT 0,
+                    cache_hit INTEGER NOT NULL DEFAULT 0,
+                    retries INTEGER NOT NULL DEFAULT 0,
+                    cost REAL,
+                    settings_json TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_day ON llm_usage (day)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def record(self, stage, provider, model, prompt_tokens=0, completion_tokens=0, cached_tokens=0,
+               estimated=False, latency_ms=0.0, cache_hit=False, retries=0, course_name='', settings=None,
+               request_id=None):
+        """
+        记录一次调用
+
+        Args:
+            estimated: token 数为本地估算（接口未返回 usage）
+            cache_hit: 命中结果缓存或历史大纲库，未调用模型
+            settings: 影响输出长度的生成参数（字数设置等）
+        """
+        now = time.time()
+        cost = 0.0 if cache_hit else estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+        settings_json = json.dumps(settings or {}, ensure_ascii=False, sort_keys=True)
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO llm_usage (created_at, day, request_id, course_name, stage, provider, model,
+                                       prompt_tokens, completion_tokens, cached_tokens, estimated, latency_ms,
+                                       cache_hit, retries, cost, settings_json)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (now, time.strftime('%Y-%m-%d', time.localtime(now)), request_id, course_name or '', stage,
+                  provider or '', model or '', prompt_tokens, completion_tokens, cached_tokens or 0, int(estimated),
+                  latency_ms, int(cache_hit), retries, cost, settings_json))
+        return cost
+
+    def summary(self, by='day', days=7):
+        """
+        最近 days 天的用量汇总
+
+        Args:
+            by: 汇总维度，见 SUMMARY_KEYS
+
+        Returns:
+            list: [{by, 'calls', 'cache_hits', 'prompt_tokens', 'completion_tokens', 'cached_tokens',
+                    'total_tokens', 'retries', 'cost', 'avg_latency_ms', 'p95_latency_ms'}]，按费用降序
+        """
+        if by not in SUMMARY_KEYS:
+            raise ValueError(f"不支持的汇总维度: {by}")
+        column = SUMMARY_KEYS[by]
+        since = time.strftime('%Y-%m-%d', time.localtime(time.time() - (days - 1) * 86400))
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT {column}, cache_hit, prompt_tokens, completion_tokens, cached_tokens, retries, cost,
+                       latency_ms
+                FROM llm_usage WHERE day >= ?
+            """, (since,)).fetchall()
+
+        groups = {}
+        for key, cache_hit, prompt_tokens, completion_tokens, cached_tokens, retries, cost, latency_ms in rows:
+            group = groups.setdefault(key, {
+                by: json.loads(key) if by == 'settings' else key, 'calls': 0, 'cache_hits': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0, 'retries': 0, 'cost': 0.0,
+                '_latencies': [],
+            })
+            if cache_hit:
+                group['cache_hits'] += 1
+                continue
+            group['calls'] += 1
+            group['prompt_tokens'] += prompt_tokens
+            group['completion_tokens'] += completion_tokens
+            group['cached_tokens'] += cached_tokens
+            group['retries'] += retries
+            group['cost'] += cost or 0.0
+            group['_latencies'].append(latency_ms)
+
+        result = []
+        for group in groups.values():
+            latencies = group.pop('_latencies')
+            group['total_tokens'] = group['prompt_tokens'] + group['completion_tokens']
+            group['cost'] = round(group['cost'], 6)
+            group['avg_latency_ms'] = round(sum(latencies) / len(latencies), 1) if latencies else None
+            group['p95_latency_ms'] = round(percentile(latencies, 95), 1) if latencies else None
+            result.append(group)
+        result.sort(key=lambda g: (g['cost'], g['calls']), reverse=True)
+        return result
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def ledger_enabled():
+    return get_setting('usage_ledger', 'enabled', fallback=True, type=bool)
+
+
+def get_usage_ledger():
+    """获取全局用量台账"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            db_path = get_setting('usage_ledger', 'db_path', fallback='output/usage_ledger.db')
+            if not os.path.isabs(db_path):
+                db_path = os.path.join(PROJECT_ROOT, db_path)
+            _ledger = UsageLedger(db_path)
+        return _ledger
+
+
+def record_llm_call(**entry):
+    """写入台账，未启用时忽略，失败时只记录日志"""
+    if not ledger_enabled():
+        return None
+    try:
+        return get_usage_ledger().record(**entry)
+    except Exception as e:
+        logger.error(f"记录大模型用量失败: {e}")
+        return None
@@ -5,11 +5,22 @@ Word文档生成器
 将生成的教学大纲内容回填到Word模板
 """
 
+import gc
+import io
 import os
 import re
-from docx import Document
+import threading
+import time
+from contextlib import contextmanager
 from loguru import logger
 
+from .app_config import get_setting
+from .deadline import DeadlineExceeded, bounded_timeout, check_deadline
+from .docx_cache import get_docx_cache
+from .logging_config import stage
+from .memory_profiler import release_memory
+from .template_registry import get_template
+
 
 def generate_word_document(outline_data, template_path, output_path):
     """
@@ -18,12 +29,15 @@ def generate_word_document(outline_data, template_path, output_path):
     Args:
         outline_data: 教学大纲数据字典
         template_path: Word模板文件路径
-        output_path: 输出Word文件路径
+        output_path: 输出Word文件路径或可写的文件对象
     
     Returns:
         str: 生成的文件路径
     """
     
+    # python-docx 导入较慢，首次渲染时才加载（服务启动后由后台预热提前完成）
+    from docx import Document
+
     try:
         # 读取Word模板
         doc = Document(template_path)
@@ -31,15 +45,18 @@ def generate_word_document(outline_data, template_path, output_path):
         
         # 替换段落中的变量
         for paragraph in doc.paragraphs:
+            check_deadline('Word渲染')
             replace_variables_in_paragraph(paragraph, outline_data)
         
         # 替换表格中的变量
         for table in doc.tables:
+            check_deadline('Word渲染')
             replace_variables_in_table(table, outline_data)
         
-        # 保存文档
+        # 保存文档（output_path 也可以是文件对象）
         doc.save(output_path)
-        logger.info(f"Word文档已生成: {output_path}")
+        if isinstance(output_path, str):
+            logger.info(f"Word文档已生成: {output_path}")
         
         return output_path
         
@@ -67,21 +84,9 @@ def replace_variables_in_paragraph(paragraph, data):
 def replace_variables_advanced(paragraph, data):
     """高级模板变量替换，处理跨多个 runs 的情况"""
     
-    # 获取段落中所有的 runs 信息
-    runs_info = []
-    for run in paragraph.runs:
-        runs_info.append({
-            'text': run.text,
-            'font_name': run.font.name,
-            'font_size': run.font.size,
-            'font_bold': run.font.bold,
-            'font_italic': run.font.italic,
-            'font_underline': run.font.underline,
-            'font_color': run.font.color.rgb if run.font.color else None
-        })
-    
     # 合并所有 runs 的文本
-    full_text = ''.join([info['text'] for info in runs_info])
+    runs = paragraph.runs
+    full_text = ''.join(run.text for run in runs)
     
     # 查找并替换模板变量
     variables = re.findall(r'\{\{([^}]+)\}\}', full_text)
@@ -98,30 +103,46 @@ def replace_variables_advanced(paragraph, data):
     if new_text == full_text:
         return
     
+    # 只保留最后一个 run 的格式（大多数情况下模板变量会在最后），不为每个 run 复制一份格式
+    last_format = run_format(runs[-1]) if runs else None
+    
     # 清空段落
     paragraph.clear()
+    new_run = paragraph.add_run(new_text)
     
-    # 尝试保持最后一个 run 的格式（大多数情况下模板变量会在最后）
-    if runs_info:
-        last_run_info = runs_info[-1]
-        new_run = paragraph.add_run(new_text)
-        
-        # 应用最后一个 run 的格式
-        if last_run_info['font_name']:
-            new_run.font.name = last_run_info['font_name']
-        if last_run_info['font_size']:
-            new_run.font.size = last_run_info['font_size']
-        if last_run_info['font_bold'] is not None:
-            new_run.font.bold = last_run_info['font_bold']
-        if last_run_info['font_italic'] is not None:
-            new_run.font.italic = last_run_info['font_italic']
-        if last_run_info['font_underline'] is not None:
-            new_run.font.underline = last_run_info['font_underline']
-        if last_run_info['font_color']:
-            new_run.font.color.rgb = last_run_info['font_color']
-    else:
-        # 如果没有原有 runs，只是添加简单文本
-        paragraph.add_run(new_text)
+    # 应用最后一个 run 的格式
+    if last_format:
+        apply_run_format(new_run, last_format)
+
+
+def run_format(run):
+    """读取 run 的字体格式（清空段落前调用）"""
+    font = run.font
+    return {
+        'name': font.name,
+        'size': font.size,
+        'bold': font.bold,
+        'italic': font.italic,
+        'underline': font.underline,
+        'color': font.color.rgb if font.color else None,
+    }
+
+
+def apply_run_format(run, fmt):
+    """把 run_format 读取的格式应用到新的 run"""
+    font = run.font
+    if fmt['name']:
+        font.name = fmt['name']
+    if fmt['size']:
+        font.size = fmt['size']
+    if fmt['bold'] is not None:
+        font.bold = fmt['bold']
+    if fmt['italic'] is not None:
+        font.italic = fmt['italic']
+    if fmt['underline'] is not None:
+        font.underline = fmt['underline']
+    if fmt['color']:
+        font.color.rgb = fmt['color']
 
 
 def generate_default_value(var_name):
@@ -206,7 +227,153 @@ def replace_variables_in_table(table, data):
             # 这些属性在替换文本时不会被改变
 
 
-def create_word_from_outline(outline_data, course_name, output_dir):
+class RenderLimiter:
+    """
+    Word 渲染并发上限
+
+    每次渲染要把模板解析成完整的 XML 对象图（约 1MB，由 lxml 分配，tracemalloc 统计不到），
+    同时进行的渲染越多，进程内存峰值越高。超出上限的渲染排队等待空位，
+    等待超过 queue_timeout 秒或请求截止时间时抛出 DeadlineExceeded。
+
+    Document 的包与各部件相互引用，渲染完成后只能由循环垃圾回收释放，而 lxml 分配的内存
+    不计入垃圾回收的触发阈值，连续渲染时废弃的文档会大量堆积（实测每次约 1MB 且不回落）。
+    因此每完成 collect_every 次渲染执行一次完整的垃圾回收，堆积量不超过 collect_every 份文档
+    """
+
+    def __init__(self, max_concurrent=2, queue_timeout=30.0, collect_every=4, trim_when_idle=True):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.collect_every = collect_every
+        self.trim_when_idle = trim_when_idle
+        self._uncollected = 0
+        self._semaphore = threading.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._stats = {'renders': 0, 'queued': 0, 'rejected': 0, 'wait_ms': 0.0, 'max_wait_ms': 0.0,
+                       'peak_active': 0, 'peak_waiting': 0, 'collections': 0, 'trims': 0}
+
+    @contextmanager
+    def slot(self):
+        """占用一个渲染名额，没有空位时排队"""
+        start = time.perf_counter()
+        if self._semaphore is not None and not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self._waiting += 1
+                self._stats['queued'] += 1
+                self._stats['peak_waiting'] = max(self._stats['peak_waiting'], self._waiting)
+            try:
+                with stage('word_queue'):
+                    acquired = self._semaphore.acquire(timeout=bounded_timeout(self.queue_timeout, 'Word渲染排队'))
+            except DeadlineExceeded:
+                acquired = False
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self._stats['rejected'] += 1
+                raise DeadlineExceeded(f"Word渲染排队超时（同时渲染上限 {self.max_concurrent}）")
+        waited = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._active += 1
+            self._stats['renders'] += 1
+            self._stats['wait_ms'] += waited
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], waited)
+            self._stats['peak_active'] = max(self._stats['peak_active'], self._active)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._uncollected += 1
+                collect = 0 < self.collect_every <= self._uncollected
+                if collect:
+                    self._uncollected = 0
+                    self._stats['collections'] += 1
+                idle = self._active == 0 and self._waiting == 0
+            if self._semaphore is not None:
+                self._semaphore.release()
+            if collect:
+                gc.collect()
+            # 渲染高峰结束后把空闲的堆内存归还给操作系统
+            if (collect or idle) and self.trim_when_idle and release_memory():
+                with self._lock:
+                    self._stats['trims'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'wait_ms': round(self._stats['wait_ms'], 1),
+                'max_wait_ms': round(self._stats['max_wait_ms'], 1),
+                'max_concurrent': self.max_concurrent,
+                'active': self._active,
+                'waiting': self._waiting,
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_render_limiter():
+    """获取全局Word渲染并发限制（参数取自配置 [memory]）"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RenderLimiter(
+                max_concurrent=get_setting('memory', 'max_concurrent_renders', fallback=2, type=int),
+                queue_timeout=get_setting('memory', 'render_queue_timeout', fallback=30.0, type=float),
+                collect_every=get_setting('memory', 'gc_every_renders', fallback=4, type=int),
+                trim_when_idle=get_setting('memory', 'trim_after_render', fallback=True, type=bool),
+            )
+        return _limiter
+
+
+def render_word_bytes(outline_data, template_path):
+    """渲染Word文档并返回 .docx 字节（受同时渲染上限约束，见 RenderLimiter）"""
+    buffer = io.BytesIO()
+    with get_render_limiter().slot(), stage('word_render'):
+        generate_word_document(outline_data, template_path, buffer)
+    return buffer.getvalue()
+
+
+def render_word_from_outline(outline_data, template_path=None, outline_hash=None):
+    """
+    渲染Word文档，内容相同的大纲直接取缓存（配置 [word_cache]）
+    
+    Args:
+        template_path: Word模板文件路径，为空时使用模板注册表中的默认模板
+        outline_hash: 大纲数据的规范化摘要（如中间表示的 digest），为空时由缓存计算
+    
+    Returns:
+        tuple: (.docx 字节, ETag, 是否命中缓存)
+    """
+    template_path = template_path or get_template(kind='docx').path
+    if not get_setting('word_cache', 'enabled', fallback=True, type=bool):
+        return render_word_bytes(outline_data, template_path), None, False
+    return get_docx_cache().get_or_render(outline_data, template_path, render_word_bytes, outline_hash)
+
+
+def word_output_path(course_name, output_dir):
+    """Word文档在输出目录中的路径：教学大纲-<课程名称>.docx"""
+    # 清理课程名称，用于文件名
+    safe_course_name = clean_filename(course_name)
+    return os.path.join(output_dir, f"教学大纲-{safe_course_name}.docx")
+
+
+def write_word_file(data, output_path):
+    """写入Word文件（先写临时文件再替换，下载方不会读到写了一半的文件）"""
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def create_word_from_outline(outline_data, course_name, output_dir, template_id=None):
     """
     从教学大纲数据创建Word文档
     
@@ -214,25 +381,16 @@ def create_word_from_outline(outline_data, course_name, output_dir):
         outline_data: 教学大纲数据
         course_name: 课程名称
         output_dir: 输出目录
+        template_id: Word模板ID（templates 目录中的文件名，不含扩展名），为空时使用默认模板
     
     Returns:
         str: 生成的Word文件路径
     """
-    
-    # 构建文件路径
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
-    template_path = os.path.join(project_root, 'templates', '教学大纲-模板.docx')
-    
-    # 清理课程名称，用于文件名
-    safe_course_name = clean_filename(course_name)
-    output_filename = f"教学大纲-{safe_course_name}.docx"
-    output_path = os.path.join(output_dir, output_filename)
-    
-    # 确保输出目录存在
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 生成Word文档
-    return generate_word_document(outline_data, template_path, output_path)
+    data, _, _ = render_word_from_outline(outline_data, get_template(template_id, 'docx').path)
+    output_path = word_output_path(course_name, output_dir)
+    write_word_file(data, output_path)
+    logger.info(f"Word文档已生成: {output_path}")
+    return output_path
 
 
 def clean_filename(filename):
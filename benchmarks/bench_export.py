@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出基准测试
+测量导出各阶段（解析大纲、Markdown、HTML、加载Word模板、渲染Word）的耗时与峰值内存，
+峰值内存分为 tracemalloc 统计的 Python 分配与采样得到的 RSS 增长（lxml 的分配只体现在 RSS 中）；
+--burst 模拟同时到达的一批Word导出，对比不同同时渲染上限下的 RSS 峰值与总耗时
+
+用法：
+    python benchmarks/bench_export.py
+    python benchmarks/bench_export.py --burst 32 --limits 0,1,2,4
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app.services import word_generator  # noqa: E402
+from app.services.exporters import export_markdown  # noqa: E402
+from app.services.markdown_html import markdown_to_html  # noqa: E402
+from app.services.memory_profiler import measure_peak, release_memory, rss_bytes  # noqa: E402
+from app.services.outline_ir import Outline  # noqa: E402
+from app.services.teaching_outline_generator import generate_default_content  # noqa: E402
+from app.services.template_registry import get_template  # noqa: E402
+
+
+COURSES = ['Python程序设计', '计算机网络基础', 'Web前端开发']
+
+
+def load_word_template(path):
+    from docx import Document
+
+    return Document(path)
+
+
+def stages(outline_data, template_path):
+    """各阶段：(名称, 调用)"""
+    outline = Outline.from_payload(outline_data)
+    markdown = export_markdown(outline)
+    return [
+        ('outline_ir', lambda: Outline.from_payload(outline_data)),
+        ('markdown', lambda: export_markdown(outline)),
+        ('html', lambda: markdown_to_html(markdown)),
+        ('word_load', lambda: load_word_template(template_path)),
+        ('word_render', lambda: word_generator.render_word_bytes(outline_data, template_path)),
+    ]
+
+
+def bench_stages(iterations):
+    """每个阶段的平均耗时、Python 峰值与 RSS 峰值（取各次的最大值）"""
+    template_path = get_template(kind='docx').path
+    samples = [generate_default_content(course, None) for course in COURSES]
+    results = {}
+    for outline_data in samples:
+        for name, call in stages(outline_data, template_path):
+            call()  # 预热：导入与各级缓存
+            elapsed, peak, rss_peak = 0.0, 0, 0
+            for _ in range(iterations):
+                with measure_peak() as memory:
+                    start = time.perf_counter()
+                    call()
+                    elapsed += time.perf_counter() - start
+                peak = max(peak, memory['peak'])
+                rss_peak = max(rss_peak, memory['rss_peak'] or 0)
+            total = results.setdefault(name, [0.0, 0, 0])
+            total[0] += elapsed / iterations
+            total[1] = max(total[1], peak)
+            total[2] = max(total[2], rss_peak)
+    return {name: (elapsed / len(samples), peak, rss_peak) for name, (elapsed, peak, rss_peak) in results.items()}
+
+
+def bench_burst(count, limit):
+    """count 个Word导出同时到达，同时渲染上限为 limit（0 表示不限）"""
+    template_path = get_template(kind='docx').path
+    samples = [generate_default_content(COURSES[i % len(COURSES)], None) for i in range(count)]
+    word_generator._limiter = word_generator.RenderLimiter(max_concurrent=limit, queue_timeout=600)
+    release_memory()
+    before = rss_bytes()
+    start = time.perf_counter()
+    with measure_peak(trace_python=False, interval=0.001) as memory:
+        threads = [threading.Thread(target=word_generator.render_word_bytes, args=(data, template_path))
+                   for data in samples]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    after = rss_bytes()
+    return elapsed, memory['rss_peak'], (after - before) if before is not None else None, \
+        word_generator.get_render_limiter().stats()
+
+
+def _mb(value):
+    return '-' if value is None else f"{value / (1024 * 1024):.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出基准测试')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--burst', type=int, default=0, help='同时到达的Word导出数（0 表示不测试）')
+    parser.add_argument('--limits', default='0,2', help='--burst 时对比的同时渲染上限，逗号分隔')
+    args = parser.parse_args()
+
+    print(f"{'阶段':<14}{'耗时(ms)':>10}{'Python峰值(KB)':>16}{'RSS峰值(MB)':>13}")
+    for name, (elapsed, peak, rss_peak) in bench_stages(args.iterations).items():
+        print(f"{name:<14}{elapsed * 1000:>10.1f}{peak / 1024:>16.0f}{_mb(rss_peak):>13}")
+
+    if args.burst:
+        print()
+        print(f"{'上限':<6}{'总耗时(s)':>10}{'RSS峰值(MB)':>13}{'结束后(MB)':>12}{'最长排队(ms)':>14}{'回收次数':>10}")
+        for limit in (int(v) for v in args.limits.split(',') if v.strip()):
+            elapsed, rss_peak, retained, stats = bench_burst(args.burst, limit)
+            print(f"{limit or '不限':<6}{elapsed:>10.2f}{_mb(rss_peak):>13}{_mb(retained):>12}"
+                  f"{stats['max_wait_ms']:>14.0f}{stats['collections']:>10}")
+
+
+if __name__ == '__main__':
+    main()
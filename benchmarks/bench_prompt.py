@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词模式基准测试
+对比 full 与 compact 两种提示词的构建耗时、估算 token 数与输入成本；
+设置 --live 并提供 API Key 时，还会实际调用大模型测量端到端延迟
+
+用法：
+    python benchmarks/bench_prompt.py
+    python benchmarks/bench_prompt.py --live --provider deepseek --api-key sk-xxx
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app.services.teaching_outline_generator import PROMPT_MODES, build_prompt, generate_with_ai  # noqa: E402
+from app.services.token_counter import estimate_tokens, get_usage, reset_usage  # noqa: E402
+
+
+SAMPLES = [
+    {'course_name': 'Python程序设计'},
+    {'course_name': '计算机网络基础', 'exclude_items': '区块链、量子计算'},
+    {
+        'course_name': 'Web前端开发',
+        'system_prompt': '注重实践性、符合企业需求、重点模块：响应式布局、组件化开发、前端工程化',
+        'user_prompt': '突出工程实践能力、对接行业标准',
+        'focus_modules': '响应式布局，组件化开发',
+    },
+]
+
+
+def bench_build(mode, iterations):
+    """测量提示词构建耗时与估算 token 数"""
+    tokens = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for sample in SAMPLES:
+            build_prompt(prompt_mode=mode, **sample)
+    elapsed = (time.perf_counter() - start) / (iterations * len(SAMPLES))
+    for sample in SAMPLES:
+        tokens.append(estimate_tokens(build_prompt(prompt_mode=mode, **sample)))
+    return elapsed, tokens
+
+
+def bench_live(mode, provider, api_key, model):
+    """实际调用大模型，测量端到端延迟与 token 用量"""
+    results = []
+    for sample in SAMPLES:
+        reset_usage()
+        start = time.perf_counter()
+        generate_with_ai(
+            sample['course_name'], sample.get('exclude_items'),
+            sample.get('system_prompt'), sample.get('user_prompt'),
+            provider, api_key, model,
+            focus_modules=sample.get('focus_modules'), prompt_mode=mode,
+        )
+        results.append((time.perf_counter() - start, get_usage()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='提示词模式基准测试')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--price', type=float, default=0.002, help='每千个输入 token 的价格（元）')
+    parser.add_argument('--live', action='store_true', help='实际调用大模型')
+    parser.add_argument('--provider', default='deepseek')
+    parser.add_argument('--api-key', default=os.environ.get('LLM_API_KEY', ''))
+    parser.add_argument('--model', default='')
+    args = parser.parse_args()
+
+    print(f"{'模式':<8}{'构建耗时(ms)':>14}{'平均输入token':>16}{'每千次输入成本':>16}")
+    baseline = None
+    for mode in PROMPT_MODES:
+        elapsed, tokens = bench_build(mode, args.iterations)
+        avg_tokens = sum(tokens) / len(tokens)
+        cost = avg_tokens / 1000 * args.price * 1000
+        if baseline is None:
+            baseline = avg_tokens
+        saving = (1 - avg_tokens / baseline) * 100
+        print(f"{mode:<8}{elapsed * 1000:>14.3f}{avg_tokens:>16.0f}{cost:>16.2f}  (较full减少 {saving:.1f}%)")
+
+    if args.live:
+        if not args.api_key:
+            parser.error('--live 需要 --api-key 或环境变量 LLM_API_KEY')
+        print()
+        print(f"{'模式':<8}{'平均延迟(s)':>12}{'prompt':>10}{'completion':>12}")
+        for mode in PROMPT_MODES:
+            results = bench_live(mode, args.provider, args.api_key, args.model)
+            latency = sum(r[0] for r in results) / len(results)
+            prompt_tokens = sum(r[1]['prompt_tokens'] for r in results) / len(results)
+            completion_tokens = sum(r[1]['completion_tokens'] for r in results) / len(results)
+            print(f"{mode:<8}{latency:>12.2f}{prompt_tokens:>10.0f}{completion_tokens:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
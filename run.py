@@ -2,10 +2,16 @@ import os
 import sys
 import socket
 import configparser
+import multiprocessing
 import threading
 import time
 import webbrowser
-from app import create_app
+# 须在导入应用之前导入，才能统计启动各阶段与模块导入的耗时
+from app.services import startup
+if '--startup-report' in sys.argv:
+    startup.enable_import_timing()
+with startup.phase('import_app'):
+    from app import create_app
 
 def get_resource_path(relative_path):
     """获取资源文件的绝对路径，支持PyInstaller打包"""
@@ -37,7 +43,10 @@ def create_default_config(config_path):
         'host': '127.0.0.1',
         'port': '5000',
         'debug': 'false',
-        'backup_ports': '5001,5002,5003,5004,5005'
+        'backup_ports': '5001,5002,5003,5004,5005',
+        'request_timeout': '120',
+        'max_request_timeout': '600',
+        'admin_token': ''
     }
     
     config['app'] = {
@@ -54,18 +63,127 @@ def create_default_config(config_path):
         'uploads_dir': 'uploads'
     }
     
+    config['http'] = {
+        'compress': 'true',
+        'compress_min_size': '1024',
+        'compress_level': '6',
+        'static_max_age': '86400'
+    }
+    
     config['ai'] = {
         'default_positioning_length': '100',
         'default_objectives_length': '80',
         'default_module_content_length': '60',
-        'default_temperature': '0.9'
+        'default_temperature': '0.9',
+        'syllabus_temperature': '0.3',
+        'max_tokens_headroom': '1.5',
+        'min_output_tokens': '512',
+        'max_output_tokens': '8192',
+        'max_retries': '2',
+        'retry_backoff': '1.0'
+    }
+    
+    config['ai_routing'] = {
+        'enabled': 'false',
+        'group_metadata': 'fast',
+        'group_goals': 'fast',
+        'group_modules': 'strong',
+        'deepseek_fast': 'deepseek-chat',
+        'deepseek_strong': 'deepseek-chat',
+        'openai_fast': 'gpt-4o-mini',
+        'openai_strong': 'gpt-4o'
+    }
+    
+    config['library'] = {
+        'enabled': 'true',
+        'reuse': 'false',
+        'db_path': 'output/outline_library.db',
+        'reuse_threshold': '95',
+        'seed_threshold': '75',
+        'ttl': '604800'
+    }
+    
+    config['syllabus'] = {
+        'chunked': 'true',
+        'chunk_weeks': '6',
+        'max_workers': '4',
+        'rule_cache_entries': '1024',
+        'rule_check_interval': '2'
+    }
+    
+    config['cache'] = {
+        'ttl': '3600',
+        'max_entries': '256',
+        'prefetch_workers': '2',
+        'prefetch_timeout': '300'
+    }
+    
+    config['export'] = {
+        'outline_cache_entries': '256',
+        'html_cache_entries': '256'
+    }
+    
+    config['templates'] = {
+        'default_docx': '教学大纲-模板',
+        'default_md': '教学大纲模板',
+        'exclude': 'README.md, 模板变量说明.md',
+        'check_interval': '2'
+    }
+    
+    config['word_cache'] = {
+        'enabled': 'true',
+        'max_mb': '64',
+        'max_entries': '128'
+    }
+    
+    config['memory'] = {
+        'max_concurrent_renders': '2',
+        'render_queue_timeout': '30',
+        'gc_every_renders': '4',
+        'trim_after_render': 'true',
+        'tracemalloc': 'false',
+        'tracemalloc_frames': '1'
+    }
+    
+    config['storage'] = {
+        'backend': 'local',
+        'root': 'output/storage',
+        'sqlite_path': 'output/storage.db',
+        'url': 'http://127.0.0.1:5100',
+        'timeout': '10',
+        'share_responses': 'true',
+        'artifact_ttl': '604800',
+        'sweep_interval': '3600'
+    }
+    
+    config['warmer'] = {
+        'enabled': 'false',
+        'off_peak_hours': '1-6',
+        'top_n': '20',
+        'stats_days': '30',
+        'refresh_after': '86400',
+        'rate_per_minute': '6',
+        'interval': '21600',
+        'check_interval': '600',
+        'stats_db': 'output/request_stats.db',
+        'llm_provider': '',
+        'llm_api_key': '',
+        'llm_model': ''
+    }
+    
+    config['usage_ledger'] = {
+        'enabled': 'true',
+        'db_path': 'output/usage_ledger.db'
     }
     
     config['logging'] = {
         'log_level': 'INFO',
         'log_file': 'app.log',
         'max_log_size': '10MB',
-        'backup_count': '5'
+        'backup_count': '5',
+        'compression': 'gz',
+        'json': 'false',
+        'max_message_length': '2000'
     }
     
     with open(config_path, 'w', encoding='utf-8') as f:
@@ -103,13 +221,14 @@ def find_available_port(host, preferred_port, backup_ports):
     
     raise Exception("无法找到可用端口")
 
-def open_browser(host, port, default_page, delay=1.5):
-    """延迟打开浏览器"""
+def open_browser(host, port, default_page, delay=0):
+    """打开浏览器（服务已开始监听，无需等待）"""
     def _open():
         time.sleep(delay)
         url = f"http://{host}:{port}{default_page}"
         try:
             webbrowser.open(url)
+            startup.mark('browser_open')
             print(f"🌐 浏览器已打开: {url}")
         except Exception as e:
             print(f"⚠️  无法自动打开浏览器: {e}")
@@ -126,17 +245,29 @@ def create_output_directories():
             os.makedirs(directory)
             print(f"📁 已创建目录: {directory}")
 
-app = create_app()
+def serve(startup_report=False):
+    """
+    启动Web服务
 
-if __name__ == '__main__':
+    startup_report 为 True 时完成启动、请求一次默认页面并等待后台预热结束，
+    输出启动耗时报告后退出
+    """
+    from werkzeug.serving import make_server
+    
     try:
         # 加载配置
         print("🔧 加载配置文件...")
-        config = load_config()
+        with startup.phase('load_config'):
+            config = load_config()
         
         # 创建必要目录
         create_output_directories()
         
+        # 在此创建应用而不是在模块顶层：批量渲染的子进程以 spawn 方式启动时会重新导入本模块，
+        # 不应再次创建应用、配置日志和预热
+        with startup.phase('create_app'):
+            app = create_app()
+        
         # 获取配置参数
         host = config.get('server', 'host', fallback='127.0.0.1')
         preferred_port = config.getint('server', 'port', fallback=5000)
@@ -151,7 +282,13 @@ if __name__ == '__main__':
         
         # 找到可用端口
         print(f"🔍 检查端口可用性...")
-        port = find_available_port(host, preferred_port, backup_ports)
+        with startup.phase('find_port'):
+            port = find_available_port(host, preferred_port, backup_ports)
+        
+        # 先绑定端口，之后再打开浏览器与预热
+        app.debug = debug
+        with startup.phase('listen'):
+            server = make_server(host, port, app, threaded=True)
         
         print("\n" + "="*50)
         print(f"🚀 {app_name} 启动中...")
@@ -163,15 +300,194 @@ if __name__ == '__main__':
         print()
         
         # 自动打开浏览器
-        if auto_open_browser:
+        if auto_open_browser and not startup_report:
             open_browser(host, port, default_page)
         
+        # 后台预加载模板、SSL 上下文与存储客户端，首个请求无需等待
+        warm_up_thread = startup.start_warm_up()
+        
+        # 定期清理共享存储中过期的文件与预取结果
+        if not startup_report:
+            from app.services.storage import start_retention_sweeper
+            start_retention_sweeper()
+        
+        # 低峰时段缓存预热
+        if config.getboolean('warmer', 'enabled', fallback=False) and not startup_report:
+            from app.services.cache_warmer import start_warmer
+            start_warmer(app.config['OUTPUT_FOLDER'])
+        
+        if startup_report:
+            report_startup(server, host, port, default_page, warm_up_thread)
+            return
+        
         # 启动Flask应用
-        app.run(host=host, port=port, debug=debug, use_reloader=False)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
         
     except KeyboardInterrupt:
         print("\n🛑 用户中断，正在关闭服务器...")
     except Exception as e:
         print(f"❌ 启动失败: {e}")
         input("按回车键退出...")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+def report_startup(server, host, port, default_page, warm_up_thread):
+    """请求一次默认页面（首个响应耗时），等待后台预热结束后输出启动耗时报告"""
+    import urllib.request
+    
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with startup.phase('first_response'):
+            with urllib.request.urlopen(f"http://{host}:{port}{default_page}", timeout=60) as response:
+                response.read()
+        warm_up_thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(startup.startup_report())
+
+def warm(args):
+    """缓存预热：立即预热一轮，或 --loop 按低峰时段定时运行"""
+    from app.services.cache_warmer import run_warmer_loop, warm_top_courses
+    
+    load_config()
+    create_output_directories()
+    app = create_app()
+    output_dir = None if args.no_docx else app.config['OUTPUT_FOLDER']
+    try:
+        if args.loop:
+            print("🔥 缓存预热已启动（按 Ctrl+C 停止）")
+            run_warmer_loop(output_dir=output_dir)
+        else:
+            summary = warm_top_courses(top_n=args.top, output_dir=output_dir)
+            print(f"🔥 缓存预热完成: 生成 {summary['generated']}，跳过 {summary['skipped']}，失败 {summary['failed']}")
+    except KeyboardInterrupt:
+        print("\n🛑 用户中断，停止预热")
+
+def kv_server(args):
+    """启动键值存储服务（多实例共享存储，或本机测试替身）"""
+    from app.services.kv_server import create_kv_server
+    from app.services.logging_config import setup_logging
+    from app.services.storage import start_retention_sweeper
+    
+    load_config()
+    create_output_directories()
+    setup_logging()
+    server = create_kv_server(args.host, args.port, db_path=args.db)
+    # 键值服务不支持列出键，过期内容在服务端按 [storage] 保留时间清理
+    start_retention_sweeper(server.storage)
+    print(f"🗄️  键值存储服务: http://{args.host}:{args.port}/kv/ （数据: {args.db}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 用户中断，正在关闭键值存储服务...")
+    finally:
+        server.server_close()
+
+def batch(args):
+    """按课程清单批量生成教学大纲（Markdown 与 Word），中断后重新运行会从检查点继续"""
+    from app.services.batch import read_course_list, run_batch
+    from app.services.logging_config import setup_logging
+    
+    load_config()
+    create_output_directories()
+    setup_logging()
+    try:
+        rows = read_course_list(args.input)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ 读取课程清单失败: {e}")
+        sys.exit(1)
+    defaults = {key: value for key, value in (
+        ('llm_provider', args.llm_provider),
+        ('llm_model', args.llm_model),
+        ('llm_api_key', args.llm_api_key or os.environ.get('LLM_API_KEY')),
+    ) if value}
+    print(f"📚 课程清单: {args.input}，共 {len(rows)} 门课程，输出目录: {args.output}")
+    try:
+        summary = run_batch(rows, args.output, workers=args.workers, render_processes=args.render_processes,
+                            with_docx=not args.no_docx, defaults=defaults,
+                            templates={'md': args.md_template, 'docx': args.docx_template})
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n🛑 用户中断，已完成的课程已记入检查点，重新运行相同命令即可继续")
+        sys.exit(130)
+    print(f"✅ 批量生成完成: 新完成 {summary['done']}，此前已完成 {summary['skipped']}，失败 {summary['failed']}")
+    if summary['failed']:
+        sys.exit(1)
+
+def usage(args):
+    """输出大模型用量台账汇总"""
+    from app.services.usage_ledger import get_usage_ledger
+    
+    load_config()
+    rows = get_usage_ledger().summary(args.by, args.days)
+    if not rows:
+        print(f"最近 {args.days} 天没有大模型调用记录")
+        return
+    print(f"{args.by:<24} {'调用':>6} {'缓存命中':>8} {'输入token':>10} {'输出token':>10} {'重试':>5} "
+          f"{'费用(USD)':>10} {'平均ms':>9} {'p95 ms':>9}")
+    for row in rows:
+        key = row[args.by]
+        if args.by == 'settings':
+            key = ','.join(f"{k}={v}" for k, v in key.items()) or '-'
+        print(f"{str(key or '-')[:24]:<24} {row['calls']:>6} {row['cache_hits']:>8} {row['prompt_tokens']:>10} "
+              f"{row['completion_tokens']:>10} {row['retries']:>5} {row['cost']:>10.4f} "
+              f"{row['avg_latency_ms'] or 0:>9.0f} {row['p95_latency_ms'] or 0:>9.0f}")
+
+def parse_args(argv=None):
+    """解析命令行参数；不带子命令时启动Web服务"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='教学大纲生成系统')
+    parser.add_argument('--startup-report', action='store_true', help='启动后输出各阶段与模块导入耗时报告并退出')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    warm_parser = subparsers.add_parser('warm', help='按请求频率预热常用课程的大纲与Word文档')
+    warm_parser.add_argument('--top', type=int, default=None, help='预热的课程数（默认取配置 [warmer] top_n）')
+    warm_parser.add_argument('--loop', action='store_true', help='持续运行，只在低峰时段预热')
+    warm_parser.add_argument('--no-docx', action='store_true', help='只生成大纲，不渲染Word文档')
+    
+    kv_parser = subparsers.add_parser('kv-server', help='启动共享存储使用的键值服务')
+    kv_parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    kv_parser.add_argument('--port', type=int, default=5100, help='监听端口')
+    kv_parser.add_argument('--db', default='output/kv_store.db', help='数据保存的SQLite文件')
+    
+    batch_parser = subparsers.add_parser('batch', help='按课程清单（CSV / JSON Lines / XLSX）批量生成教学大纲')
+    batch_parser.add_argument('input', help='课程清单文件，列名同生成参数（course_name 等）或中文列名（课程名称等）')
+    batch_parser.add_argument('--output', default='output/batch', help='输出目录（含检查点文件）')
+    batch_parser.add_argument('--workers', type=int, default=4, help='并发生成大纲的线程数')
+    batch_parser.add_argument('--render-processes', type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)),
+                              help='渲染Word文档的进程数')
+    batch_parser.add_argument('--no-docx', action='store_true', help='只生成Markdown，不渲染Word文档')
+    batch_parser.add_argument('--docx-template', help='Word模板ID（templates 目录中的文件名，不含扩展名）')
+    batch_parser.add_argument('--md-template', help='Markdown模板ID')
+    batch_parser.add_argument('--llm-provider', help='清单未指定时使用的模型提供商（deepseek / openai）')
+    batch_parser.add_argument('--llm-model', help='清单未指定时使用的模型名称')
+    batch_parser.add_argument('--llm-api-key', help='清单未指定时使用的API密钥（也可通过环境变量 LLM_API_KEY 提供）')
+    
+    usage_parser = subparsers.add_parser('usage', help='汇总大模型用量台账（token、费用、耗时）')
+    usage_parser.add_argument('--by', default='day', choices=['day', 'course', 'model', 'provider', 'stage', 'settings'],
+                              help='汇总维度')
+    usage_parser.add_argument('--days', type=int, default=7, help='统计最近多少天')
+    
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    # 打包后的程序在批量生成的渲染子进程中运行时由此接管
+    multiprocessing.freeze_support()
+    args = parse_args()
+    if args.command == 'warm':
+        warm(args)
+    elif args.command == 'kv-server':
+        kv_server(args)
+    elif args.command == 'batch':
+        batch(args)
+    elif args.command == 'usage':
+        usage(args)
+    else:
+        serve(startup_report=args.startup_report)